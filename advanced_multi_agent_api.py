@@ -15,6 +15,7 @@ from datetime import datetime
 import requests
 import re
 import logging
+from agent_router import KeywordRouter, GREETING_PATTERN
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -151,11 +152,19 @@ class MultiLayerAgentSystem:
             'family': FamilyLawAgent(),
             'criminal': CriminalLawAgent()
         }
+        # Keyword sets in priority order (earlier agents win ties)
+        self.router = KeywordRouter([
+            ('immigration', ['immigration', 'visa', 'green card', 'citizenship', 'asylum', 'deportation']),
+            ('family', ['divorce', 'custody', 'child support', 'adoption', 'family law']),
+            ('criminal', ['criminal', 'arrest', 'charges', 'court', 'trial', 'sentencing']),
+            ('compliance', ['gdpr', 'privacy', 'data protection', 'soc 2', 'compliance', 'regulatory']),
+            ('business', ['incorporat', 'llc', 'corporation', 'fundraising', 'business', 'startup']),
+            ('document', ['document', 'contract', 'agreement', 'generate', 'draft', 'template']),
+            ('expert', ['complex', 'detailed', 'analysis', 'research']),
+        ], default=None, exact=[('greeting', GREETING_PATTERN)])
     
     def route_message(self, message, context=None):
         """Route message to appropriate agent based on content and context"""
-        lower_message = message.lower().strip()
-        
         # Context-aware routing
         if context and context.get('conversation_history'):
             # Analyze conversation history for better routing
@@ -167,40 +176,12 @@ class MultiLayerAgentSystem:
             elif any('criminal' in h.lower() or 'arrest' in h.lower() for h in history[-3:]):
                 return 'criminal'
         
-        # Content-based routing
-        if re.match(r'^(hello|hi|hey|good morning|good afternoon|good evening)$', lower_message):
-            return 'greeting'
-        
-        # Immigration patterns
-        if any(keyword in lower_message for keyword in ['immigration', 'visa', 'green card', 'citizenship', 'asylum', 'deportation']):
-            return 'immigration'
-        
-        # Family law patterns
-        if any(keyword in lower_message for keyword in ['divorce', 'custody', 'child support', 'adoption', 'family law']):
-            return 'family'
-        
-        # Criminal law patterns
-        if any(keyword in lower_message for keyword in ['criminal', 'arrest', 'charges', 'court', 'trial', 'sentencing']):
-            return 'criminal'
-        
-        # Compliance patterns
-        if any(keyword in lower_message for keyword in ['gdpr', 'privacy', 'data protection', 'soc 2', 'compliance', 'regulatory']):
-            return 'compliance'
-        
-        # Business patterns
-        if any(keyword in lower_message for keyword in ['incorporat', 'llc', 'corporation', 'fundraising', 'business', 'startup']):
-            return 'business'
-        
-        # Document patterns
-        if any(keyword in lower_message for keyword in ['document', 'contract', 'agreement', 'generate', 'draft', 'template']):
-            return 'document'
-        
-        # Expert patterns (complex questions)
-        if len(message.split()) > 10 or any(keyword in lower_message for keyword in ['complex', 'detailed', 'analysis', 'research']):
-            return 'expert'
+        agent_type = self.router.route(message)
+        if agent_type:
+            return agent_type
         
-        # Default to greeting for simple messages
-        return 'greeting'
+        # Expert for long (complex) questions, greeting for simple messages
+        return 'expert' if len(message.split()) > 10 else 'greeting'
     
     def process_message(self, message, context=None):
         """Process message through the multi-layer agent system"""
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+SmartProBono - Keyword routing engine shared by the agent APIs
+
+Each entry script declares its agents' keyword sets in priority order. The
+router compiles every keyword into one literal alternation and scores all agents
+in a single scan of the message, instead of running ``any(k in message ...)``
+list by list. Keywords match as substrings (so 'incorporat' still catches
+'incorporate' and 'incorporation'), each distinct keyword counts once, and
+ties go to the agent listed first.
+"""
+
+import re
+
+GREETING_PATTERN = r'^(hello|hi|hey|good morning|good afternoon|good evening)$'
+
+
+def trie_pattern(keywords):
+    """Regex for a set of literal keywords, factored into a prefix tree
+
+    A trie-shaped pattern lets the regex engine decide each position character
+    by character instead of trying every keyword there; at each node the
+    longest keyword wins.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return '(?:' + build(trie) + ')'
+
+
+class KeywordRouter:
+    """Weighted keyword router compiled once per agent profile
+
+    ``routes`` is an ordered list of ``(agent, keywords)``. ``keywords`` is a
+    list of strings, or a dict of keyword -> weight. A keyword's default weight
+    is its word count, so phrases such as 'child support' count for more than
+    single words. A keyword may belong to several agents.
+    """
+
+    def __init__(self, routes, default='greeting', exact=None):
+        self.default = default
+        self.priority = {agent: i for i, (agent, _) in enumerate(routes)}
+        self.exact = [(agent, re.compile(pattern)) for agent, pattern in (exact or [])]
+
+        self.weights = {}
+        for agent, keywords in routes:
+            if not isinstance(keywords, dict):
+                keywords = {keyword: len(keyword.split()) for keyword in keywords}
+            for keyword, weight in keywords.items():
+                keyword = keyword.lower()
+                self.weights.setdefault(keyword, []).append((agent, weight))
+
+        # Every other keyword starting where a keyword matched is one of its prefixes
+        self.prefixes = {
+            keyword: [other for other in self.weights if keyword.startswith(other)]
+            for keyword in self.weights
+        }
+        self.pattern = re.compile(trie_pattern(self.weights)) if self.weights else None
+
+    def matched_keywords(self, lower_message):
+        """Distinct keywords that occur in the (lowercased) message
+
+        One left-to-right scan; a keyword that starts inside a longer keyword
+        match is not counted, much like a word inside another word.
+        """
+        found = set()
+        if self.pattern is not None:
+            for keyword in self.pattern.findall(lower_message):
+                found.update(self.prefixes[keyword])
+        return found
+
+    def scores(self, message):
+        """Score of every agent with at least one keyword in the message"""
+        scores = {}
+        for keyword in self.matched_keywords(message.lower()):
+            for agent, weight in self.weights[keyword]:
+                scores[agent] = scores.get(agent, 0) + weight
+        return scores
+
+    def route(self, message):
+        """Best agent for the message, or the router's default when nothing matches"""
+        lower_message = message.lower().strip()
+        for agent, pattern in self.exact:
+            if pattern.match(lower_message):
+                return agent
+
+        scores = self.scores(lower_message)
+        if not scores:
+            return self.default
+        return min(scores, key=lambda agent: (-scores[agent], self.priority[agent]))
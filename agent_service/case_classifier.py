@@ -0,0 +1,150 @@
+"""
+Local fast-path classification for intake routing
+Nearest-centroid classifier on all-MiniLM-L6-v2 embeddings with an LLM fallback
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Overrides the shared EMBED_MODEL for the classifier only
+CLASSIFIER_EMBED_MODEL = os.getenv("CLASSIFIER_EMBED_MODEL")
+# Minimum softmax confidence for the fast path; below it the LLM decides
+CLASSIFIER_CONFIDENCE = float(os.getenv("CLASSIFIER_CONFIDENCE", "0.6"))
+# Softmax temperature over cosine similarities
+CLASSIFIER_TEMPERATURE = float(os.getenv("CLASSIFIER_TEMPERATURE", "0.05"))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_embedding_model():
+    """Embedding model on the backend EMBED_BACKEND selects, or None if it can't be loaded"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            try:
+                from smartprobono_backend.rag.embedding_backend import EMBED_MODEL, load_embedding_model
+                _model = load_embedding_model(CLASSIFIER_EMBED_MODEL or EMBED_MODEL)
+            except Exception as e:
+                print(f"Fast-path classifier disabled, embedding model unavailable: {e}")
+                _model = False
+    return _model or None
+
+def load_examples(filename: str) -> Dict[str, List[str]]:
+    """Labeled intakes: {label: [example texts]}"""
+    with open(os.path.join(DATA_DIR, filename)) as f:
+        return json.load(f)
+
+class CentroidClassifier:
+    """Nearest-centroid classifier over sentence embeddings
+
+    Each label's centroid is the normalised mean embedding of its labeled
+    intakes. Confidence is the softmax of the cosine similarities to every
+    centroid, so it drops when a message sits between two labels.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]], confidence: float = CLASSIFIER_CONFIDENCE,
+                 temperature: float = CLASSIFIER_TEMPERATURE):
+        self.examples = examples
+        self.labels = list(examples)
+        self.confidence = confidence
+        self.temperature = temperature
+        self._centroids = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "fast_path": 0, "llm_fallback": 0, "fast_path_ms": 0.0}
+
+    def _fit(self):
+        """Embed the examples and compute centroids (once, on first use)"""
+        with self._lock:
+            if self._centroids is None:
+                model = get_embedding_model()
+                if model is None:
+                    self._centroids = {}
+                    return
+                centroids = {}
+                for label, texts in self.examples.items():
+                    vectors = model.encode(texts, normalize_embeddings=True)
+                    mean = vectors.mean(axis=0)
+                    centroids[label] = mean / max(float((mean ** 2).sum()) ** 0.5, 1e-12)
+                self._centroids = centroids
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Most likely label and its confidence; (None, 0.0) without a model"""
+        self._fit()
+        if not self._centroids:
+            return None, 0.0
+        vector = get_embedding_model().encode(text, normalize_embeddings=True)
+        similarities = {label: float(vector @ centroid) for label, centroid in self._centroids.items()}
+        best = max(similarities, key=similarities.get)
+        top = similarities[best]
+        weights = [math.exp((s - top) / self.temperature) for s in similarities.values()]
+        return best, 1.0 / sum(weights)
+
+    def fast_label(self, text: str) -> Tuple[Optional[str], Dict]:
+        """Label if the fast path is confident enough, else None; counted in stats()"""
+        self._fit()  # one-off model load and centroid fit is not routing latency
+        start = time.perf_counter()
+        label, confidence = self.predict(text)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        fast = label is not None and confidence >= self.confidence
+        with self._lock:
+            self._stats["requests"] += 1
+            if fast:
+                self._stats["fast_path"] += 1
+                self._stats["fast_path_ms"] += elapsed_ms
+            else:
+                self._stats["llm_fallback"] += 1
+
+        info = {"router": "fast_path" if fast else "llm", "confidence": round(confidence, 3),
+                "candidate": label, "classifier_ms": round(elapsed_ms, 2)}
+        return (label if fast else None), info
+
+    def classify(self, text: str, fallback: Callable[[str], str]) -> Tuple[str, Dict]:
+        """Label from the fast path when confident, otherwise from ``fallback`` (the LLM)"""
+        label, info = self.fast_label(text)
+        if label is None:
+            label = fallback(text)
+        return label, info
+
+    def stats(self) -> Dict:
+        """Fast-path hit rate and latency"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = round(stats["fast_path"] / stats["requests"], 3) if stats["requests"] else 0.0
+        stats["avg_fast_path_ms"] = round(stats["fast_path_ms"] / stats["fast_path"], 2) if stats["fast_path"] else 0.0
+        stats["fast_path_ms"] = round(stats["fast_path_ms"], 2)
+        stats["confidence_threshold"] = self.confidence
+        return stats
+
+# Classifiers used by the graphs, trained from the labeled intakes in data/
+case_type_classifier = CentroidClassifier(load_examples("case_type_intakes.json"))
+agent_classifier = CentroidClassifier(load_examples("agent_intakes.json"))
+
+if __name__ == "__main__":
+    # Leave-one-out check of the labeled intakes: accuracy, hit rate and latency
+    # python -m agent_service.case_classifier
+    for filename in ("case_type_intakes.json", "agent_intakes.json"):
+        examples = load_examples(filename)
+        correct = fast = total = 0
+        latencies = []
+        for label, texts in examples.items():
+            for i, text in enumerate(texts):
+                held_out = {l: [t for j, t in enumerate(ts) if (l, j) != (label, i)] for l, ts in examples.items()}
+                classifier = CentroidClassifier(held_out)
+                classifier._fit()
+                start = time.perf_counter()
+                predicted, info = classifier.fast_label(text)
+                latencies.append((time.perf_counter() - start) * 1000)
+                total += 1
+                if predicted is not None:
+                    fast += 1
+                    correct += predicted == label
+        latencies.sort()
+        print(f"{filename}: fast path {fast}/{total}, accuracy on fast path "
+              f"{correct / max(fast, 1):.2%}, p50 {latencies[len(latencies) // 2]:.1f} ms")
@@ -11,6 +11,7 @@ from .supabase_client import insert_intake, patch_intake
 from .nodes.types import Ctx
 from .human_in_loop import require_human_review
 from .parallel_execution import parallel_specialists, specialist_pool
+from .case_classifier import case_type_classifier
 
 # Define state structure (following official patterns)
 class SmartProBonoState(Dict[str, Any]):
@@ -42,8 +43,8 @@ def _wrap(fn: Callable[[Ctx], SmartProBonoState]):
     return inner
 
 # Node Functions (following official patterns)
-def classify_case_type(ctx: Ctx) -> SmartProBonoState:
-    """Classifier node - determines case type"""
+def _classify_with_llm(text: str) -> str:
+    """Ask the LLM for the case type (used when the local classifier is unsure)"""
     llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
     
     system_prompt = """
@@ -60,10 +61,20 @@ def classify_case_type(ctx: Ctx) -> SmartProBonoState:
     
     response = llm.invoke([
         {"role": "system", "content": system_prompt},
-        {"role": "user", "content": ctx.state["raw_text"]}
+        {"role": "user", "content": text}
     ])
+    return response.content.strip().lower()
+
+def classify_case_type(ctx: Ctx) -> SmartProBonoState:
+    """Classifier node - determines case type
+
+    Uses the local nearest-centroid classifier and only calls the LLM when it
+    is not confident.
+    """
+    case_type, routing = case_type_classifier.classify(ctx.state["raw_text"], _classify_with_llm)
     
-    ctx.state["case_type"] = response.content.strip().lower()
+    ctx.state["case_type"] = case_type
+    ctx.state["meta"] = {**(ctx.state.get("meta") or {}), "classification": routing}
     ctx.state["current_step"] = "classified"
     return ctx.state
 
@@ -81,5 +81,11 @@ def graph_info():
         "parallel_execution_enabled": os.environ.get("ENABLE_PARALLEL_EXECUTION") == "true"
     }
 
+@app.get("/classifier/stats")
+def classifier_stats():
+    """Fast-path hit rate and latency of the local case-type classifier"""
+    from .case_classifier import case_type_classifier
+    return {"case_type": case_type_classifier.stats()}
+
 # Add human review endpoints
 create_review_endpoint(app)
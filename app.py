@@ -15,6 +15,7 @@ from datetime import datetime
 import requests
 import re
 import logging
+from agent_router import KeywordRouter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -60,24 +61,16 @@ if ADVANCED_SERVICES_AVAILABLE:
     document_service = DocumentService()
     auth_service = AuthService()
 
+# Agent keyword sets in priority order (earlier agents win ties)
+AGENT_ROUTER = KeywordRouter([
+    ('compliance', ['gdpr', 'compliance', 'privacy', 'data protection', 'regulation']),
+    ('business', ['business', 'company', 'startup', 'funding', 'contract', 'agreement']),
+    ('document', ['document', 'contract', 'agreement', 'template', 'form']),
+])
+
 def route_to_agent(message):
     """Route message to appropriate AI agent"""
-    lower_message = message.lower().strip()
-    
-    # Compliance keywords
-    if any(keyword in lower_message for keyword in ['gdpr', 'compliance', 'privacy', 'data protection', 'regulation']):
-        return 'compliance'
-    
-    # Business keywords
-    if any(keyword in lower_message for keyword in ['business', 'company', 'startup', 'funding', 'contract', 'agreement']):
-        return 'business'
-    
-    # Document keywords
-    if any(keyword in lower_message for keyword in ['document', 'contract', 'agreement', 'template', 'form']):
-        return 'document'
-    
-    # Default to greeting
-    return 'greeting'
+    return AGENT_ROUTER.route(message)
 
 def generate_ai_response(message, agent_type):
     """Generate AI response using advanced service if available"""
@@ -2,6 +2,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_pymongo import PyMongo
 from flask_migrate import Migrate
+from sqlalchemy.exc import SQLAlchemyError
 
 # Initialize database objects
 db = SQLAlchemy()
@@ -12,4 +13,25 @@ def init_db(app):
     """Initialize database connections."""
     db.init_app(app)
     mongo.init_app(app)
-    migrate.init_app(app, db) 
\ No newline at end of file
+    migrate.init_app(app, db) 
+    
+    with app.app_context():
+        create_missing_tables(app)
+
+def create_missing_tables(app):
+    """Create the tables of models added since the database was set up.
+    
+    Existing tables are left as they are. Document reads select the version
+    count from document_versions, so its table has to exist before the first
+    request, not only after the manage.py backfill commands.
+    """
+    import models  # noqa: F401 - registers every model's table
+    from models.search import forget_search_tables
+    try:
+        db.create_all()
+    except SQLAlchemyError:
+        # Another worker starting at the same time may have created them first
+        app.logger.warning("Creating missing tables failed; retrying", exc_info=True)
+        db.create_all()
+    # Documents saved from now on are indexed even if the search tables were seen missing
+    forget_search_tables()
@@ -71,6 +71,66 @@ def seed_rights():
     db.session.commit()
     click.echo("Legal rights seeded successfully.")
 
+@cli.command("backfill-document-tags")
+@click.option("--batch-size", default=1000, help="Documents indexed per transaction.")
+def backfill_document_tags(batch_size):
+    """Create the tag index tables and index the tags of existing documents."""
+    from models.document import DocumentTag
+    
+    db.create_all()
+    scanned = DocumentTag.backfill(batch_size=batch_size)
+    click.echo(f"Indexed tags of {scanned} documents.")
+
+@cli.command("create-document-indexes")
+def create_document_indexes():
+    """Create the indexes behind keyset pagination if they are missing.
+    
+    db.create_all() only creates indexes together with new tables, so existing
+    deployments run this once. On Postgres the indexes are built CONCURRENTLY,
+    without blocking writes to documents. The Mongo index behind case document
+    pages is created too.
+    """
+    from sqlalchemy import text
+    from database import mongo
+    from models.document import Document
+    from routes.document_listings import ensure_case_documents_index
+    
+    table = Document.__table__
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if connection.dialect.name == 'postgresql':
+                columns = ', '.join(column.name for column in index.columns)
+                connection.execute(text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {table.name} ({columns})"
+                ))
+            else:
+                index.create(connection, checkfirst=True)
+            click.echo(f"Index {index.name} is in place.")
+    
+    ensure_case_documents_index(mongo.db.documents)
+    click.echo("Index case_upload_date is in place.")
+
+@cli.command("migrate-document-history")
+@click.option("--batch-size", default=100, help="Documents migrated per transaction.")
+def migrate_document_history(batch_size):
+    """Create the version store table and move JSON version histories into it."""
+    from models.document import DocumentVersion
+    
+    db.create_all()
+    migrated = DocumentVersion.migrate_history(batch_size=batch_size)
+    click.echo(f"Migrated version history of {migrated} documents.")
+
+@cli.command("index-document-search")
+@click.option("--batch-size", default=500, help="Documents indexed per transaction.")
+def index_document_search(batch_size):
+    """Create the full-text search tables and index every existing document."""
+    from models.search import DocumentSearch
+    
+    db.create_all()
+    indexed = DocumentSearch.backfill(batch_size=batch_size)
+    click.echo(f"Indexed {indexed} documents for search.")
+
 # Flask-Migrate commands are automatically added by the Flask CLI
 
 if __name__ == "__main__":
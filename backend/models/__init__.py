@@ -1,6 +1,7 @@
 """Models package initialization."""
 from .user import User
-from .document import Document
+from .document import Document, DocumentTag, TagCount, DocumentVersion
+from .search import DocumentSearch
 from .notification import Notification
 from .case import Case
 from .audit import (
@@ -12,6 +13,10 @@ from .audit import (
 __all__ = [
     'User',
     'Document',
+    'DocumentTag',
+    'TagCount',
+    'DocumentVersion',
+    'DocumentSearch',
     'Notification',
     'Case',
     'AuditLog',
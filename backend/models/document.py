@@ -1,9 +1,25 @@
 """
 Document model for the SmartProBono application.
 """
+import os
+import json
+import zlib
 from datetime import datetime
+from difflib import SequenceMatcher
 from database import db
-import json
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import object_session
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Longest tag kept in the tag index
+MAX_TAG_LENGTH = 100
+# A version is stored in full at least this often; the ones between are diffs
+VERSION_SNAPSHOT_INTERVAL = int(os.environ.get('VERSION_SNAPSHOT_INTERVAL', 20))
+
+
+def normalize_tag(tag):
+    """Canonical form of a tag for the tag index."""
+    return str(tag).strip().lower()[:MAX_TAG_LENGTH]
 
 class Document(db.Model):
     """Document model for storing legal documents."""
@@ -22,8 +38,23 @@ class Document(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     _tags = db.Column('tags', db.Text, nullable=True)
+    # Legacy JSON version history; moved into document_versions by migrate_history
     _history = db.Column('history', db.Text, nullable=True)
     
+    # Normalized copy of the tags, maintained by the tags setter
+    tag_rows = db.relationship('DocumentTag', backref='document', cascade='all, delete-orphan', lazy='select')
+    # Past versions, queried on demand rather than loaded with the document
+    versions = db.relationship(
+        'DocumentVersion', backref='document', cascade='all, delete-orphan', lazy='dynamic',
+        order_by='DocumentVersion.version'
+    )
+    
+    # Keyset pagination reads these newest first: (owner or case, updated_at, id)
+    __table_args__ = (
+        db.Index('ix_documents_user_updated', 'uploaded_by', 'updated_at', 'id'),
+        db.Index('ix_documents_case_updated', 'case_id', 'updated_at', 'id'),
+    )
+    
     @property
     def tags(self):
         """Get document tags as a list."""
@@ -38,24 +69,25 @@ class Document(db.Model):
             self._tags = json.dumps(value)
         else:
             self._tags = None
-            
-    @property
-    def history(self):
-        """Get document version history as a list."""
-        if not self._history:
-            return []
-        return json.loads(self._history)
+        self.sync_tag_index()
         
+    def sync_tag_index(self):
+        """Bring the document_tags rows in line with the tags list, adding and removing only the difference."""
+        wanted = {normalize_tag(tag) for tag in self.tags} - {''}
+        existing = {row.tag: row for row in self.tag_rows}
+        for tag, row in existing.items():
+            if tag not in wanted:
+                self.tag_rows.remove(row)
+        for tag in wanted - existing.keys():
+            self.tag_rows.append(DocumentTag(tag=tag, user_id=self.uploaded_by))
+            
     def add_version(self, content):
         """Add a version to the document history."""
-        current_history = self.history
-        new_version = {
-            'content': content,
-            'timestamp': datetime.utcnow().isoformat(),
-            'version': len(current_history) + 1
-        }
-        current_history.append(new_version)
-        self._history = json.dumps(current_history)
+        return DocumentVersion.record(self, content)
+        
+    def get_version(self, version):
+        """Get the content of a past version, or None if there is no such version."""
+        return DocumentVersion.contents(self.id, version, version).get(version)
         
     def to_dict(self):
         """Convert document to a dictionary."""
@@ -73,5 +105,284 @@ class Document(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'tags': self.tags,
-            'version_count': len(self.history)
-        } 
\ No newline at end of file
+            'version_count': self.version_count or 0
+        }
+
+
+class DocumentTag(db.Model):
+    """One row per (document, tag): the index behind tag counts and tag search."""
+    __tablename__ = 'document_tags'
+
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String(MAX_TAG_LENGTH), primary_key=True)
+    # Copy of documents.uploaded_by, so per-user tag queries stay on this table
+    user_id = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_document_tags_user_tag', 'user_id', 'tag', 'document_id'),
+        db.Index('ix_document_tags_tag_document', 'tag', 'document_id'),
+    )
+
+    @classmethod
+    def search(cls, user_id, tags, match='any'):
+        """
+        Query for a user's documents with any (or all) of the given tags.
+
+        Args:
+            user_id: Owner of the documents
+            tags (list): Tags to match
+            match (str): 'any' or 'all'
+
+        Returns:
+            Query: Documents, most recently updated first
+        """
+        tags = sorted({normalize_tag(tag) for tag in tags} - {''})
+        matching = db.session.query(cls.document_id).filter(cls.user_id == user_id, cls.tag.in_(tags))
+        if match == 'all':
+            matching = matching.group_by(cls.document_id).having(func.count(cls.tag) == len(tags))
+        return Document.query.filter(Document.id.in_(matching)).order_by(
+            Document.updated_at.desc(), Document.id.desc()
+        )
+
+    @classmethod
+    def backfill(cls, batch_size=1000):
+        """
+        Index the tags of existing documents and rebuild the tag counts.
+
+        Safe to run again: documents already indexed are left unchanged.
+
+        Returns:
+            int: Number of documents scanned
+        """
+        scanned = 0
+        last_id = 0
+        while True:
+            batch = Document.query.filter(Document.id > last_id, Document._tags.isnot(None)).order_by(
+                Document.id
+            ).limit(batch_size).all()
+            if not batch:
+                break
+            for document in batch:
+                document.sync_tag_index()
+            db.session.commit()
+            scanned += len(batch)
+            last_id = batch[-1].id
+        TagCount.rebuild()
+        return scanned
+
+
+class TagCount(db.Model):
+    """Number of documents per tag, updated as document_tags rows come and go."""
+    __tablename__ = 'tag_counts'
+
+    tag = db.Column(db.String(MAX_TAG_LENGTH), primary_key=True)
+    document_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_tag_counts_count_tag', 'document_count', 'tag'),
+    )
+
+    @classmethod
+    def most_common(cls, limit=20):
+        """The most used tags, as (tag, count) pairs."""
+        rows = cls.query.filter(cls.document_count > 0).order_by(
+            cls.document_count.desc(), cls.tag
+        ).limit(limit).all()
+        return [(row.tag, row.document_count) for row in rows]
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every tag from document_tags."""
+        cls.query.delete()
+        counts = db.session.query(DocumentTag.tag, func.count(DocumentTag.document_id)).group_by(DocumentTag.tag)
+        db.session.execute(cls.__table__.insert().from_select(['tag', 'document_count'], counts))
+        db.session.commit()
+
+
+def make_delta(old, new):
+    """
+    Line diff that turns old into new.
+
+    Returns:
+        list: [start, end, text] edits; old lines start..end are replaced by text
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    return [
+        [i1, i2, ''.join(new_lines[j1:j2])]
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines).get_opcodes()
+        if tag != 'equal'
+    ]
+
+
+def apply_delta(old, delta):
+    """Apply a make_delta diff to old."""
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    position = 0
+    for start, end, text in delta:
+        parts.extend(old_lines[position:start])
+        parts.append(text)
+        position = end
+    parts.extend(old_lines[position:])
+    return ''.join(parts)
+
+
+class DocumentVersion(db.Model):
+    """
+    A past version of a document's content.
+
+    Every VERSION_SNAPSHOT_INTERVAL versions (and whenever a diff would be
+    larger) the content is stored in full; the versions between store a
+    compressed line diff against the previous version. Reading a version
+    replays at most one snapshot interval of diffs, and recording one writes
+    a row the size of the edit.
+    """
+    __tablename__ = 'document_versions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    # Snapshot the diff chain starts from; equal to version for snapshots
+    base_version = db.Column(db.Integer, nullable=False)
+    is_snapshot = db.Column(db.Boolean, nullable=False, default=False)
+    # zlib-compressed content (snapshots) or JSON diff (the rest)
+    data = db.Column(db.LargeBinary, nullable=False)
+    content_length = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('document_id', 'version', name='uq_document_versions_document_version'),
+    )
+
+    @classmethod
+    def record(cls, document, content, created_at=None):
+        """
+        Store the next version of a document.
+
+        Args:
+            document (Document): The document
+            content (str): The version's content
+            created_at (datetime, optional): When the version was made
+
+        Returns:
+            DocumentVersion: The new row, added to the session
+        """
+        content = content or ''
+        session = object_session(document) or db.session
+        session.add(document)
+        # Flush first: a new document needs an id, and versions added since
+        # the last flush must count when numbering this one
+        session.flush()
+        last = document.versions.order_by(None).order_by(cls.version.desc()).first()
+        row = cls(version=(last.version + 1) if last else 1, content_length=len(content),
+                  created_at=created_at or datetime.utcnow())
+        snapshot = zlib.compress(content.encode('utf-8'))
+        if last is not None and row.version - last.base_version < VERSION_SNAPSHOT_INTERVAL:
+            previous = cls.contents(document.id, last.version, last.version)[last.version]
+            delta = zlib.compress(json.dumps(make_delta(previous, content)).encode('utf-8'))
+            if len(delta) < len(snapshot):
+                row.data, row.is_snapshot, row.base_version = delta, False, last.base_version
+        if row.data is None:
+            row.data, row.is_snapshot, row.base_version = snapshot, True, row.version
+        document.versions.append(row)
+        return row
+
+    @classmethod
+    def contents(cls, document_id, first, last):
+        """
+        Rebuild the content of a range of versions in one pass.
+
+        Args:
+            document_id (int): The document
+            first (int): First version wanted
+            last (int): Last version wanted
+
+        Returns:
+            dict: Content by version number, for the versions that exist
+        """
+        start = db.session.query(cls.base_version).filter_by(document_id=document_id, version=first).scalar()
+        if start is None:
+            return {}
+        rows = db.session.query(cls.version, cls.is_snapshot, cls.data).filter(
+            cls.document_id == document_id, cls.version.between(start, last)
+        ).order_by(cls.version)
+        result = {}
+        content = ''
+        for version, is_snapshot, data in rows:
+            data = zlib.decompress(data).decode('utf-8')
+            content = data if is_snapshot else apply_delta(content, json.loads(data))
+            if version >= first:
+                result[version] = content
+        return result
+
+    @classmethod
+    def migrate_history(cls, batch_size=100):
+        """
+        Move the legacy JSON history of existing documents into document_versions.
+
+        Safe to run again: documents already migrated have no JSON history left.
+
+        Returns:
+            int: Number of documents migrated
+        """
+        migrated = 0
+        last_id = 0
+        while True:
+            batch = Document.query.filter(Document.id > last_id, Document._history.isnot(None)).order_by(
+                Document.id
+            ).limit(batch_size).all()
+            if not batch:
+                break
+            for document in batch:
+                if document.versions.count() == 0:
+                    for entry in json.loads(document._history):
+                        created_at = datetime.fromisoformat(entry['timestamp']) if entry.get('timestamp') else None
+                        cls.record(document, entry.get('content'), created_at)
+                        db.session.flush()
+                document._history = None
+            db.session.commit()
+            migrated += len(batch)
+            last_id = batch[-1].id
+        return migrated
+
+
+# Latest version number, loaded in the same SELECT as the document
+Document.version_count = db.column_property(
+    select(func.max(DocumentVersion.version)).where(
+        DocumentVersion.document_id == Document.id
+    ).correlate_except(DocumentVersion).scalar_subquery()
+)
+
+
+def _change_tag_count(connection, tag, delta):
+    """Add delta to a tag's document count, creating the counter if needed."""
+    table = TagCount.__table__
+    dialect = connection.dialect.name
+    if delta > 0 and dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(table)
+        connection.execute(insert.values(tag=tag, document_count=delta).on_conflict_do_update(
+            index_elements=[table.c.tag], set_={'document_count': table.c.document_count + delta}
+        ))
+        return
+    result = connection.execute(
+        table.update().where(table.c.tag == tag).values(document_count=table.c.document_count + delta)
+    )
+    if result.rowcount == 0 and delta > 0:
+        connection.execute(table.insert().values(tag=tag, document_count=delta))
+
+
+@event.listens_for(DocumentTag, 'after_insert')
+def _count_tag_added(mapper, connection, target):
+    _change_tag_count(connection, target.tag, 1)
+
+
+@event.listens_for(DocumentTag, 'after_delete')
+def _count_tag_removed(mapper, connection, target):
+    _change_tag_count(connection, target.tag, -1)
+
+
+@event.listens_for(Document.uploaded_by, 'set')
+def _sync_tag_owner(document, value, oldvalue, initiator):
+    for row in document.tag_rows:
+        row.user_id = value
@@ -0,0 +1,321 @@
+"""
+Full-text search index for the SmartProBono application.
+
+One document_search row per document holds the text that is searched: the
+title, the content and any OCR output. On Postgres the row carries a weighted
+tsvector behind a GIN index and results are ranked with ts_rank. On SQLite
+(local development) the text is mirrored into an FTS5 table and ranked with
+bm25. Rows are kept current by ORM events as documents are created, edited
+and deleted, and by set_ocr_text when OCR finishes.
+
+init_db creates the search tables when the app starts. Until they exist
+(e.g. a script that skips init_db against an older database) documents are
+saved unindexed with a warning; `manage.py index-document-search` indexes
+them afterwards.
+"""
+import os
+import re
+import html
+import logging
+from datetime import datetime
+from database import db
+from sqlalchemy import event, func, inspect, literal_column, text
+from sqlalchemy.dialects import postgresql, sqlite
+from .document import Document
+
+# Text search configuration used for stemming on Postgres
+SEARCH_LANGUAGE = os.environ.get('SEARCH_LANGUAGE', 'english')
+# Longest text indexed per field; Postgres caps a tsvector at 1MB
+MAX_INDEXED_LENGTH = int(os.environ.get('SEARCH_MAX_INDEXED_LENGTH', 500000))
+FTS_TABLE = 'document_search_fts'
+
+logger = logging.getLogger(__name__)
+# Whether the search tables exist, per engine; see forget_search_tables
+_search_tables = {}
+
+# Snippet markers, swapped for <mark> tags once the snippet is HTML-escaped
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+_HEADLINE_OPTIONS = f'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=30, MinWords=10, MaxFragments=2'
+
+
+def _language():
+    """The search configuration as a regconfig literal, as to_tsvector expects."""
+    return literal_column(f"'{SEARCH_LANGUAGE}'::regconfig")
+
+
+def _weighted_vector(table):
+    """tsvector of a document_search row: title (A), content (B), OCR text (C)."""
+    def weighted(column, weight):
+        return func.setweight(func.to_tsvector(_language(), func.coalesce(column, '')), weight)
+    return weighted(table.c.title, 'A').op('||')(weighted(table.c.content, 'B')).op('||')(
+        weighted(table.c.ocr_text, 'C'))
+
+
+def _clip(value):
+    return (value or '')[:MAX_INDEXED_LENGTH]
+
+
+def _highlight(snippet):
+    """Escape a snippet for HTML and mark the matched terms."""
+    return html.escape(snippet or '').replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def _owner_token(user_id):
+    """Token naming a document's owner in the FTS5 owner column."""
+    return f"owner{user_id}"
+
+
+def _fts5_query(query, user_id):
+    """
+    Turn free text into an FTS5 query for a user's documents containing all of its words.
+
+    The owner term lets FTS5 intersect the owner's and the words' posting
+    lists instead of ranking every matching document and filtering after.
+    """
+    words = ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+    # The words are matched against the text columns only, never the owner token
+    return f'owner:"{_owner_token(user_id)}" AND {{title content ocr_text}}: ({words})' if words else ''
+
+
+class DocumentSearch(db.Model):
+    """The searchable text of a document."""
+    __tablename__ = 'document_search'
+
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    title = db.Column(db.Text, nullable=True)
+    content = db.Column(db.Text, nullable=True)
+    ocr_text = db.Column(db.Text, nullable=True)
+    # Weighted title (A), content (B) and OCR text (C); only populated on Postgres
+    search_vector = db.Column(db.Text().with_variant(postgresql.TSVECTOR(), 'postgresql'), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_document_search_user', 'user_id'),
+        db.Index('ix_document_search_vector', 'search_vector', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
+    @classmethod
+    def search(cls, user_id, query, page=1, limit=20):
+        """
+        Rank a user's documents against a free-text query.
+
+        Postgres accepts web search syntax ("quoted phrases", or, -excluded);
+        SQLite matches documents containing every word.
+
+        Args:
+            user_id: Owner of the documents
+            query (str): The search text
+            page (int): 1-based page number
+            limit (int): Results per page
+
+        Returns:
+            tuple: (list of {'document_id', 'title', 'rank', 'snippet'}, total matches)
+        """
+        connection = db.session.connection()
+        dialect = connection.dialect.name
+        if dialect == 'postgresql':
+            return cls._search_postgresql(user_id, query, page, limit)
+        if dialect == 'sqlite':
+            return cls._search_sqlite(user_id, query, page, limit)
+        return cls._search_like(user_id, query, page, limit)
+
+    @classmethod
+    def _search_postgresql(cls, user_id, query, page, limit):
+        tsquery = func.websearch_to_tsquery(_language(), query)
+        matches = cls.query.filter(cls.user_id == user_id, cls.search_vector.op('@@')(tsquery))
+        total = matches.count()
+        rank = func.ts_rank(cls.search_vector, tsquery)
+        top = matches.with_entities(cls.document_id, rank.label('rank')).order_by(
+            rank.desc(), cls.document_id.desc()
+        ).limit(limit).offset((page - 1) * limit).subquery()
+        # Headlines are expensive, so only the page's rows get one
+        body = func.concat_ws(' ', cls.title, cls.content, cls.ocr_text)
+        rows = db.session.query(
+            cls.document_id, cls.title, top.c.rank,
+            func.ts_headline(_language(), body, tsquery, _HEADLINE_OPTIONS)
+        ).join(top, top.c.document_id == cls.document_id).order_by(top.c.rank.desc(), cls.document_id.desc())
+        return [cls._result(*row) for row in rows], total
+
+    @classmethod
+    def _search_sqlite(cls, user_id, query, page, limit):
+        match = _fts5_query(query, user_id)
+        if not match:
+            return [], 0
+        params = {'match': match, 'limit': limit, 'offset': (page - 1) * limit}
+        total = db.session.execute(text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"), params).scalar()
+        top = db.session.execute(text(f"""
+            SELECT rowid, -bm25({FTS_TABLE}, 10.0, 4.0, 1.0, 0.0) AS rank
+            FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match
+            ORDER BY rank DESC, rowid DESC
+            LIMIT :limit OFFSET :offset
+        """), params).all()
+        if not top:
+            return [], total
+        # Snippets are expensive, so only the page's rows get one
+        page_ids = ', '.join(str(int(document_id)) for document_id, _ in top)
+        details = {row[0]: row[1:] for row in db.session.execute(text(f"""
+            SELECT {FTS_TABLE}.rowid, document_search.title,
+                   snippet({FTS_TABLE}, -1, '{_MARK_START}', '{_MARK_END}', '...', 24)
+            FROM {FTS_TABLE} JOIN document_search ON document_search.document_id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :match AND {FTS_TABLE}.rowid IN ({page_ids})
+        """), params)}
+        results = []
+        for document_id, rank in top:
+            title, snippet = details[document_id]
+            results.append(cls._result(document_id, title, rank, snippet))
+        return results, total
+
+    @classmethod
+    def _search_like(cls, user_id, query, page, limit):
+        pattern = f"%{query}%"
+        matches = cls.query.filter(cls.user_id == user_id, db.or_(
+            cls.title.ilike(pattern), cls.content.ilike(pattern), cls.ocr_text.ilike(pattern)
+        ))
+        rows = matches.order_by(cls.updated_at.desc()).limit(limit).offset((page - 1) * limit).all()
+        return [cls._result(row.document_id, row.title, 0.0, (row.content or row.ocr_text or '')[:200])
+                for row in rows], matches.count()
+
+    @staticmethod
+    def _result(document_id, title, rank, snippet):
+        return {'document_id': document_id, 'title': title, 'rank': float(rank or 0),
+                'snippet': _highlight(snippet)}
+
+    @classmethod
+    def matching_ids(cls, user_id, query):
+        """Subquery of the IDs of a user's documents that match a query."""
+        dialect = db.session.connection().dialect.name
+        if dialect == 'postgresql':
+            tsquery = func.websearch_to_tsquery(_language(), query)
+            return db.session.query(cls.document_id).filter(
+                cls.user_id == user_id, cls.search_vector.op('@@')(tsquery)
+            )
+        if dialect == 'sqlite':
+            match = _fts5_query(query, user_id)
+            if not match:
+                return db.session.query(cls.document_id).filter(db.false())
+            return text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(
+                match=match
+            ).columns(rowid=db.Integer)
+        pattern = f"%{query}%"
+        return db.session.query(cls.document_id).filter(cls.user_id == user_id, db.or_(
+            cls.title.ilike(pattern), cls.content.ilike(pattern), cls.ocr_text.ilike(pattern)
+        ))
+
+    @classmethod
+    def set_ocr_text(cls, document_id, ocr_text):
+        """Index the OCR output of a document; call when OCR completes."""
+        document = Document.query.get(document_id)
+        if document is None:
+            return False
+        _index_document(db.session.connection(), document, ocr_text=_clip(ocr_text))
+        db.session.commit()
+        return True
+
+    @classmethod
+    def backfill(cls, batch_size=500):
+        """
+        Index every existing document, keeping OCR text already indexed.
+
+        Returns:
+            int: Number of documents indexed
+        """
+        indexed = 0
+        last_id = 0
+        while True:
+            batch = Document.query.filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+            if not batch:
+                break
+            connection = db.session.connection()
+            for document in batch:
+                _index_document(connection, document)
+            db.session.commit()
+            indexed += len(batch)
+            last_id = batch[-1].id
+        return indexed
+
+
+def forget_search_tables():
+    """Drop the cached answers of _search_tables_exist, e.g. after creating tables."""
+    _search_tables.clear()
+
+
+def _search_tables_exist(connection):
+    """Whether document_search (and on SQLite its FTS5 table) exists; checked once per engine."""
+    exists = _search_tables.get(connection.engine)
+    if exists is None:
+        inspector = inspect(connection)
+        tables = [DocumentSearch.__tablename__] + ([FTS_TABLE] if connection.dialect.name == 'sqlite' else [])
+        exists = _search_tables[connection.engine] = all(inspector.has_table(table) for table in tables)
+    return exists
+
+
+def _index_document(connection, document, ocr_text=None):
+    """Write a document's searchable text, and its tsvector or FTS5 row."""
+    if not _search_tables_exist(connection):
+        logger.warning("Search tables are missing; document %s was not indexed. "
+                       "Run manage.py index-document-search.", document.id)
+        return
+    table = DocumentSearch.__table__
+    dialect = connection.dialect.name
+    values = {'document_id': document.id, 'user_id': document.uploaded_by, 'title': _clip(document.title),
+              'content': _clip(document.content), 'updated_at': datetime.utcnow()}
+    if ocr_text is not None:
+        values['ocr_text'] = ocr_text
+    changed = {key: value for key, value in values.items() if key != 'document_id'}
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(table)
+        connection.execute(insert.values(**values).on_conflict_do_update(
+            index_elements=[table.c.document_id], set_=changed
+        ))
+    elif connection.execute(table.update().where(table.c.document_id == document.id).values(**changed)).rowcount == 0:
+        connection.execute(table.insert().values(**values))
+
+    if dialect == 'postgresql':
+        connection.execute(table.update().where(table.c.document_id == document.id).values(
+            search_vector=_weighted_vector(table)
+        ))
+    elif dialect == 'sqlite':
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': document.id})
+        connection.execute(text(f"""
+            INSERT INTO {FTS_TABLE} (rowid, title, content, ocr_text, owner)
+            SELECT document_id, title, content, ocr_text, :owner FROM document_search WHERE document_id = :id
+        """), {'id': document.id, 'owner': _owner_token(document.uploaded_by)})
+
+
+@event.listens_for(DocumentSearch.__table__, 'after_create')
+def _create_fts_table(table, connection, **kw):
+    forget_search_tables()
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, content, ocr_text, owner, tokenize='porter unicode61')"
+        ))
+
+
+@event.listens_for(DocumentSearch.__table__, 'after_drop')
+def _drop_fts_table(table, connection, **kw):
+    forget_search_tables()
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+@event.listens_for(Document, 'after_insert')
+def _index_new_document(mapper, connection, target):
+    _index_document(connection, target)
+
+
+@event.listens_for(Document, 'after_update')
+def _reindex_document(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ('title', 'content', 'uploaded_by')):
+        _index_document(connection, target)
+
+
+@event.listens_for(Document, 'after_delete')
+def _unindex_document(mapper, connection, target):
+    if not _search_tables_exist(connection):
+        return
+    connection.execute(DocumentSearch.__table__.delete().where(DocumentSearch.document_id == target.id))
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': target.id})
@@ -0,0 +1,290 @@
+"""
+Read endpoints over the indexed document tables.
+
+Listings page newest first with keyset cursors (utils/pagination.py), version
+history pages by version number, and tag and full-text search read the
+document_tags and document_search indexes. Write endpoints stay in
+routes/documents.py.
+"""
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+import logging
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from database import db, mongo
+from models.document import Document, DocumentTag, TagCount, DocumentVersion
+from models.search import DocumentSearch
+from utils.pagination import (
+    InvalidCursor, encode_cursor, decode_cursor, page_size, keyset_page, count_total
+)
+
+bp = Blueprint('document_listings', __name__, url_prefix='/api/documents')
+logger = logging.getLogger(__name__)
+
+# Index behind case document pages: (case_id, upload_date, _id), newest first
+CASE_DOCUMENTS_INDEX = [('case_id', 1), ('upload_date', -1), ('_id', -1)]
+
+def ensure_case_documents_index(collection):
+    """Create the Mongo index behind case document pages (manage.py create-document-indexes)."""
+    collection.create_index(CASE_DOCUMENTS_INDEX, name='case_upload_date')
+
+@bp.route('', methods=['GET'])
+@jwt_required()
+def list_documents():
+    """List documents, newest first, a cursor page at a time."""
+    try:
+        current_user_id = get_jwt_identity()
+        limit = page_size(request.args.get('limit'))
+        query = Document.query.filter(Document.uploaded_by == current_user_id)
+
+        # Apply filters from query parameters
+        for param in ['document_type', 'case_id']:
+            if param in request.args:
+                query = query.filter(getattr(Document, param) == request.args.get(param))
+
+        # Handle search query
+        search_query = request.args.get('search')
+        if search_query:
+            query = query.filter(Document.id.in_(DocumentSearch.matching_ids(current_user_id, search_query)))
+
+        # Filter by tags (comma-separated list)
+        if 'tags' in request.args:
+            tagged = DocumentTag.search(current_user_id, request.args.get('tags').split(','))
+            query = query.filter(Document.id.in_(tagged.with_entities(Document.id).order_by(None)))
+
+        # Filter by date range
+        if 'start_date' in request.args and 'end_date' in request.args:
+            query = query.filter(Document.created_at.between(
+                datetime.fromisoformat(request.args.get('start_date')),
+                datetime.fromisoformat(request.args.get('end_date'))
+            ))
+
+        documents, next_cursor = keyset_page(
+            query, Document.updated_at, Document.id, limit, request.args.get('cursor')
+        )
+        total, total_exact = count_total(query, db.session)
+
+        return jsonify({
+            'documents': [doc.to_dict() for doc in documents],
+            'next_cursor': next_cursor,
+            'limit': limit,
+            'total': total,
+            'total_exact': total_exact
+        }), 200
+
+    except ValueError as e:
+        # A bad cursor or date
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error listing documents: {str(e)}")
+        return jsonify({'error': 'Failed to list documents'}), 500
+
+@bp.route('/history', methods=['GET'])
+@jwt_required()
+def get_document_history():
+    try:
+        # Get current user
+        current_user_id = get_jwt_identity()
+
+        # Query documents owned by the user or shared with them
+        # For now, we'll just return documents uploaded by the user
+        query = Document.query.filter_by(uploaded_by=current_user_id)
+        limit = page_size(request.args.get('limit'))
+        documents, next_cursor = keyset_page(
+            query, Document.updated_at, Document.id, limit, request.args.get('cursor')
+        )
+        total, total_exact = count_total(query, db.session)
+
+        # Convert to list of dictionaries
+        document_list = [doc.to_dict() for doc in documents]
+
+        return jsonify({
+            'documents': document_list,
+            'next_cursor': next_cursor,
+            'limit': limit,
+            'total': total,
+            'total_exact': total_exact
+        })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<int:document_id>/versions', methods=['GET'])
+@jwt_required()
+def get_document_versions(document_id):
+    try:
+        document = Document.query.get(document_id)
+        if not document:
+            return jsonify({'error': 'Document not found'}), 404
+
+        # Newest first, keyed by version number; the current content is the latest
+        current = (document.version_count or 0) + 1
+        limit = page_size(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        before = decode_cursor(cursor)[0] if cursor else current + 1
+        if type(before) is not int:
+            # e.g. a cursor from a listing, which holds a timestamp
+            raise InvalidCursor(f"Invalid cursor: {cursor}")
+        newest = min(before - 1, current)
+        oldest = max(1, newest - limit + 1)
+
+        versions = []
+        if newest == current:
+            versions.append({
+                'content': document.content,
+                'timestamp': document.updated_at.isoformat(),
+                'version': current,
+                'isCurrent': True
+            })
+        archived_newest = min(newest, current - 1)
+        if archived_newest >= oldest:
+            contents = DocumentVersion.contents(document.id, oldest, archived_newest)
+            timestamps = dict(db.session.query(DocumentVersion.version, DocumentVersion.created_at).filter(
+                DocumentVersion.document_id == document.id,
+                DocumentVersion.version.between(oldest, archived_newest)
+            ))
+            for number in range(archived_newest, oldest - 1, -1):
+                versions.append({
+                    'content': contents[number],
+                    'timestamp': timestamps[number].isoformat() if timestamps[number] else None,
+                    'version': number
+                })
+        next_cursor = encode_cursor(oldest, document.id) if oldest > 1 else None
+
+        return jsonify({
+            'versions': versions,
+            'next_cursor': next_cursor,
+            'limit': limit,
+            'total': current,
+            'total_exact': True
+        })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/tags/common', methods=['GET'])
+@jwt_required()
+def get_common_tags():
+    try:
+        # Counts are maintained in tag_counts as documents are tagged
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        tags = [{"tag": tag, "count": count} for tag, count in TagCount.most_common(limit)]
+
+        return jsonify({'tags': tags})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/search/tags', methods=['POST'])
+@jwt_required()
+def search_documents_by_tags():
+    try:
+        data = request.get_json()
+
+        if 'tags' not in data or not isinstance(data['tags'], list):
+            return jsonify({'error': 'Missing or invalid tags field'}), 400
+
+        # Get current user
+        current_user_id = get_jwt_identity()
+
+        match = data.get('match', 'any')
+        if match not in ('any', 'all'):
+            return jsonify({'error': "match must be 'any' or 'all'"}), 400
+        limit = min(int(data.get('limit', 50)), 200)
+
+        # Indexed lookup on document_tags (user_id, tag)
+        documents = DocumentTag.search(current_user_id, data['tags'], match).limit(limit).all()
+
+        return jsonify({'documents': [document.to_dict() for document in documents]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_documents():
+    """Full-text search over the user's documents, best match first."""
+    try:
+        current_user_id = get_jwt_identity()
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({'error': 'Search query is required'}), 400
+        page = max(1, request.args.get('page', 1, type=int))
+        limit = page_size(request.args.get('limit'))
+
+        results, total = DocumentSearch.search(current_user_id, query, page, limit)
+
+        return jsonify({
+            'results': results,
+            'page': page,
+            'limit': limit,
+            'total': total
+        })
+    except Exception as e:
+        logger.error(f"Error searching documents: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/case/<case_id>', methods=['GET'])
+@jwt_required()
+def get_case_documents(case_id):
+    try:
+        current_user_id = get_jwt_identity()
+
+        # Get case
+        try:
+            case_object_id = ObjectId(case_id)
+        except InvalidId:
+            return jsonify({'error': 'Invalid case ID'}), 400
+        case = mongo.db.cases.find_one({'_id': case_object_id})
+        if not case:
+            return jsonify({'error': 'Case not found'}), 404
+
+        # Get documents, newest first, starting after the cursor
+        collection = mongo.db.documents
+        criteria = {'case_id': case_object_id}
+        limit = page_size(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        page_criteria = dict(criteria)
+        if cursor:
+            upload_date, last_id = decode_cursor(cursor)
+            try:
+                last_object_id = ObjectId(last_id)
+            except (InvalidId, TypeError) as e:
+                raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+            if not isinstance(upload_date, datetime):
+                raise InvalidCursor(f"Invalid cursor: {cursor}")
+            page_criteria['$or'] = [
+                {'upload_date': {'$lt': upload_date}},
+                {'upload_date': upload_date, '_id': {'$lt': last_object_id}}
+            ]
+        documents = list(collection.find(page_criteria)
+                        .sort([('upload_date', -1), ('_id', -1)])
+                        .limit(limit + 1))
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor(documents[-1]['upload_date'], str(documents[-1]['_id']))
+        total = collection.count_documents(criteria)
+
+        # Convert ObjectId to string for JSON serialization
+        for doc in documents:
+            doc['_id'] = str(doc['_id'])
+            doc['case_id'] = str(doc['case_id'])
+            doc['uploaded_by'] = str(doc['uploaded_by'])
+            # Remove file_path from response for security
+            doc.pop('file_path', None)
+
+        return jsonify({
+            'documents': documents,
+            'next_cursor': next_cursor,
+            'limit': limit,
+            'total': total,
+            'total_exact': True
+        }), 200
+
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Get case documents error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -4,6 +4,7 @@ import re
 from bson import ObjectId
 from ..database import db, mongo
 from ..models.document import Document
+from ..models.search import DocumentSearch
 from ..models.user import User
 from ..services.email_service import send_document_share_email
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -173,28 +174,6 @@ def create_document():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@bp.route('/<int:document_id>/versions', methods=['GET'])
-@jwt_required()
-def get_document_versions(document_id):
-    try:
-        document = Document.query.get(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-            
-        versions = document.history
-        
-        # Add current version
-        versions.append({
-            'content': document.content,
-            'timestamp': document.updated_at.isoformat(),
-            'version': len(versions) + 1,
-            'isCurrent': True
-        })
-        
-        return jsonify(versions)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
 @bp.route('/<int:document_id>/versions/<int:version>', methods=['POST'])
 @jwt_required()
 def revert_to_version(document_id, version):
@@ -203,18 +182,16 @@ def revert_to_version(document_id, version):
         if not document:
             return jsonify({'error': 'Document not found'}), 404
             
-        history = document.history
-        if version < 1 or version > len(history):
-            return jsonify({'error': 'Invalid version number'}), 400
-            
         # Get the content from the specified version
-        target_version = history[version - 1]
+        target_content = document.get_version(version)
+        if target_content is None:
+            return jsonify({'error': 'Invalid version number'}), 400
         
         # Add current version to history
         document.add_version(document.content)
         
         # Update content with old version
-        document.content = target_version['content']
+        document.content = target_content
         document.updated_at = datetime.utcnow()
         
         db.session.commit()
@@ -349,24 +326,6 @@ def delete_document(document_id):
         logger.error(f"Error deleting document: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@bp.route('/history', methods=['GET'])
-@jwt_required()
-def get_document_history():
-    try:
-        # Get current user
-        current_user_id = get_jwt_identity()
-        
-        # Query documents owned by the user or shared with them
-        # For now, we'll just return documents uploaded by the user
-        documents = Document.query.filter_by(uploaded_by=current_user_id).all()
-        
-        # Convert to list of dictionaries
-        document_list = [doc.to_dict() for doc in documents]
-            
-        return jsonify({'documents': document_list})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
 @bp.route('/<int:document_id>/tags', methods=['PUT'])
 @jwt_required()
 def update_document_tags(document_id):
@@ -392,56 +351,6 @@ def update_document_tags(document_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@bp.route('/tags/common', methods=['GET'])
-@jwt_required()
-def get_common_tags():
-    try:
-        # This would be more efficient with a proper aggregation query
-        # For simplicity, we'll just collect all tags and count them
-        all_documents = Document.query.all()
-        tag_counts = {}
-        
-        for doc in all_documents:
-            for tag in doc.tags:
-                if tag in tag_counts:
-                    tag_counts[tag] += 1
-                else:
-                    tag_counts[tag] = 1
-                    
-        # Sort by count and get top 20
-        top_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:20]
-        
-        # Format the results
-        tags = [{"tag": tag, "count": count} for tag, count in top_tags]
-        
-        return jsonify({'tags': tags})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@bp.route('/search/tags', methods=['POST'])
-@jwt_required()
-def search_documents_by_tags():
-    try:
-        data = request.get_json()
-        
-        if 'tags' not in data or not isinstance(data['tags'], list):
-            return jsonify({'error': 'Missing or invalid tags field'}), 400
-        
-        # Get current user
-        current_user_id = get_jwt_identity()
-        
-        # This is a simplified approach - in a production app, you'd want to use a more efficient query
-        # For each tag, find documents containing that tag
-        matching_documents = []
-        for document in Document.query.filter_by(uploaded_by=current_user_id).all():
-            document_tags = document.tags
-            if any(tag in document_tags for tag in data['tags']):
-                matching_documents.append(document.to_dict())
-                
-        return jsonify({'documents': matching_documents})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
 @bp.route('/generate', methods=['POST'])
 @jwt_required()
 def generate_document():
@@ -585,8 +494,10 @@ def scan_document():
         # Get document type and user ID from form data
         document_type = request.form.get('documentType', 'general')
         user_id = request.form.get('userId')
+        document_id = request.form.get('documentId', type=int)
         
         # Get current user ID from JWT if available
+        current_user_id = None
         try:
             current_user_id = get_jwt_identity()
             if not user_id and current_user_id:
@@ -611,6 +522,12 @@ def scan_document():
             "documentType": document_type
         }
         
+        # Make the extracted text searchable on the signed-in owner's document
+        if document_id and current_user_id and ocr_result.get('extractedText'):
+            document = Document.query.get(document_id)
+            if document and str(document.uploaded_by) == str(current_user_id):
+                DocumentSearch.set_ocr_text(document_id, ocr_result['extractedText'])
+        
         # Log the operation
         logging.info(f"Document scanned: {file.filename}, type: {document_type}, user: {user_id}")
         
@@ -689,36 +606,6 @@ def upload_document(case_id):
         logger.error(f"Document upload error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-@bp.route('/case/<case_id>', methods=['GET'])
-@jwt_required()
-def get_case_documents(case_id):
-    try:
-        current_user_id = get_jwt_identity()
-        
-        # Get case
-        case = mongo.get_collection('cases').find_one({'_id': ObjectId(case_id)})
-        if not case:
-            return jsonify({'error': 'Case not found'}), 404
-            
-        # Get documents
-        documents = list(mongo.get_collection('documents')
-                        .find({'case_id': ObjectId(case_id)})
-                        .sort('upload_date', -1))
-        
-        # Convert ObjectId to string for JSON serialization
-        for doc in documents:
-            doc['_id'] = str(doc['_id'])
-            doc['case_id'] = str(doc['case_id'])
-            doc['uploaded_by'] = str(doc['uploaded_by'])
-            # Remove file_path from response for security
-            doc.pop('file_path', None)
-        
-        return jsonify({'documents': documents}), 200
-        
-    except Exception as e:
-        logger.error(f"Get case documents error: {str(e)}")
-        return jsonify({'error': 'Internal server error'}), 500
-
 @bp.route('/shared', methods=['GET'])
 @login_required
 def get_shared_documents():
@@ -796,75 +683,6 @@ async def upload_document(current_user):
         logger.error(f"Error uploading document: {str(e)}")
         return jsonify({'error': 'Failed to upload document', 'error_id': error_id}), 500
 
-@bp.route('', methods=['GET'])
-@token_required
-@validate_query_params(['page', 'limit', 'sort', 'direction'])
-async def list_documents(current_user):
-    """List documents with pagination and filtering."""
-    try:
-        # Parse query parameters
-        page = int(request.args.get('page', 1))
-        limit = min(int(request.args.get('limit', 20)), 100)  # Maximum 100 items per page
-        skip = (page - 1) * limit
-        
-        # Get sort parameters
-        sort_field = request.args.get('sort', 'created_at')
-        sort_direction = request.args.get('direction', 'desc')
-        
-        # Get filter parameters
-        filters = {}
-        
-        # Handle search query
-        search_query = request.args.get('search')
-        if search_query:
-            documents = await document_management_service.search_documents(
-                search_query, 
-                current_user.id, 
-                skip, 
-                limit
-            )
-            total = len(documents)  # This is not accurate for total, but a limitation of the current setup
-        else:
-            # Apply filters from query parameters
-            for param in ['document_type', 'access_level', 'status']:
-                if param in request.args:
-                    filters[param] = request.args.get(param)
-                    
-            # Filter by tags (comma-separated list)
-            if 'tags' in request.args:
-                tags = request.args.get('tags').split(',')
-                filters['tags'] = {'$in': tags}
-                
-            # Filter by date range
-            if 'start_date' in request.args and 'end_date' in request.args:
-                filters['created_at'] = {
-                    '$gte': request.args.get('start_date'),
-                    '$lte': request.args.get('end_date')
-                }
-                
-            # Get documents
-            documents = await document_management_service.list_documents(
-                current_user.id, 
-                filters, 
-                skip, 
-                limit
-            )
-            
-            # TODO: Get total count for pagination
-            total = len(documents) + skip  # This is not accurate, but a limitation of the current setup
-        
-        return jsonify({
-            'documents': documents,
-            'page': page,
-            'limit': limit,
-            'total': total
-        }), 200
-        
-    except Exception as e:
-        error_id = error_logging_service.log_exception(e)
-        logger.error(f"Error listing documents: {str(e)}")
-        return jsonify({'error': 'Failed to list documents', 'error_id': error_id}), 500
-
 @bp.route('/<document_id>', methods=['GET'])
 @token_required
 async def get_document(current_user, document_id):
@@ -177,8 +177,9 @@ def submit_immigration_form():
             "documents": []
         }
         
-        # Generate any necessary documents
-        document_results = generate_document(form_id, form_data)
+        # Check the form renders; the HTML pass is enough, the PDF is made on download
+        document_results = generate_document(form_id, form_data, format='html')
+        document_results.pop('content', None)
         submission['documents'] = document_results
         
         return jsonify({
@@ -1,26 +1,48 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, Response, request, jsonify, send_file, current_app
 from werkzeug.exceptions import BadRequest
 import json
+import io
+import hashlib
 import os
 from datetime import datetime
 import logging
 from backend.services.auth_service import require_auth, get_current_user
-from backend.services.document_service import generate_document, generate_pdf
+from backend.services.document_service import (
+    DocumentService, generate_document, generate_pdf, document_cache_key, stream_batch_zip, merge_batch_pdf,
+    BATCH_MAX_RECORDS
+)
+from backend.services.pdf_cache import pdf_cache
+from backend.services.render_pool import render_pool
+from backend.services.template_engine import template_engine
 import uuid
-from utils.document_generator import list_templates
+from utils.document_generator import list_templates, search_templates, find_template, templates_etag
 
 bp = Blueprint('templates', __name__)
 logger = logging.getLogger(__name__)
 
 @bp.route('/api/templates', methods=['GET'])
 def get_templates():
-    """Get list of available templates"""
+    """Get list of available templates, optionally filtered by ?q= and ?category="""
     try:
-        templates = list_templates()
-        return jsonify({
+        query = request.args.get('q')
+        category = request.args.get('category')
+        
+        # Served from the in-memory catalog; the ETag changes when any template does
+        etag = templates_etag()
+        if query or category:
+            etag += '-' + hashlib.sha1(f"{query or ''}\0{category or ''}".encode('utf-8')).hexdigest()[:12]
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        templates = search_templates(query, category) if (query or category) else list_templates()
+        response = jsonify({
             'success': True,
             'templates': templates
-        }), 200
+        })
+        response.set_etag(etag)
+        return response, 200
     except Exception as e:
         current_app.logger.error(f"Error listing templates: {str(e)}")
         return jsonify({
@@ -28,12 +50,28 @@ def get_templates():
             'error': 'Failed to list templates'
         }), 500
 
+@bp.route('/api/templates/cache/stats', methods=['GET'])
+def get_template_cache_stats():
+    """Hit rates of the compiled template cache and the generated PDF cache"""
+    return jsonify({
+        'success': True,
+        'stats': template_engine.stats(),
+        'pdf_cache': pdf_cache.stats()
+    }), 200
+
+@bp.route('/api/templates/render/stats', methods=['GET'])
+def get_render_stats():
+    """Render timings and queue depth of the PDF worker pool"""
+    return jsonify({
+        'success': True,
+        'stats': render_pool.stats()
+    }), 200
+
 @bp.route('/api/templates/<template_id>', methods=['GET'])
 def get_template(template_id):
     """Get template details and fields"""
     try:
-        templates = list_templates()
-        template = next((t for t in templates if t['id'] == template_id), None)
+        template = find_template(template_id)
         
         if not template:
             return jsonify({
@@ -41,13 +79,10 @@ def get_template(template_id):
                 'error': 'Template not found'
             }), 404
             
-        # Mock template fields (in a real app, these would be stored in the template metadata)
+        # Fields are the variables the template uses, read from its Jinja AST
         fields = [
-            {'name': 'title', 'label': 'Document Title', 'type': 'text', 'required': True},
-            {'name': 'client_name', 'label': 'Client Name', 'type': 'text', 'required': True},
-            {'name': 'matter_description', 'label': 'Matter Description', 'type': 'text', 'required': True},
-            {'name': 'content', 'label': 'Document Content', 'type': 'textarea', 'required': True},
-            {'name': 'user_name', 'label': 'User Name', 'type': 'text', 'required': True}
+            {'name': name, 'label': name.replace('_', ' ').title(), 'type': 'text', 'required': True}
+            for name in template['variables']
         ]
         
         template['fields'] = fields
@@ -87,20 +122,20 @@ def generate_template():
         # Create document in database (mock)
         document_id = str(uuid.uuid4())
         
-        # Generate document
-        output_path = generate_document(
+        # Validate the template and data; the file itself is rendered in memory on download
+        generate_document(
             template_id,
             data.get('data', {}),
-            output_format
+            'html'
         )
         
-        # Save document path to user's documents (mock)
+        # Save the document definition to user's documents (mock)
         document = {
             'id': document_id,
             'template_id': template_id,
             'name': data.get('data', {}).get('title', 'Untitled Document'),
             'created_at': datetime.now().isoformat(),
-            'path': output_path,
+            'data': data.get('data', {}),
             'format': output_format
         }
         
@@ -127,6 +162,87 @@ def generate_template():
             'error': f'Failed to generate document: {str(e)}'
         }), 500
 
+@bp.route('/api/templates/generate/batch', methods=['POST'])
+def generate_template_batch():
+    """Generate one document per data record from a single template
+    
+    Returns a ZIP streamed as documents finish (output 'zip', with a
+    manifest.json of per-record results), or one merged PDF (output 'merged',
+    failed records listed in the X-Batch-Failed header).
+    """
+    try:
+        data = request.json
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+            
+        template_id = data.get('template_id')
+        records = data.get('records')
+        output = data.get('output', 'zip').lower()
+        output_format = data.get('format', 'pdf').lower()
+        
+        if not template_id:
+            return jsonify({
+                'success': False,
+                'error': 'Template ID is required'
+            }), 400
+        if not isinstance(records, list) or not records:
+            return jsonify({
+                'success': False,
+                'error': 'Records must be a non-empty list'
+            }), 400
+        if len(records) > BATCH_MAX_RECORDS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {BATCH_MAX_RECORDS} records per batch'
+            }), 400
+        if output not in ('zip', 'merged') or output_format not in ('pdf', 'html'):
+            return jsonify({
+                'success': False,
+                'error': "Output must be 'zip' or 'merged' and format 'pdf' or 'html'"
+            }), 400
+        if DocumentService.get_template(template_id) is None:
+            return jsonify({
+                'success': False,
+                'error': 'Template not found'
+            }), 404
+        
+        if output == 'merged':
+            content, failures = merge_batch_pdf(template_id, records)
+            if content is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Every record failed to generate',
+                    'failures': failures
+                }), 422
+            response = send_file(
+                io.BytesIO(content),
+                as_attachment=True,
+                download_name=f"{template_id}_batch.pdf",
+                mimetype='application/pdf'
+            )
+            response.headers['X-Batch-Total'] = str(len(records))
+            response.headers['X-Batch-Failed'] = json.dumps(failures)
+            return response
+        
+        return Response(
+            stream_batch_zip(template_id, records, output_format),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{template_id}_batch.zip"',
+                'X-Batch-Total': str(len(records))
+            }
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error generating document batch: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Failed to generate documents: {str(e)}'
+        }), 500
+
 @bp.route('/api/documents/<document_id>/download', methods=['GET'])
 def download_document(document_id):
     """Download generated document"""
@@ -143,18 +259,29 @@ def download_document(document_id):
         with open(document_path, 'r') as f:
             document = json.load(f)
             
-        if not os.path.exists(document['path']):
-            return jsonify({
-                'success': False,
-                'error': 'Document file not found'
-            }), 404
+        # The ETag is the document's content address, so a client that already
+        # has this version gets a 304 without the document being loaded or rendered
+        etag = document_cache_key(document['template_id'], document.get('data', {}), document['format'])
+        if etag and request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+            
+        result = generate_document(document['template_id'], document.get('data', {}), document['format'])
+        content = result['content']
+        if isinstance(content, str):
+            content = content.encode('utf-8')
             
-        return send_file(
-            document['path'],
+        response = send_file(
+            io.BytesIO(content),
             as_attachment=True,
             download_name=f"{document['name']}.{document['format']}",
-            mimetype='application/pdf' if document['format'] == 'pdf' else 'text/html'
+            mimetype='application/pdf' if document['format'] == 'pdf' else 'text/html',
+            etag=result['etag'],
+            conditional=True
         )
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         current_app.logger.error(f"Error downloading document: {str(e)}")
         return jsonify({
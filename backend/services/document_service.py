@@ -1,35 +1,86 @@
 """Document generation and handling service"""
 import os
+import io
+import json
+import hashlib
+import zipfile
 import logging
-import tempfile
+import threading
+from collections import OrderedDict, deque
 from datetime import datetime
 import uuid
 from flask import current_app, render_template
 from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-from jinja2 import Template
+from PyPDF2 import PdfWriter
+from .template_engine import template_engine, content_hash
+from .pdf_cache import pdf_cache, cache_key
+from .render_pool import render_pool, render_weasyprint, PRIORITY_NORMAL, PRIORITY_LOW
 
 logger = logging.getLogger(__name__)
 
+# Most data records accepted by one batch generation request
+BATCH_MAX_RECORDS = int(os.environ.get('BATCH_MAX_RECORDS', 500))
+# Renders a batch keeps queued ahead of the document it is waiting for
+BATCH_RENDER_WINDOW = int(os.environ.get('BATCH_RENDER_WINDOW', 16))
+
+# Number of parsed stylesheets kept in memory
+STYLESHEET_CACHE_SIZE = int(os.environ.get('STYLESHEET_CACHE_SIZE', 32))
+
+# One font configuration shared by every render, so fonts are only discovered once
+_font_config = FontConfiguration()
+_stylesheets = OrderedDict()
+_stylesheets_lock = threading.Lock()
+
+
+def get_stylesheet(css_content):
+    """
+    Get a parsed WeasyPrint stylesheet, parsing each distinct CSS string once
+    
+    Args:
+        css_content (str): The CSS content
+        
+    Returns:
+        CSS: The shared parsed stylesheet
+    """
+    key = hashlib.sha256(css_content.encode('utf-8')).hexdigest()
+    with _stylesheets_lock:
+        stylesheet = _stylesheets.get(key)
+        if stylesheet is not None:
+            _stylesheets.move_to_end(key)
+            return stylesheet
+    
+    stylesheet = CSS(string=css_content, font_config=_font_config)
+    with _stylesheets_lock:
+        _stylesheets[key] = stylesheet
+        while len(_stylesheets) > STYLESHEET_CACHE_SIZE:
+            _stylesheets.popitem(last=False)
+    return stylesheet
+
+
 class DocumentService:
     """Service for document generation and handling"""
     
     @staticmethod
-    def render_template_with_data(template_content, data):
+    def render_template_with_data(template_content, data, template_id=None):
         """
         Render a template with provided data
         
+        The compiled template is cached by ID and content hash, so it is only
+        compiled again when its source changes.
+        
         Args:
             template_content (str): The template content
             data (dict): The data to render the template with
+            template_id (str, optional): The template ID
             
         Returns:
             str: The rendered template
         """
         try:
-            template = Template(template_content)
-            return template.render(**data)
+            return template_engine.render(template_id, template_content, data)
         except Exception as e:
             logger.error(f"Error rendering template: {e}")
             raise
@@ -37,7 +88,7 @@ class DocumentService:
     @staticmethod
     def generate_pdf_from_html(html_content, css_content=None):
         """
-        Generate a PDF from HTML content
+        Generate a PDF from HTML content, rendered in memory
         
         Args:
             html_content (str): The HTML content
@@ -47,41 +98,10 @@ class DocumentService:
             bytes: The PDF content
         """
         try:
-            # Create a temporary file for the PDF
-            temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_pdf.close()
-            
-            # Generate PDF from HTML
-            html = HTML(string=html_content)
-            
-            # Apply CSS if provided
-            stylesheets = []
-            if css_content:
-                css_file = tempfile.NamedTemporaryFile(delete=False, suffix='.css')
-                css_file.write(css_content.encode('utf-8'))
-                css_file.close()
-                stylesheets.append(CSS(filename=css_file.name))
-            
-            # Write PDF to temporary file
-            html.write_pdf(temp_pdf.name, stylesheets=stylesheets)
-            
-            # Read the PDF content
-            with open(temp_pdf.name, 'rb') as f:
-                pdf_content = f.read()
-            
-            # Clean up temporary files
-            os.unlink(temp_pdf.name)
-            if css_content and 'css_file' in locals():
-                os.unlink(css_file.name)
-            
-            return pdf_content
+            stylesheets = [get_stylesheet(css_content)] if css_content else []
+            return HTML(string=html_content).write_pdf(stylesheets=stylesheets, font_config=_font_config)
         except Exception as e:
             logger.error(f"Error generating PDF from HTML: {e}")
-            # Clean up temporary files in case of error
-            if 'temp_pdf' in locals() and os.path.exists(temp_pdf.name):
-                os.unlink(temp_pdf.name)
-            if css_content and 'css_file' in locals() and os.path.exists(css_file.name):
-                os.unlink(css_file.name)
             raise
 
     @staticmethod
@@ -98,12 +118,9 @@ class DocumentService:
             bytes: The PDF content
         """
         try:
-            # Create a temporary file for the PDF
-            temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_pdf.close()
-            
-            # Create the PDF
-            c = canvas.Canvas(temp_pdf.name, pagesize=letter)
+            # Create the PDF in memory
+            buffer = io.BytesIO()
+            c = canvas.Canvas(buffer, pagesize=letter)
             width, height = letter
             
             # Add metadata
@@ -131,19 +148,9 @@ class DocumentService:
             
             c.save()
             
-            # Read the PDF content
-            with open(temp_pdf.name, 'rb') as f:
-                pdf_content = f.read()
-            
-            # Clean up temporary file
-            os.unlink(temp_pdf.name)
-            
-            return pdf_content
+            return buffer.getvalue()
         except Exception as e:
             logger.error(f"Error generating simple PDF: {e}")
-            # Clean up temporary file in case of error
-            if 'temp_pdf' in locals() and os.path.exists(temp_pdf.name):
-                os.unlink(temp_pdf.name)
             raise
 
     @staticmethod
@@ -157,190 +164,191 @@ class DocumentService:
         Returns:
             dict: The template data
         """
-        # In a real app, this would fetch from a database
-        templates = {
-            "fee_waiver": {
-                "id": "fee_waiver",
-                "name": "Fee Waiver Application",
-                "html_template": """
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <title>Fee Waiver Application</title>
-                    <style>
-                        body { font-family: Arial, sans-serif; }
-                        h1 { text-align: center; }
-                        .section { margin-top: 20px; }
-                        .field { margin-bottom: 10px; }
-                        .label { font-weight: bold; }
-                    </style>
-                </head>
-                <body>
-                    <h1>APPLICATION FOR WAIVER OF COURT FEES</h1>
-                    
-                    <div class="section">
-                        <h2>Personal Information</h2>
-                        <div class="field">
-                            <span class="label">Full Name:</span> {{ full_name }}
-                        </div>
-                    </div>
-                    
-                    <div class="section">
-                        <h2>Case Information</h2>
-                        <div class="field">
-                            <span class="label">Case Number:</span> {{ case_number or 'N/A' }}
-                        </div>
-                        <div class="field">
-                            <span class="label">Court Name:</span> {{ court_name }}
-                        </div>
-                    </div>
-                    
-                    <div class="section">
-                        <h2>Financial Information</h2>
-                        <div class="field">
-                            <span class="label">Monthly Income:</span> ${{ monthly_income }}
-                        </div>
-                        <div class="field">
-                            <span class="label">Household Size:</span> {{ household_size }}
-                        </div>
-                    </div>
-                    
-                    <div class="section">
-                        <h2>Declaration</h2>
-                        <p>I declare under penalty of perjury that the information provided above is true and correct.</p>
-                        <div class="field" style="margin-top: 50px;">
-                            <span class="label">Signature:</span> _______________________________
-                        </div>
-                        <div class="field">
-                            <span class="label">Date:</span> {{ now().strftime('%Y-%m-%d') }}
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
-            },
-            "housing_defense": {
-                "id": "housing_defense",
-                "name": "Housing Defense Letter",
-                "html_template": """
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <title>Housing Defense Letter</title>
-                    <style>
-                        body { font-family: Arial, sans-serif; line-height: 1.5; }
-                        .date { text-align: right; margin-bottom: 20px; }
-                        .header { font-weight: bold; margin-bottom: 20px; }
-                        .closing { margin-top: 30px; }
-                        .signature { margin-top: 50px; }
-                    </style>
-                </head>
-                <body>
-                    <div class="date">{{ now().strftime('%B %d, %Y') }}</div>
-                    
-                    <div class="header">
-                        {{ landlord_name }}<br>
-                        [Landlord Address]<br>
-                        Re: {{ address }}
-                    </div>
-                    
-                    <p>Dear {{ landlord_name }},</p>
-                    
-                    <p>I am writing regarding the property at {{ address }}.</p>
-                    
-                    <p>{{ issue_description }}</p>
-                    
-                    <p>{{ requested_remedy }}</p>
-                    
-                    <p>Please respond to this letter within 14 days. I hope we can resolve this matter amicably.</p>
-                    
-                    <div class="closing">
-                        Sincerely,
-                    </div>
-                    
-                    <div class="signature">
-                        {{ tenant_name }}
-                    </div>
-                </body>
-                </html>
-                """
-            },
-            "expungement_petition": {
-                "id": "expungement_petition",
-                "name": "Expungement Petition",
-                "html_template": """
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <title>Petition for Expungement</title>
-                    <style>
-                        body { font-family: Arial, sans-serif; }
-                        h1 { text-align: center; }
-                        .court-info { text-align: center; margin-bottom: 30px; }
-                        .section { margin-top: 20px; }
-                        .field { margin-bottom: 10px; }
-                        .label { font-weight: bold; }
-                        .signature { margin-top: 50px; }
-                    </style>
-                </head>
-                <body>
-                    <div class="court-info">
-                        [COURT NAME]<br>
-                        [COURT ADDRESS]
-                    </div>
-                    
-                    <h1>PETITION FOR EXPUNGEMENT OF CRIMINAL RECORD</h1>
-                    
-                    <div class="section">
-                        <h2>Petitioner Information</h2>
-                        <div class="field">
-                            <span class="label">Name:</span> {{ petitioner_name }}
-                        </div>
-                        <div class="field">
-                            <span class="label">Date of Birth:</span> {{ dob }}
-                        </div>
-                    </div>
-                    
-                    <div class="section">
-                        <h2>Case Information</h2>
-                        <div class="field">
-                            <span class="label">Case Number:</span> {{ case_number }}
-                        </div>
-                        <div class="field">
-                            <span class="label">Conviction Date:</span> {{ conviction_date }}
-                        </div>
-                        <div class="field">
-                            <span class="label">Offense:</span> {{ offense }}
-                        </div>
-                        <div class="field">
-                            <span class="label">Date Sentence Completed:</span> {{ sentence_completed }}
-                        </div>
-                    </div>
-                    
-                    <div class="section">
-                        <h2>Statement of Reasons</h2>
-                        <p>{{ reason_for_expungement }}</p>
-                    </div>
-                    
-                    <div class="section">
-                        <p>I hereby petition the court to expunge the above criminal record and declare under penalty of perjury that the foregoing is true and correct.</p>
-                    </div>
-                    
-                    <div class="signature">
-                        <div class="field">
-                            <span class="label">Signature:</span> _______________________________
-                        </div>
-                        <div class="field">
-                            <span class="label">Date:</span> {{ now().strftime('%Y-%m-%d') }}
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
-            }
-        }
-        
-        return templates.get(template_id)
+        return DOCUMENT_TEMPLATES.get(template_id)
+
+
+# In a real app, these would be fetched from a database
+DOCUMENT_TEMPLATES = {
+    "fee_waiver": {
+        "id": "fee_waiver",
+        "name": "Fee Waiver Application",
+        "html_template": """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Fee Waiver Application</title>
+            <style>
+                body { font-family: Arial, sans-serif; }
+                h1 { text-align: center; }
+                .section { margin-top: 20px; }
+                .field { margin-bottom: 10px; }
+                .label { font-weight: bold; }
+            </style>
+        </head>
+        <body>
+            <h1>APPLICATION FOR WAIVER OF COURT FEES</h1>
+            
+            <div class="section">
+                <h2>Personal Information</h2>
+                <div class="field">
+                    <span class="label">Full Name:</span> {{ full_name }}
+                </div>
+            </div>
+            
+            <div class="section">
+                <h2>Case Information</h2>
+                <div class="field">
+                    <span class="label">Case Number:</span> {{ case_number or 'N/A' }}
+                </div>
+                <div class="field">
+                    <span class="label">Court Name:</span> {{ court_name }}
+                </div>
+            </div>
+            
+            <div class="section">
+                <h2>Financial Information</h2>
+                <div class="field">
+                    <span class="label">Monthly Income:</span> ${{ monthly_income }}
+                </div>
+                <div class="field">
+                    <span class="label">Household Size:</span> {{ household_size }}
+                </div>
+            </div>
+            
+            <div class="section">
+                <h2>Declaration</h2>
+                <p>I declare under penalty of perjury that the information provided above is true and correct.</p>
+                <div class="field" style="margin-top: 50px;">
+                    <span class="label">Signature:</span> _______________________________
+                </div>
+                <div class="field">
+                    <span class="label">Date:</span> {{ now().strftime('%Y-%m-%d') }}
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+    },
+    "housing_defense": {
+        "id": "housing_defense",
+        "name": "Housing Defense Letter",
+        "html_template": """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Housing Defense Letter</title>
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.5; }
+                .date { text-align: right; margin-bottom: 20px; }
+                .header { font-weight: bold; margin-bottom: 20px; }
+                .closing { margin-top: 30px; }
+                .signature { margin-top: 50px; }
+            </style>
+        </head>
+        <body>
+            <div class="date">{{ now().strftime('%B %d, %Y') }}</div>
+            
+            <div class="header">
+                {{ landlord_name }}<br>
+                [Landlord Address]<br>
+                Re: {{ address }}
+            </div>
+            
+            <p>Dear {{ landlord_name }},</p>
+            
+            <p>I am writing regarding the property at {{ address }}.</p>
+            
+            <p>{{ issue_description }}</p>
+            
+            <p>{{ requested_remedy }}</p>
+            
+            <p>Please respond to this letter within 14 days. I hope we can resolve this matter amicably.</p>
+            
+            <div class="closing">
+                Sincerely,
+            </div>
+            
+            <div class="signature">
+                {{ tenant_name }}
+            </div>
+        </body>
+        </html>
+        """
+    },
+    "expungement_petition": {
+        "id": "expungement_petition",
+        "name": "Expungement Petition",
+        "html_template": """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Petition for Expungement</title>
+            <style>
+                body { font-family: Arial, sans-serif; }
+                h1 { text-align: center; }
+                .court-info { text-align: center; margin-bottom: 30px; }
+                .section { margin-top: 20px; }
+                .field { margin-bottom: 10px; }
+                .label { font-weight: bold; }
+                .signature { margin-top: 50px; }
+            </style>
+        </head>
+        <body>
+            <div class="court-info">
+                [COURT NAME]<br>
+                [COURT ADDRESS]
+            </div>
+            
+            <h1>PETITION FOR EXPUNGEMENT OF CRIMINAL RECORD</h1>
+            
+            <div class="section">
+                <h2>Petitioner Information</h2>
+                <div class="field">
+                    <span class="label">Name:</span> {{ petitioner_name }}
+                </div>
+                <div class="field">
+                    <span class="label">Date of Birth:</span> {{ dob }}
+                </div>
+            </div>
+            
+            <div class="section">
+                <h2>Case Information</h2>
+                <div class="field">
+                    <span class="label">Case Number:</span> {{ case_number }}
+                </div>
+                <div class="field">
+                    <span class="label">Conviction Date:</span> {{ conviction_date }}
+                </div>
+                <div class="field">
+                    <span class="label">Offense:</span> {{ offense }}
+                </div>
+                <div class="field">
+                    <span class="label">Date Sentence Completed:</span> {{ sentence_completed }}
+                </div>
+            </div>
+            
+            <div class="section">
+                <h2>Statement of Reasons</h2>
+                <p>{{ reason_for_expungement }}</p>
+            </div>
+            
+            <div class="section">
+                <p>I hereby petition the court to expunge the above criminal record and declare under penalty of perjury that the foregoing is true and correct.</p>
+            </div>
+            
+            <div class="signature">
+                <div class="field">
+                    <span class="label">Signature:</span> _______________________________
+                </div>
+                <div class="field">
+                    <span class="label">Date:</span> {{ now().strftime('%Y-%m-%d') }}
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+    }
+}
 
 
 # Create context functions for templates
@@ -349,14 +357,41 @@ def now():
     return datetime.now()
 
 
-def generate_document(template_id, data, format='pdf'):
+def document_cache_key(template_id, data, format='pdf'):
+    """
+    Content address (and ETag) of a generated document
+    
+    Args:
+        template_id (str): The template ID
+        data (dict): The data to render the template with
+        format (str): The output format (pdf or html)
+        
+    Returns:
+        str: The cache key, or None if the template doesn't exist
+    """
+    template = DocumentService.get_template(template_id)
+    if not template:
+        return None
+    source = template['html_template']
+    key_data = {'data': data, 'format': format}
+    if 'now()' in source:
+        # The template prints today's date, so the output changes daily
+        key_data['date'] = datetime.now().strftime('%Y-%m-%d')
+    return cache_key(content_hash(source), key_data)
+
+
+def generate_document(template_id, data, format='pdf', priority=PRIORITY_NORMAL):
     """
     Generate a document from a template with provided data
     
+    PDFs are served from the content-addressed cache when the same template
+    version, data and renderer were rendered before.
+    
     Args:
         template_id (str): The template ID
         data (dict): The data to render the template with
         format (str): The output format (pdf or html)
+        priority (int): Render queue priority; lower renders first
         
     Returns:
         dict: The generated document info
@@ -367,15 +402,19 @@ def generate_document(template_id, data, format='pdf'):
         if not template:
             raise ValueError(f"Template not found: {template_id}")
         
-        # Add helper functions to template data
-        template_data = {**data, 'now': now}
-        
-        # Render the template
-        html_content = DocumentService.render_template_with_data(template['html_template'], template_data)
+        etag = document_cache_key(template_id, data, format)
         
         # Generate document ID
         document_id = f"doc_{uuid.uuid4().hex[:10]}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
+        pdf_content = pdf_cache.get(etag) if format != 'html' else None
+        if pdf_content is None:
+            # Add helper functions to template data
+            template_data = {**data, 'now': now}
+            
+            # Render the template
+            html_content = DocumentService.render_template_with_data(template['html_template'], template_data, template_id)
+        
         # Create appropriate output based on format
         if format == 'html':
             # Return HTML content
@@ -384,25 +423,25 @@ def generate_document(template_id, data, format='pdf'):
                 'template_id': template_id,
                 'format': 'html',
                 'content': html_content,
+                'etag': etag,
                 'filename': f"{template_id}_{datetime.now().strftime('%Y%m%d')}.html",
                 'generated_at': datetime.now().isoformat()
             }
         else:
-            # Generate PDF
-            pdf_content = DocumentService.generate_pdf_from_html(html_content)
-            
-            # In a real app, you'd save this PDF to a file or database
-            # For now, save to a temporary file for demo purposes
-            temp_dir = tempfile.gettempdir()
-            pdf_path = os.path.join(temp_dir, f"{document_id}.pdf")
-            with open(pdf_path, 'wb') as f:
-                f.write(pdf_content)
+            cached = pdf_content is not None
+            if not cached:
+                # Render in the worker pool; callers stream it with send_file(io.BytesIO(content))
+                pdf_content = render_pool.render_pdf(html_content, priority=priority)
+                pdf_cache.put(etag, pdf_content)
                 
             return {
                 'id': document_id,
                 'template_id': template_id,
                 'format': 'pdf',
-                'path': pdf_path,
+                'content': pdf_content,
+                'size': len(pdf_content),
+                'etag': etag,
+                'cached': cached,
                 'filename': f"{template_id}_{datetime.now().strftime('%Y%m%d')}.pdf",
                 'generated_at': datetime.now().isoformat()
             }
@@ -411,6 +450,159 @@ def generate_document(template_id, data, format='pdf'):
         logger.error(f"Error generating document: {str(e)}")
         raise
 
+def _prepare_batch_item(template_id, template, index, data, format, priority):
+    """Render one batch record's HTML and queue its PDF (unless cached)"""
+    item = {
+        'index': index,
+        'filename': f"{template_id}_{index + 1:04d}.{'html' if format == 'html' else 'pdf'}"
+    }
+    try:
+        if not isinstance(data, dict):
+            raise ValueError('Record must be an object')
+        item['etag'] = document_cache_key(template_id, data, format)
+        content = pdf_cache.get(item['etag']) if format != 'html' else None
+        if content is not None:
+            item.update(cached=True, content=content)
+            return item
+        html_content = DocumentService.render_template_with_data(
+            template['html_template'], {**data, 'now': now}, template_id
+        )
+        if format == 'html':
+            item['content'] = html_content
+        else:
+            item.update(cached=False, job=render_pool.submit(render_weasyprint, (html_content, None), priority))
+    except Exception as e:
+        item['error'] = str(e)
+    return item
+
+
+def _finish_batch_item(template_id, item):
+    """Wait for a batch record's PDF and record its outcome"""
+    job = item.pop('job', None)
+    if job is not None:
+        try:
+            item['content'] = job.result()
+            pdf_cache.put(item['etag'], item['content'])
+        except Exception as e:
+            item['error'] = str(e)
+    item['status'] = 'error' if 'error' in item else 'ok'
+    if item['status'] == 'error':
+        logger.warning(f"Batch item {item['index']} of {template_id} failed: {item['error']}")
+    return item
+
+
+def generate_documents_batch(template_id, records, format='pdf', priority=PRIORITY_LOW):
+    """
+    Generate one document per data record from the same template
+    
+    The template is compiled once. Up to BATCH_RENDER_WINDOW PDFs are queued
+    on the render pool ahead of the one being returned, so renders run
+    concurrently without flooding the queue. Results are yielded in input
+    order as each one finishes; a failed record is reported and the batch
+    carries on.
+    
+    Args:
+        template_id (str): The template ID
+        records (list): The data dicts, one per document
+        format (str): The output format (pdf or html)
+        priority (int): Render queue priority; batches default to low
+        
+    Yields:
+        dict: index, filename, status ('ok' or 'error'), and content or error
+    """
+    template = DocumentService.get_template(template_id)
+    if not template:
+        raise ValueError(f"Template not found: {template_id}")
+    
+    window = deque()
+    for index, data in enumerate(records):
+        window.append(_prepare_batch_item(template_id, template, index, data, format, priority))
+        if len(window) >= BATCH_RENDER_WINDOW:
+            yield _finish_batch_item(template_id, window.popleft())
+    while window:
+        yield _finish_batch_item(template_id, window.popleft())
+
+
+class _StreamBuffer:
+    """Write-only file object whose contents are drained after each write"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_batch_zip(template_id, records, format='pdf'):
+    """
+    Stream a ZIP of generated documents, one entry per record
+    
+    Each document is written to the archive and sent as soon as it is ready.
+    The archive ends with manifest.json, listing every record's status and
+    any error.
+    
+    Args:
+        template_id (str): The template ID
+        records (list): The data dicts, one per document
+        format (str): The output format (pdf or html)
+        
+    Yields:
+        bytes: Chunks of the ZIP archive
+    """
+    items = generate_documents_batch(template_id, records, format)
+    buffer = _StreamBuffer()
+    manifest = []
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for item in items:
+            manifest.append({key: item.get(key) for key in ('index', 'filename', 'status', 'error', 'cached')})
+            if item['status'] == 'ok':
+                archive.writestr(item['filename'], item['content'])
+                yield buffer.drain()
+        archive.writestr('manifest.json', json.dumps({
+            'template_id': template_id,
+            'total': len(manifest),
+            'failed': sum(1 for entry in manifest if entry['status'] == 'error'),
+            'items': manifest
+        }, indent=2))
+    yield buffer.drain()
+
+
+def merge_batch_pdf(template_id, records):
+    """
+    Generate one PDF per record and merge them into a single PDF
+    
+    Args:
+        template_id (str): The template ID
+        records (list): The data dicts, one per document
+        
+    Returns:
+        tuple: (merged PDF bytes or None if every record failed, list of failures)
+    """
+    writer = PdfWriter()
+    failures = []
+    merged = 0
+    for item in generate_documents_batch(template_id, records, 'pdf'):
+        if item['status'] == 'ok':
+            writer.append(io.BytesIO(item['content']))
+            merged += 1
+        else:
+            failures.append({'index': item['index'], 'error': item['error']})
+    if not merged:
+        return None, failures
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue(), failures
+
+
 def generate_pdf(document_id, format='pdf'):
     """
     Generate or retrieve a PDF document
@@ -420,31 +612,17 @@ def generate_pdf(document_id, format='pdf'):
         format (str): The output format
         
     Returns:
-        str: The path to the generated PDF
+        bytes: The PDF content
     """
     # In a real app, you would retrieve the saved document
     # For demo purposes, we'll create a simple PDF
     
     try:
-        temp_dir = tempfile.gettempdir()
-        pdf_path = os.path.join(temp_dir, f"{document_id}.pdf")
-        
-        # Check if the file already exists (from previous generate_document call)
-        if os.path.exists(pdf_path):
-            return pdf_path
-            
-        # Generate a simple PDF
-        pdf_content = DocumentService.generate_simple_pdf(
+        return DocumentService.generate_simple_pdf(
             title=f"Document {document_id}",
             content=f"This is a demonstration PDF for document ID: {document_id}\n\nGenerated for testing purposes.",
             author="SmartProBono System"
         )
-        
-        # Save to file
-        with open(pdf_path, 'wb') as f:
-            f.write(pdf_content)
-            
-        return pdf_path
     except Exception as e:
         logger.error(f"Error generating PDF: {str(e)}")
         raise
@@ -0,0 +1,159 @@
+"""Content-addressed on-disk cache for generated PDFs"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+import weasyprint
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'smartprobono_pdf_cache'))
+# Disk budget for cached PDFs; least recently used files are removed past it
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# Bump when a rendering change should invalidate every cached PDF
+RENDERER_REVISION = 1
+RENDERER_VERSION = f"weasyprint-{weasyprint.__version__}-r{RENDERER_REVISION}"
+
+
+def canonical_json(data):
+    """Serialize data the same way regardless of key order"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def cache_key(template_version, data, renderer_version=RENDERER_VERSION):
+    """
+    Content address of a rendered document
+
+    Args:
+        template_version (str): Hash of the template source
+        data (dict): The data the template is rendered with
+        renderer_version (str): The renderer and its revision
+
+    Returns:
+        str: Hex SHA-256 digest, also used as the document's ETag
+    """
+    digest = hashlib.sha256()
+    for part in (template_version, canonical_json(data), renderer_version):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class PDFCache:
+    """
+    On-disk LRU store of generated PDFs, keyed by content address
+
+    Files are named after their key. Writes go through a temporary file and an
+    atomic rename, so readers never see a partial PDF. The directory is the
+    only index: a file's modification time is its last use, and eviction scans
+    the directory, so every worker process sharing PDF_CACHE_DIR sees the same
+    entries and keeps to the one PDF_CACHE_MAX_BYTES budget.
+    """
+
+    def __init__(self, directory=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        """Path of the cached PDF for a key"""
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _touch(self, path):
+        # Explicit nanosecond time; the filesystem's own clock is too coarse to order uses
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def _entries(self):
+        """(last use, key, size) of every cached PDF, least recently used first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pdf'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                # Evicted by another worker mid-scan
+                continue
+            entries.append((stat.st_mtime_ns, name[:-4], stat.st_size))
+        return sorted(entries)
+
+    def get(self, key):
+        """
+        Get a cached PDF
+
+        Args:
+            key (str): The content address
+
+        Returns:
+            bytes: The PDF content, or None if it isn't cached
+        """
+        try:
+            with open(self.path(key), 'rb') as f:
+                content = f.read()
+            self._touch(self.path(key))
+        except OSError:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        with self._lock:
+            self._stats['hits'] += 1
+        return content
+
+    def put(self, key, content):
+        """Store a PDF under its key and evict past the size budget"""
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, self.path(key))
+            self._touch(self.path(key))
+        except OSError as e:
+            logger.warning(f"Could not cache PDF {key}: {e}")
+            return
+        with self._lock:
+            self._stats['writes'] += 1
+        self._evict(keep=key)
+
+    def _evict(self, keep):
+        """Remove least recently used PDFs until the directory fits the budget"""
+        entries = self._entries()
+        total_bytes = sum(size for _, _, size in entries)
+        for _, key, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            except OSError:
+                continue
+            else:
+                with self._lock:
+                    self._stats['evictions'] += 1
+            total_bytes -= size
+
+    def stats(self):
+        """Hit rate in this process and disk usage of the shared directory"""
+        entries = self._entries()
+        with self._lock:
+            stats = dict(self._stats)
+        stats['entries'] = len(entries)
+        stats['bytes'] = sum(size for _, _, size in entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['max_bytes'] = self.max_bytes
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['renderer_version'] = RENDERER_VERSION
+        return stats
+
+
+# Create a singleton instance
+pdf_cache = PDFCache()
@@ -0,0 +1,321 @@
+"""Process pool for CPU-heavy PDF rendering"""
+import os
+import time
+import heapq
+import atexit
+import logging
+import itertools
+import threading
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+# Worker processes; 0 renders inline on the calling thread
+RENDER_POOL_WORKERS = int(os.environ.get('RENDER_POOL_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+# A job fails if it hasn't finished this many seconds after it was submitted
+RENDER_TIMEOUT_SECONDS = float(os.environ.get('RENDER_TIMEOUT_SECONDS', 60))
+# Jobs waiting beyond this are rejected instead of queued
+RENDER_QUEUE_MAX = int(os.environ.get('RENDER_QUEUE_MAX', 200))
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+PDFKIT_OPTIONS = {
+    'page-size': 'Letter',
+    'margin-top': '0.75in',
+    'margin-right': '0.75in',
+    'margin-bottom': '0.75in',
+    'margin-left': '0.75in',
+    'encoding': 'UTF-8',
+    'no-outline': None
+}
+
+
+class RenderError(Exception):
+    """A render failed in its worker"""
+
+
+class RenderTimeout(RenderError):
+    """A render did not finish within its timeout"""
+
+
+class RenderQueueFull(RenderError):
+    """Too many renders are already waiting"""
+
+
+def render_weasyprint(html_content, css_content=None):
+    """Render HTML to PDF with WeasyPrint; runs in a worker process (or inline)"""
+    from .document_service import DocumentService
+    return DocumentService.generate_pdf_from_html(html_content, css_content)
+
+
+def render_pdfkit(html_content, options=None):
+    """Render HTML to PDF with pdfkit; runs in a worker process (or inline)"""
+    import pdfkit
+    return pdfkit.from_string(html_content, False, options=options or PDFKIT_OPTIONS)
+
+
+def _worker_main(conn):
+    """Worker process loop: warm up once, then render jobs from the pipe"""
+    try:
+        # Loads WeasyPrint, the shared font configuration and fontconfig's caches
+        render_weasyprint('<p>warm-up</p>', 'p { font-family: sans-serif; }')
+    except Exception as e:
+        logger.warning(f"Render worker warm-up failed: {e}")
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        renderer, args = job
+        start = time.perf_counter()
+        try:
+            content = renderer(*args)
+            conn.send(('ok', content, (time.perf_counter() - start) * 1000))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}", (time.perf_counter() - start) * 1000))
+
+
+class RenderJob:
+    """A queued render; result() blocks until it finishes"""
+
+    def __init__(self, renderer, args, priority, timeout):
+        self.renderer = renderer
+        self.args = args
+        self.priority = priority
+        self.submitted = time.monotonic()
+        self.deadline = self.submitted + timeout
+        self.render_ms = None
+        self._done = threading.Event()
+        self._content = None
+        self._error = None
+
+    def finish(self, content=None, error=None):
+        self._content = content
+        self._error = error
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self):
+        """The rendered PDF bytes; raises RenderError on failure"""
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._content
+
+
+class RenderPool:
+    """
+    Pre-forked render workers fed from a priority queue
+
+    Each worker is a long-lived process that has already loaded WeasyPrint and
+    its fonts, so renders don't hold the GIL of the API process. One dispatcher
+    thread per worker takes the most urgent job (lowest priority value, then
+    oldest), sends it over the worker's pipe and waits for the PDF. A worker
+    that overruns a job's deadline or dies is killed and replaced.
+    """
+
+    def __init__(self, workers=RENDER_POOL_WORKERS, timeout=RENDER_TIMEOUT_SECONDS, max_queue=RENDER_QUEUE_MAX):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self._context = multiprocessing.get_context('spawn')
+        self._queue = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._slots = []
+        self._started = False
+        self._closed = False
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0, 'timeouts': 0, 'rejected': 0,
+            'worker_restarts': 0, 'render_ms': 0.0, 'max_render_ms': 0.0, 'wait_ms': 0.0,
+            'max_queue_depth': 0, 'busy_workers': 0
+        }
+
+    def _start(self):
+        """Start the dispatcher threads and their workers (on first use)"""
+        if self._started:
+            return
+        self._started = True
+        for index in range(self.workers):
+            slot = {'index': index, 'process': None, 'conn': None}
+            self._slots.append(slot)
+            thread = threading.Thread(target=self._dispatch, args=(slot,), name=f"render-worker-{index}", daemon=True)
+            thread.start()
+        atexit.register(self.shutdown)
+
+    def _spawn(self, slot):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        slot['process'], slot['conn'] = process, parent_conn
+
+    def _kill(self, slot):
+        process, conn = slot['process'], slot['conn']
+        slot['process'] = slot['conn'] = None
+        if conn is not None:
+            conn.close()
+        if process is not None and process.is_alive():
+            process.kill()
+            process.join(timeout=5)
+        with self._lock:
+            self._stats['worker_restarts'] += 1
+
+    def submit(self, renderer, args, priority=PRIORITY_NORMAL, timeout=None):
+        """
+        Queue a render
+
+        Args:
+            renderer (callable): Module-level function run in a worker, such as render_weasyprint
+            args (tuple): Arguments for the renderer
+            priority (int): Lower values render first
+            timeout (float, optional): Seconds from now until the job fails
+
+        Returns:
+            RenderJob: The queued job
+        """
+        job = RenderJob(renderer, args, priority, timeout or self.timeout)
+        if self.workers <= 0:
+            self._run_inline(job)
+            return job
+        with self._lock:
+            if self._closed:
+                raise RenderError('Render pool is shut down')
+            if len(self._queue) >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise RenderQueueFull(f"{len(self._queue)} renders already queued")
+            self._start()
+            heapq.heappush(self._queue, (priority, next(self._sequence), job))
+            self._stats['submitted'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], len(self._queue))
+            self._ready.notify()
+        return job
+
+    def render_pdf(self, html_content, css_content=None, priority=PRIORITY_NORMAL, timeout=None):
+        """Render HTML to PDF with WeasyPrint in a worker and wait for the bytes"""
+        return self.submit(render_weasyprint, (html_content, css_content), priority, timeout).result()
+
+    def render_pdfkit(self, html_content, options=None, priority=PRIORITY_NORMAL, timeout=None):
+        """Render HTML to PDF with pdfkit (wkhtmltopdf) in a worker and wait for the bytes"""
+        return self.submit(render_pdfkit, (html_content, options), priority, timeout).result()
+
+    def _run_inline(self, job):
+        with self._lock:
+            self._stats['submitted'] += 1
+        start = time.perf_counter()
+        try:
+            content = job.renderer(*job.args)
+        except Exception as e:
+            self._record(job, 0.0, error=RenderError(f"{type(e).__name__}: {e}"))
+            return
+        self._record(job, (time.perf_counter() - start) * 1000, content=content)
+
+    def _record(self, job, render_ms, content=None, error=None):
+        job.render_ms = render_ms
+        with self._lock:
+            if error is None:
+                self._stats['completed'] += 1
+                self._stats['render_ms'] += render_ms
+                self._stats['max_render_ms'] = max(self._stats['max_render_ms'], render_ms)
+            else:
+                self._stats['failed'] += 1
+                if isinstance(error, RenderTimeout):
+                    self._stats['timeouts'] += 1
+        job.finish(content, error)
+
+    def _dispatch(self, slot):
+        """Dispatcher thread: feeds one worker process from the shared queue"""
+        while True:
+            with self._lock:
+                while not self._queue and not self._closed:
+                    self._ready.wait()
+                if self._closed:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+                self._stats['wait_ms'] += (time.monotonic() - job.submitted) * 1000
+                self._stats['busy_workers'] += 1
+            try:
+                self._run(slot, job)
+            finally:
+                with self._lock:
+                    self._stats['busy_workers'] -= 1
+
+    def _run(self, slot, job):
+        remaining = job.deadline - time.monotonic()
+        if remaining <= 0:
+            self._record(job, 0.0, error=RenderTimeout('Render timed out in the queue'))
+            return
+        try:
+            if slot['process'] is None or not slot['process'].is_alive():
+                self._spawn(slot)
+            slot['conn'].send((job.renderer, job.args))
+            if not slot['conn'].poll(job.deadline - time.monotonic()):
+                logger.warning(f"Render exceeded its deadline, restarting worker {slot['index']}")
+                self._kill(slot)
+                self._record(job, (time.monotonic() - job.submitted) * 1000, error=RenderTimeout('Render timed out'))
+                return
+            status, value, render_ms = slot['conn'].recv()
+        except (EOFError, OSError) as e:
+            logger.error(f"Render worker {slot['index']} died: {e}")
+            self._kill(slot)
+            self._record(job, 0.0, error=RenderError(f"Render worker died: {e}"))
+            return
+        except Exception as e:
+            # Jobs or results that can't be pickled fail before anything is
+            # written to the pipe, so the worker can keep serving
+            logger.error(f"Render job could not be exchanged with worker {slot['index']}: {e}")
+            self._record(job, 0.0, error=RenderError(f"{type(e).__name__}: {e}"))
+            return
+        if status == 'ok':
+            self._record(job, render_ms, content=value)
+        else:
+            self._record(job, render_ms, error=RenderError(value))
+
+    def stats(self):
+        """Render timings, failures and queue depth"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._queue)
+        stats['workers'] = self.workers
+        stats['avg_render_ms'] = round(stats['render_ms'] / stats['completed'], 1) if stats['completed'] else 0.0
+        started = stats['completed'] + stats['failed']
+        stats['avg_wait_ms'] = round(stats['wait_ms'] / started, 1) if started else 0.0
+        stats['render_ms'] = round(stats['render_ms'], 1)
+        stats['max_render_ms'] = round(stats['max_render_ms'], 1)
+        stats['wait_ms'] = round(stats['wait_ms'], 1)
+        return stats
+
+    def shutdown(self):
+        """Fail queued jobs and stop the workers"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            pending = [job for _, _, job in self._queue]
+            self._queue.clear()
+            self._ready.notify_all()
+        for job in pending:
+            job.finish(error=RenderError('Render pool is shut down'))
+        for slot in self._slots:
+            conn = slot['conn']
+            if conn is not None:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+            process = slot['process']
+            if process is not None:
+                process.join(timeout=2)
+                if process.is_alive():
+                    process.kill()
+
+
+# Create a singleton instance
+render_pool = RenderPool()
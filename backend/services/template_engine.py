@@ -0,0 +1,109 @@
+"""Compiled template cache for document generation"""
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from jinja2 import Environment
+
+logger = logging.getLogger(__name__)
+
+# Number of compiled templates kept in memory
+TEMPLATE_CACHE_SIZE = int(os.environ.get('TEMPLATE_CACHE_SIZE', 128))
+
+
+def content_hash(template_content):
+    """Stable hash of a template's source, used as its version"""
+    return hashlib.sha256(template_content.encode('utf-8')).hexdigest()
+
+
+class TemplateEngine:
+    """
+    Compiles each document template once and reuses it
+
+    Compiled templates are keyed by template ID and content hash, so editing a
+    template's source compiles the new version and drops the old one. The cache
+    is bounded and evicts the least recently used template.
+    """
+
+    def __init__(self, max_size=TEMPLATE_CACHE_SIZE, environment=None):
+        self.max_size = max_size
+        self.environment = environment or Environment()
+        self._cache = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'compile_ms': 0.0}
+
+    def get(self, template_id, template_content):
+        """
+        Get the compiled template for this ID and source, compiling it on first use
+
+        Args:
+            template_id (str): The template ID, or None for ad hoc templates
+            template_content (str): The template source
+
+        Returns:
+            jinja2.Template: The compiled template
+        """
+        version = content_hash(template_content)
+        key = (template_id, version)
+        with self._lock:
+            template = self._cache.get(key)
+            if template is not None:
+                self._cache.move_to_end(key)
+                self._stats['hits'] += 1
+                return template
+            self._stats['misses'] += 1
+
+        start = time.perf_counter()
+        template = self.environment.from_string(template_content)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats['compile_ms'] += elapsed_ms
+            previous = self._versions.get(template_id) if template_id is not None else None
+            if previous is not None and previous != version:
+                # The template changed: its old compiled version is stale
+                if self._cache.pop((template_id, previous), None) is not None:
+                    self._stats['invalidations'] += 1
+            if template_id is not None:
+                self._versions[template_id] = version
+            self._cache[key] = template
+            while len(self._cache) > self.max_size:
+                (evicted_id, evicted_version), _ = self._cache.popitem(last=False)
+                if self._versions.get(evicted_id) == evicted_version:
+                    del self._versions[evicted_id]
+                self._stats['evictions'] += 1
+        return template
+
+    def render(self, template_id, template_content, data):
+        """Render a template with the provided data, compiling it at most once"""
+        return self.get(template_id, template_content).render(**data)
+
+    def invalidate(self, template_id=None):
+        """Drop one template's compiled versions, or the whole cache"""
+        with self._lock:
+            if template_id is None:
+                self._cache.clear()
+                self._versions.clear()
+                return
+            for key in [key for key in self._cache if key[0] == template_id]:
+                del self._cache[key]
+            self._versions.pop(template_id, None)
+
+    def stats(self):
+        """Cache hit rate and template compile time"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._cache)
+        lookups = stats['hits'] + stats['misses']
+        stats['max_size'] = self.max_size
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['avg_compile_ms'] = round(stats['compile_ms'] / stats['misses'], 3) if stats['misses'] else 0.0
+        stats['compile_ms'] = round(stats['compile_ms'], 3)
+        return stats
+
+
+# Create a singleton instance
+template_engine = TemplateEngine()
@@ -1,3 +0,0 @@
-"""
-Test package for SmartProBono backend.
-""" 
\ No newline at end of file
@@ -3,10 +3,11 @@ Pytest configuration for production testing
 """
 import pytest
 from flask import Flask
-from backend.app import create_app
-from extensions import db
-from models.user import User
-from models.template import Template
+from flask_jwt_extended import JWTManager
+from sqlalchemy import inspect
+import database
+from models.document import Document
+from routes import document_listings
 from datetime import datetime
 import os
 from pathlib import Path
@@ -33,10 +34,14 @@ def get_prod_test_config():
 @pytest.fixture(scope='session')
 def app():
     """Create test Flask application with production-like settings"""
+    # Imported here so the document fixtures below load without the full app
+    from backend.app import create_app
+    from extensions import db
+    
     app = create_app(get_prod_test_config())
     
     with app.app_context():
-            db.create_all()
+        db.create_all()
         
         # Set up upload directory
         upload_dir = Path(app.config['UPLOAD_FOLDER'])
@@ -44,9 +49,10 @@ def app():
     
     yield app
     
+    with app.app_context():
         # Cleanup
         db.session.remove()
-            db.drop_all()
+        db.drop_all()
         
         # Clean up upload directory
         if upload_dir.exists():
@@ -55,6 +61,8 @@ def app():
 @pytest.fixture(scope='function')
 def session(app):
     """Create a new database session for each test"""
+    from extensions import db
+    
     with app.app_context():
         connection = db.engine.connect()
         transaction = connection.begin()
@@ -73,47 +81,99 @@ def session(app):
 @pytest.fixture(scope='function')
 def test_user(session):
     """Create a real test user"""
-        user = User(
-            email="test@example.com",
-            role="user",
-            first_name="Test",
-            last_name="User",
-            active=True
-        )
+    from models.user import User
+    
+    user = User(
+        email="test@example.com",
+        role="user",
+        first_name="Test",
+        last_name="User",
+        active=True
+    )
     user.set_password("test_password")
     session.add(user)
     session.commit()
-        return user
+    return user
 
 @pytest.fixture(scope='function')
 def test_admin(session):
     """Create a real admin user"""
-        admin = User(
-            email="admin@example.com",
-            role="admin",
-            first_name="Admin",
-            last_name="User",
-            active=True
-        )
+    from models.user import User
+    
+    admin = User(
+        email="admin@example.com",
+        role="admin",
+        first_name="Admin",
+        last_name="User",
+        active=True
+    )
     admin.set_password("admin_password")
     session.add(admin)
     session.commit()
-        return admin
+    return admin
 
 @pytest.fixture(scope='function')
 def template(session):
     """Create a real template for testing"""
-        template = Template(
-            template_id="test_template_1",
-            name="Test Template",
-            title="Test Form Template",
-            fields={"field1": "text", "field2": "number"},
-            version="1.0",
-            is_active=True
-        )
+    from models.template import Template
+    
+    template = Template(
+        template_id="test_template_1",
+        name="Test Template",
+        title="Test Form Template",
+        fields={"field1": "text", "field2": "number"},
+        version="1.0",
+        is_active=True
+    )
     session.add(template)
     session.commit()
-        return template
+    return template
+
+@pytest.fixture(scope='function')
+def documents_app():
+    """App with the SQL document models and the document listing endpoints
+    
+    Runs on TEST_DATABASE_URL when set, otherwise on in-memory SQLite, and
+    sets the schema up through database.init_db like app.py does.
+    """
+    config = get_prod_test_config()
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        JWT_SECRET_KEY=config['JWT_SECRET_KEY'],
+        SQLALCHEMY_DATABASE_URI=os.environ.get('TEST_DATABASE_URL', 'sqlite://'),
+        MONGO_URI=config['MONGO_URI']
+    )
+    JWTManager(app)
+    database.init_db(app)
+    app.register_blueprint(document_listings.bp)
+    
+    with app.app_context():
+        yield app
+        database.db.session.remove()
+        database.db.drop_all()
+
+@pytest.fixture(scope='function')
+def make_document(documents_app):
+    """Factory for Document rows; whatever the test left of them is deleted afterwards"""
+    created = []
+
+    def make(title='Document', user_id=1, **fields):
+        document = Document()
+        document.title = title
+        document.uploaded_by = user_id
+        for name, value in fields.items():
+            setattr(document, name, value)
+        database.db.session.add(document)
+        created.append(document)
+        return document
+
+    with documents_app.app_context():
+        yield make
+        for document in created:
+            if inspect(document).persistent:
+                database.db.session.delete(document)
+        database.db.session.commit()
 
 def pytest_configure(config):
     """Configure pytest with custom markers"""
@@ -0,0 +1,104 @@
+"""Tests for full-text document search"""
+import pytest
+from flask_jwt_extended import create_access_token
+from models import search as search_model
+from models.search import DocumentSearch
+import database
+from database import db
+
+# Matches uploaded_by on the documents the tests create (sent as the JWT subject string)
+TEST_USER_ID = 1
+
+@pytest.fixture
+def client(documents_app):
+    """Create a test client."""
+    return documents_app.test_client()
+
+@pytest.fixture
+def auth_headers(documents_app):
+    """Create valid JWT token and headers."""
+    with documents_app.app_context():
+        token = create_access_token(identity=str(TEST_USER_ID))
+        return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def corpus(make_document):
+    documents = [
+        make_document('Eviction notice', TEST_USER_ID, content='The landlord served a notice to quit for unpaid rent.'),
+        make_document('Lease agreement', TEST_USER_ID, content='The tenant pays rent monthly. Eviction requires a court order.'),
+        make_document('Visa application', TEST_USER_ID, content='Supporting affidavit for the asylum petition.'),
+        make_document('Other tenant', 2, content='Eviction eviction eviction.'),
+    ]
+    db.session.commit()
+    return documents
+
+def test_search_ranks_title_matches_first(corpus):
+    """Title matches outrank body matches, and only the user's documents match"""
+    results, total = DocumentSearch.search(1, 'eviction')
+    assert total == 2
+    assert [r['title'] for r in results] == ['Eviction notice', 'Lease agreement']
+    assert results[0]['rank'] > results[1]['rank']
+
+def test_search_snippets_highlight_and_escape(corpus):
+    """Snippets mark the matched words and escape document HTML"""
+    corpus[2].content = '<script>alert(1)</script> affidavit for the asylum petition'
+    db.session.commit()
+    results, _ = DocumentSearch.search(1, 'asylum')
+    assert '<mark>asylum</mark>' in results[0]['snippet']
+    assert '<script>' not in results[0]['snippet']
+
+def test_index_follows_edits_and_deletes(corpus):
+    """Edits are searchable at once and deleted documents drop out"""
+    corpus[2].content = 'Custody hearing scheduled'
+    db.session.commit()
+    assert DocumentSearch.search(1, 'custody')[1] == 1
+    assert DocumentSearch.search(1, 'asylum')[1] == 0
+
+    db.session.delete(corpus.pop(0))
+    db.session.commit()
+    assert [r['title'] for r in DocumentSearch.search(1, 'eviction')[0]] == ['Lease agreement']
+
+def test_ocr_text_searchable(corpus):
+    """OCR output is indexed and survives later edits to the document"""
+    assert DocumentSearch.set_ocr_text(corpus[2].id, 'Passport number X1234 issued in Lagos')
+    assert DocumentSearch.search(1, 'passport')[1] == 1
+
+    corpus[2].title = 'Visa application (renewal)'
+    db.session.commit()
+    assert DocumentSearch.search(1, 'passport')[1] == 1
+
+def test_search_pages(corpus):
+    """Pages split the ranked results"""
+    first, total = DocumentSearch.search(1, 'eviction', page=1, limit=1)
+    second, _ = DocumentSearch.search(1, 'eviction', page=2, limit=1)
+    assert total == 2
+    assert first[0]['document_id'] != second[0]['document_id']
+
+def test_documents_save_before_search_tables_exist(documents_app, make_document):
+    """Without the search tables documents save unindexed, and the backfill indexes them"""
+    DocumentSearch.__table__.drop(db.engine)
+    try:
+        document = make_document('Eviction notice', TEST_USER_ID, content='Notice to quit.')
+        db.session.commit()
+        # The missing tables are remembered rather than looked up on every save
+        assert search_model._search_tables == {db.engine: False}
+        document.content = 'Notice to quit for unpaid rent.'
+        db.session.commit()
+    finally:
+        database.create_missing_tables(documents_app)
+    assert search_model._search_tables == {}
+
+    assert DocumentSearch.search(TEST_USER_ID, 'rent')[1] == 0
+    assert DocumentSearch.backfill() == 1
+    assert DocumentSearch.search(TEST_USER_ID, 'rent')[1] == 1
+
+def test_search_ignores_owner_column(corpus):
+    """Search words never match the owner token FTS5 stores with each document"""
+    assert DocumentSearch.search(1, 'owner1')[1] == 0
+
+def test_search_endpoint(client, auth_headers, corpus):
+    """The search endpoint returns ranked results and requires a query"""
+    response = client.get('/api/documents/search?q=rent', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 2
+    assert client.get('/api/documents/search', headers=auth_headers).status_code == 400
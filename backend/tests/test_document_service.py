@@ -0,0 +1,170 @@
+"""Tests for in-memory document rendering"""
+import io
+import json
+import tempfile
+import zipfile
+import pytest
+from PyPDF2 import PdfReader
+from services import document_service
+from services.document_service import (
+    DocumentService, generate_document, generate_pdf, get_stylesheet,
+    generate_documents_batch, stream_batch_zip, merge_batch_pdf
+)
+from services.render_pool import RenderPool
+from services.template_engine import TemplateEngine
+from services.pdf_cache import PDFCache, cache_key
+
+FEE_WAIVER_DATA = {
+    'full_name': 'Jane Doe',
+    'case_number': 'CV-2024-001',
+    'court_name': 'Superior Court',
+    'monthly_income': 1200,
+    'household_size': 3
+}
+
+@pytest.fixture(autouse=True)
+def pdf_cache(tmp_path, monkeypatch):
+    """Give every test an empty PDF cache"""
+    cache = PDFCache(str(tmp_path / 'pdf_cache'))
+    monkeypatch.setattr(document_service, 'pdf_cache', cache)
+    return cache
+
+@pytest.fixture(autouse=True)
+def inline_renders(monkeypatch):
+    """Render on the test thread instead of in worker processes"""
+    monkeypatch.setattr(document_service, 'render_pool', RenderPool(workers=0))
+
+@pytest.fixture
+def no_temp_files(monkeypatch):
+    """Fail the test if rendering round-trips through a temporary file"""
+    def fail(*args, **kwargs):
+        raise AssertionError('rendering must not create temporary files')
+    monkeypatch.setattr(tempfile, 'NamedTemporaryFile', fail)
+
+def test_generate_pdf_from_html_in_memory(no_temp_files):
+    """PDFs are rendered straight to bytes"""
+    pdf = DocumentService.generate_pdf_from_html('<h1>Test</h1>', 'h1 { color: navy; }')
+    assert pdf.startswith(b'%PDF')
+
+def test_stylesheet_parsed_once():
+    """The same CSS string returns the same parsed stylesheet"""
+    css = 'body { font-family: Arial, sans-serif; }'
+    assert get_stylesheet(css) is get_stylesheet(css)
+    assert get_stylesheet(css) is not get_stylesheet(css + ' h1 { margin: 0; }')
+
+def test_generate_document_pdf_content(no_temp_files):
+    """Generated PDFs are returned as content, not a temp file path"""
+    result = generate_document('fee_waiver', FEE_WAIVER_DATA)
+    assert result['format'] == 'pdf'
+    assert 'path' not in result
+    assert result['content'].startswith(b'%PDF')
+    assert result['size'] == len(result['content'])
+
+def test_generate_simple_pdf_in_memory(no_temp_files):
+    """The reportlab fallback renders to bytes as well"""
+    assert generate_pdf('doc_123').startswith(b'%PDF')
+
+def test_template_compiled_once():
+    """Rendering the same template repeatedly compiles it once"""
+    engine = TemplateEngine()
+    for i in range(1000):
+        assert engine.render('retainer', 'Retainer for {{ client }}', {'client': i}) == f'Retainer for {i}'
+    stats = engine.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 999
+    assert stats['compile_ms'] > 0
+
+def test_template_invalidated_on_change():
+    """Editing a template's source replaces its compiled version"""
+    engine = TemplateEngine()
+    assert engine.render('letter', 'Dear {{ name }}', {'name': 'Ann'}) == 'Dear Ann'
+    assert engine.render('letter', 'Hello {{ name }}', {'name': 'Ann'}) == 'Hello Ann'
+    stats = engine.stats()
+    assert stats['invalidations'] == 1
+    assert stats['size'] == 1
+
+def test_template_cache_bounded():
+    """The least recently used template is evicted past the size limit"""
+    engine = TemplateEngine(max_size=2)
+    for template_id in ('a', 'b', 'c'):
+        engine.render(template_id, template_id + '{{ x }}', {'x': 1})
+    stats = engine.stats()
+    assert stats['size'] == 2
+    assert stats['evictions'] == 1
+
+def test_cache_key_canonical():
+    """The cache key ignores key order but not template or data changes"""
+    assert cache_key('v1', {'a': 1, 'b': 2}) == cache_key('v1', {'b': 2, 'a': 1})
+    assert cache_key('v1', {'a': 1}) != cache_key('v2', {'a': 1})
+    assert cache_key('v1', {'a': 1}) != cache_key('v1', {'a': 2})
+    assert cache_key('v1', {'a': 1}, 'renderer-1') != cache_key('v1', {'a': 1}, 'renderer-2')
+
+def test_repeat_pdf_served_from_cache(pdf_cache, monkeypatch):
+    """The same template and data are rendered once"""
+    first = generate_document('fee_waiver', FEE_WAIVER_DATA)
+    assert first['cached'] is False
+    
+    def fail(*args, **kwargs):
+        raise AssertionError('cached PDF must not be rendered again')
+    monkeypatch.setattr(DocumentService, 'generate_pdf_from_html', staticmethod(fail))
+    second = generate_document('fee_waiver', dict(reversed(list(FEE_WAIVER_DATA.items()))))
+    assert second['cached'] is True
+    assert second['etag'] == first['etag']
+    assert second['content'] == first['content']
+    assert pdf_cache.stats()['hits'] == 1
+
+def test_pdf_cache_evicts_least_recently_used(tmp_path):
+    """Past the size budget the least recently used PDF is removed from disk"""
+    cache = PDFCache(str(tmp_path), max_bytes=25)
+    cache.put('first', b'1' * 10)
+    cache.put('second', b'2' * 10)
+    assert cache.get('first') == b'1' * 10
+    cache.put('third', b'3' * 10)
+    assert cache.get('second') is None
+    assert not (tmp_path / 'second.pdf').exists()
+    assert cache.stats()['bytes'] == 20
+    
+    # The index survives a restart
+    assert PDFCache(str(tmp_path), max_bytes=25).get('third') == b'3' * 10
+
+def test_pdf_cache_budget_shared_between_workers(tmp_path):
+    """Caches on one directory, as in separate workers, keep to one budget"""
+    worker_a = PDFCache(str(tmp_path), max_bytes=25)
+    worker_b = PDFCache(str(tmp_path), max_bytes=25)
+    worker_a.put('first', b'1' * 10)
+    worker_b.put('second', b'2' * 10)
+    assert worker_b.get('first') == b'1' * 10
+    worker_a.put('third', b'3' * 10)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['first.pdf', 'third.pdf']
+    assert worker_b.stats()['bytes'] == 20
+
+def test_batch_reports_failures_without_aborting():
+    """A bad record fails on its own; the others are generated in order"""
+    records = [FEE_WAIVER_DATA, 'not a record', {**FEE_WAIVER_DATA, 'full_name': 'John Roe'}]
+    items = list(generate_documents_batch('fee_waiver', records))
+    assert [item['index'] for item in items] == [0, 1, 2]
+    assert [item['status'] for item in items] == ['ok', 'error', 'ok']
+    assert items[0]['content'].startswith(b'%PDF')
+    assert 'Record must be an object' in items[1]['error']
+
+def test_batch_zip_stream():
+    """The ZIP holds one file per successful record and a manifest"""
+    records = [FEE_WAIVER_DATA, None, {**FEE_WAIVER_DATA, 'full_name': 'John Roe'}]
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_batch_zip('fee_waiver', records))))
+    assert archive.namelist() == ['fee_waiver_0001.pdf', 'fee_waiver_0003.pdf', 'manifest.json']
+    manifest = json.loads(archive.read('manifest.json'))
+    assert manifest['total'] == 3
+    assert manifest['failed'] == 1
+    assert manifest['items'][1]['status'] == 'error'
+
+def test_batch_merged_pdf():
+    """Merged output has every successful record's pages, in order"""
+    single = PdfReader(io.BytesIO(generate_document('fee_waiver', FEE_WAIVER_DATA)['content']))
+    content, failures = merge_batch_pdf('fee_waiver', [FEE_WAIVER_DATA, 42, FEE_WAIVER_DATA])
+    assert len(PdfReader(io.BytesIO(content)).pages) == 2 * len(single.pages)
+    assert failures == [{'index': 1, 'error': 'Record must be an object'}]
+
+def test_batch_unknown_template():
+    """An unknown template fails the whole batch up front"""
+    with pytest.raises(ValueError):
+        list(generate_documents_batch('no_such_template', [{}]))
@@ -0,0 +1,87 @@
+"""Tests for the normalized document tag index"""
+import pytest
+from flask_jwt_extended import create_access_token
+from models.document import Document, DocumentTag, TagCount
+from database import db
+
+# Matches uploaded_by on the documents the tests create (sent as the JWT subject string)
+TEST_USER_ID = 1
+
+@pytest.fixture
+def client(documents_app):
+    """Create a test client."""
+    return documents_app.test_client()
+
+@pytest.fixture
+def auth_headers(documents_app):
+    """Create valid JWT token and headers."""
+    with documents_app.app_context():
+        token = create_access_token(identity=str(TEST_USER_ID))
+        return {'Authorization': f'Bearer {token}'}
+
+def tagged(make_document, title, tags, user_id=TEST_USER_ID):
+    return make_document(title, user_id, file_url=f'http://test.com/{title}.pdf', file_type='pdf', tags=tags)
+
+@pytest.fixture
+def tagged_documents(make_document):
+    documents = [
+        tagged(make_document, 'visa', ['Immigration', 'urgent']),
+        tagged(make_document, 'asylum', ['immigration']),
+        tagged(make_document, 'lease', ['housing', 'urgent'], user_id=2),
+    ]
+    db.session.commit()
+    return documents
+
+def test_tag_rows_follow_tags(tagged_documents):
+    """Setting tags adds and removes only the changed document_tags rows"""
+    visa = tagged_documents[0]
+    assert {row.tag for row in visa.tag_rows} == {'immigration', 'urgent'}
+    
+    visa.tags = ['immigration', 'appeal']
+    db.session.commit()
+    rows = DocumentTag.query.filter_by(document_id=visa.id).all()
+    assert {row.tag for row in rows} == {'immigration', 'appeal'}
+    assert all(row.user_id == 1 for row in rows)
+
+def test_tag_counts_maintained(tagged_documents):
+    """Tag counts change with tag edits and document deletes"""
+    assert dict(TagCount.most_common()) == {'immigration': 2, 'urgent': 2, 'housing': 1}
+    
+    tagged_documents[0].tags = ['immigration']
+    db.session.commit()
+    assert dict(TagCount.most_common())['urgent'] == 1
+    
+    db.session.delete(tagged_documents[1])
+    db.session.commit()
+    assert dict(TagCount.most_common())['immigration'] == 1
+
+def test_tag_search_any_and_all(tagged_documents):
+    """Any-of and all-of tag search only return the user's documents"""
+    assert {d.title for d in DocumentTag.search(1, ['urgent', 'immigration'])} == {'visa', 'asylum'}
+    assert [d.title for d in DocumentTag.search(1, ['urgent', 'IMMIGRATION'], match='all')] == ['visa']
+    assert DocumentTag.search(1, ['housing']).all() == []
+
+def test_backfill_indexes_existing_documents(make_document):
+    """Documents whose tags predate the index are indexed by the backfill"""
+    document = tagged(make_document, 'legacy', [])
+    db.session.commit()
+    db.session.execute(
+        Document.__table__.update().where(Document.id == document.id).values(tags='["Eviction"]')
+    )
+    db.session.commit()
+    db.session.expire_all()
+    
+    DocumentTag.backfill(batch_size=1)
+    assert [row.tag for row in Document.query.get(document.id).tag_rows] == ['eviction']
+    assert dict(TagCount.most_common())['eviction'] == 1
+    
+    # Running it again changes nothing
+    DocumentTag.backfill()
+    assert dict(TagCount.most_common())['eviction'] == 1
+
+def test_common_tags_endpoint(client, auth_headers, tagged_documents):
+    """The common tags endpoint reads the maintained counts"""
+    response = client.get('/api/documents/tags/common', headers=auth_headers)
+    assert response.status_code == 200
+    tags = {item['tag']: item['count'] for item in response.get_json()['tags']}
+    assert tags['immigration'] == 2
@@ -0,0 +1,117 @@
+"""Tests for the delta-compressed document version store"""
+import json
+import pytest
+from flask_jwt_extended import create_access_token
+from models import document as document_model
+from models.document import DocumentVersion, make_delta, apply_delta
+from database import db
+from utils.pagination import encode_cursor
+
+# Matches uploaded_by on the documents the tests create (sent as the JWT subject string)
+TEST_USER_ID = 1
+
+@pytest.fixture
+def client(documents_app):
+    """Create a test client."""
+    return documents_app.test_client()
+
+@pytest.fixture
+def auth_headers(documents_app):
+    """Create valid JWT token and headers."""
+    with documents_app.app_context():
+        token = create_access_token(identity=str(TEST_USER_ID))
+        return {'Authorization': f'Bearer {token}'}
+
+def make_content(edit):
+    lines = [f'Clause {i}: the tenant shall keep the premises in good repair.\n' for i in range(200)]
+    lines[edit % 200] = f'Clause {edit % 200}: amended in revision {edit}.\n'
+    return ''.join(lines)
+
+@pytest.fixture
+def document(make_document):
+    document = make_document('Lease', TEST_USER_ID, content=make_content(0))
+    db.session.commit()
+    return document
+
+def test_delta_round_trip():
+    """Applying a diff to the old text gives the new text"""
+    old = 'line one\nline two\nline three'
+    for new in ['line one\nline 2\nline three', '', 'prefix\n' + old, old + '\nsuffix', 'no newline']:
+        assert apply_delta(old, make_delta(old, new)) == new
+
+def test_every_version_reconstructed(document, monkeypatch):
+    """Any version can be rebuilt, across several snapshot intervals"""
+    monkeypatch.setattr(document_model, 'VERSION_SNAPSHOT_INTERVAL', 5)
+    for edit in range(1, 13):
+        document.add_version(document.content)
+        document.content = make_content(edit)
+        db.session.commit()
+
+    assert document.version_count == 12
+    assert DocumentVersion.contents(document.id, 1, 12) == {v: make_content(v - 1) for v in range(1, 13)}
+    assert document.get_version(7) == make_content(6)
+    assert document.get_version(13) is None
+    snapshots = [row.version for row in document.versions.filter_by(is_snapshot=True)]
+    assert snapshots == [1, 6, 11]
+
+def test_versions_before_first_commit(make_document):
+    """Versions added to a document before it is flushed are numbered in order"""
+    document = make_document('Draft', TEST_USER_ID, content='first draft')
+    document.add_version('first draft')
+    document.add_version('second draft')
+    db.session.commit()
+
+    assert [row.version for row in document.versions] == [1, 2]
+    assert document.get_version(2) == 'second draft'
+
+def test_diff_rows_are_edit_sized(document):
+    """A small edit stores a row far smaller than the document"""
+    for edit in range(1, 4):
+        document.add_version(document.content)
+        document.content = make_content(edit)
+        db.session.commit()
+    rows = document.versions.all()
+    assert rows[0].is_snapshot
+    assert all(not row.is_snapshot for row in rows[1:])
+    assert all(len(row.data) < len(rows[0].data) / 4 for row in rows[1:])
+
+def test_migrate_legacy_history(document):
+    """JSON histories are moved into the version store"""
+    document._history = json.dumps([
+        {'content': 'first draft', 'timestamp': '2024-01-01T10:00:00', 'version': 1},
+        {'content': 'second draft', 'timestamp': '2024-01-02T10:00:00', 'version': 2},
+    ])
+    db.session.commit()
+
+    assert DocumentVersion.migrate_history() == 1
+    db.session.expire_all()
+    assert document._history is None
+    assert document.get_version(2) == 'second draft'
+    assert document.to_dict()['version_count'] == 2
+    assert DocumentVersion.migrate_history() == 0
+
+def test_versions_endpoint_pages(client, auth_headers, document):
+    """The versions endpoint pages newest first, current version included"""
+    for edit in range(1, 4):
+        document.add_version(document.content)
+        document.content = make_content(edit)
+        db.session.commit()
+
+    response = client.get(f'/api/documents/{document.id}/versions?limit=2', headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [v['version'] for v in data['versions']] == [4, 3]
+    assert data['versions'][0]['isCurrent']
+    assert data['versions'][1]['content'] == make_content(2)
+
+    response = client.get(
+        f"/api/documents/{document.id}/versions?limit=2&cursor={data['next_cursor']}", headers=auth_headers
+    )
+    assert [v['version'] for v in response.get_json()['versions']] == [2, 1]
+    assert response.get_json()['next_cursor'] is None
+
+def test_versions_endpoint_rejects_foreign_cursor(client, auth_headers, document):
+    """A listing cursor (timestamp, id) is a 400, not a 500"""
+    cursor = encode_cursor(document.updated_at, document.id)
+    response = client.get(f'/api/documents/{document.id}/versions?cursor={cursor}', headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+"""Tests for keyset pagination of document listings"""
+from datetime import datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from models.document import Document
+from database import db
+from utils.pagination import (
+    InvalidCursor, encode_cursor, decode_cursor, keyset_page, count_total
+)
+
+# Matches uploaded_by on the documents the tests create (sent as the JWT subject string)
+TEST_USER_ID = 1
+
+@pytest.fixture
+def client(documents_app):
+    """Create a test client."""
+    return documents_app.test_client()
+
+@pytest.fixture
+def auth_headers(documents_app):
+    """Create valid JWT token and headers."""
+    with documents_app.app_context():
+        token = create_access_token(identity=str(TEST_USER_ID))
+        return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def user_documents(make_document):
+    start = datetime(2024, 1, 1)
+    # Pairs share a timestamp, so the id has to break ties
+    documents = [
+        make_document(f'doc {i}', TEST_USER_ID, updated_at=start + timedelta(hours=i // 2))
+        for i in range(25)
+    ]
+    db.session.commit()
+    return documents
+
+def test_cursor_round_trip():
+    """Cursors decode to the values they were made from"""
+    when = datetime(2024, 5, 1, 12, 30)
+    assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+    assert decode_cursor(encode_cursor(7, 'abc')) == (7, 'abc')
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor')
+
+def test_keyset_pages_cover_every_row_once(user_documents):
+    """Walking the cursors visits each document once, newest first"""
+    query = Document.query.filter_by(uploaded_by=TEST_USER_ID)
+    seen, cursor = [], None
+    while True:
+        page, cursor = keyset_page(query, Document.updated_at, Document.id, 10, cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert len(seen) == 25
+    assert len({doc.id for doc in seen}) == 25
+    keys = [(doc.updated_at, doc.id) for doc in seen]
+    assert keys == sorted(keys, reverse=True)
+
+def test_count_total_exact_and_estimated(user_documents):
+    """Totals are exact up to the limit and flagged as estimates past it"""
+    query = Document.query.filter_by(uploaded_by=TEST_USER_ID)
+    assert count_total(query, db.session) == (25, True)
+    total, exact = count_total(query, db.session, exact_limit=10)
+    assert exact is False
+    assert total >= 10
+
+def test_count_total_without_filter(user_documents):
+    """An unfiltered query still counts table rows"""
+    total, exact = count_total(Document.query, db.session)
+    assert exact is True
+    assert total >= 25
+
+def test_history_endpoint_pages(client, auth_headers, user_documents):
+    """The history endpoint returns a page, a cursor and the total"""
+    response = client.get('/api/documents/history?limit=10', headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['documents']) == 10
+    assert data['next_cursor']
+
+    response = client.get(f"/api/documents/history?limit=10&cursor={data['next_cursor']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['documents'][0]['id'] != data['documents'][0]['id']
+
+    response = client.get('/api/documents/history?cursor=garbage', headers=auth_headers)
+    assert response.status_code == 400
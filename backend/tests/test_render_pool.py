@@ -0,0 +1,74 @@
+"""Tests for the PDF render worker pool"""
+import os
+import time
+import operator
+import pytest
+from services.render_pool import RenderPool, RenderError, RenderTimeout, RenderQueueFull, PRIORITY_HIGH, PRIORITY_LOW
+
+@pytest.fixture
+def pool():
+    """A one-worker pool, so queue order is observable"""
+    pool = RenderPool(workers=1, timeout=30)
+    yield pool
+    pool.shutdown()
+
+def test_render_in_worker(pool):
+    """Jobs run in the worker process and return their result"""
+    assert pool.submit(operator.add, (b'%PDF', b'-1.7')).result() == b'%PDF-1.7'
+    stats = pool.stats()
+    assert stats['completed'] == 1
+    assert stats['queue_depth'] == 0
+
+def test_priority_order(pool):
+    """Queued jobs run most urgent first, then oldest first"""
+    pool.submit(time.sleep, (0,)).result()
+    pool.submit(time.sleep, (0.5,))
+    low = pool.submit(operator.add, ('low', ''), priority=PRIORITY_LOW)
+    high = pool.submit(operator.add, ('high', ''), priority=PRIORITY_HIGH)
+    high.result()
+    assert not low.done()
+    assert low.result() == 'low'
+    assert pool.stats()['max_queue_depth'] >= 2
+
+def test_timeout_restarts_worker(pool):
+    """A render past its deadline fails and the worker is replaced"""
+    with pytest.raises(RenderTimeout):
+        pool.submit(time.sleep, (10,), timeout=0.5).result()
+    assert pool.submit(operator.add, (1, 1)).result() == 2
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['worker_restarts'] == 1
+
+def test_failures_reported(pool):
+    """Render errors and dead workers surface as RenderError"""
+    with pytest.raises(RenderError, match='ZeroDivisionError'):
+        pool.submit(operator.truediv, (1, 0)).result()
+    with pytest.raises(RenderError):
+        pool.submit(os._exit, (1,)).result()
+    assert pool.submit(operator.add, (2, 2)).result() == 4
+    assert pool.stats()['failed'] == 2
+
+def test_unpicklable_job_fails_without_stopping_worker(pool):
+    """A job that can't be sent to the worker fails, and the dispatcher keeps running"""
+    with pytest.raises(RenderError):
+        pool.submit(operator.add, (lambda: None, None)).result()
+    assert pool.submit(operator.add, (3, 3)).result() == 6
+    assert pool.stats()['failed'] == 1
+
+def test_queue_limit():
+    """Jobs beyond the queue limit are rejected"""
+    pool = RenderPool(workers=1, max_queue=1)
+    try:
+        pool.submit(time.sleep, (0.5,))
+        time.sleep(0.2)
+        pool.submit(time.sleep, (0,))
+        with pytest.raises(RenderQueueFull):
+            pool.submit(time.sleep, (0,))
+    finally:
+        pool.shutdown()
+
+def test_inline_mode():
+    """With no workers, renders run on the calling thread"""
+    pool = RenderPool(workers=0)
+    assert pool.submit(operator.add, (1, 2)).result() == 3
+    assert pool.stats()['completed'] == 1
@@ -0,0 +1,65 @@
+"""Tests for the indexed template catalog"""
+import os
+import pytest
+from utils.template_catalog import TemplateCatalog
+
+COMPLAINT = (
+    '{% set title = "Small Claims Complaint" %}'
+    '{% set category = "court_documents" %}'
+    '<p>{{ plaintiff_name }} v. {{ defendant_name }}, {{ current_date }}</p>'
+    '{% for item in evidence_list %}<li>{{ item }}</li>{% endfor %}'
+)
+
+@pytest.fixture
+def templates_dir(tmp_path):
+    (tmp_path / 'small_claims.html').write_text(COMPLAINT)
+    (tmp_path / 'demand_letter.txt').write_text('Dear {{ landlord_name }}')
+    (tmp_path / 'notes.md').write_text('not a template')
+    return tmp_path
+
+def test_catalog_index(templates_dir):
+    """Metadata and variables come from the Jinja AST"""
+    catalog = TemplateCatalog(str(templates_dir))
+    templates = {t['id']: t for t in catalog.list()}
+    assert set(templates) == {'small_claims', 'demand_letter'}
+    complaint = templates['small_claims']
+    assert complaint['name'] == 'Small Claims Complaint'
+    assert complaint['category'] == 'court_documents'
+    assert complaint['variables'] == ['defendant_name', 'evidence_list', 'plaintiff_name']
+    assert templates['demand_letter']['category'] == 'general'
+
+def test_catalog_search(templates_dir):
+    """Search matches text and variables, and filters by category"""
+    catalog = TemplateCatalog(str(templates_dir))
+    assert [t['id'] for t in catalog.search('plaintiff')] == ['small_claims']
+    assert [t['id'] for t in catalog.search(category='general')] == ['demand_letter']
+    assert catalog.search('nothing matches this') == []
+
+def test_catalog_incremental_refresh(templates_dir, monkeypatch):
+    """Only changed files are re-parsed, and the ETag follows changes"""
+    catalog = TemplateCatalog(str(templates_dir), check_interval=0)
+    etag = catalog.etag
+    parsed = []
+    index_template = catalog._index_template
+    monkeypatch.setattr(catalog, '_index_template', lambda name, stat: parsed.append(name) or index_template(name, stat))
+
+    catalog.refresh()
+    assert parsed == []
+    assert catalog.etag == etag
+
+    letter = templates_dir / 'demand_letter.txt'
+    letter.write_text('Dear {{ landlord_name }}, re {{ address }}')
+    os.utime(letter, ns=(1, 1))
+    assert catalog.get('demand_letter')['variables'] == ['address', 'landlord_name']
+    assert parsed == ['demand_letter.txt']
+    assert catalog.etag != etag
+
+    (templates_dir / 'small_claims.html').unlink()
+    assert catalog.get('small_claims') is None
+
+def test_catalog_broken_template(templates_dir):
+    """A template with a syntax error is listed with its error"""
+    (templates_dir / 'broken.html').write_text('{% if %}')
+    entry = TemplateCatalog(str(templates_dir)).get('broken')
+    assert 'error' in entry
+    assert entry['variables'] == []
@@ -0,0 +1,128 @@
+"""
+Latency benchmark for full-text document search.
+
+Builds a synthetic corpus of legal-ish documents (title, content and OCR text
+drawn from a Zipf-distributed vocabulary plus a few rare terms), indexes it
+through the normal ORM events, and reports ranked search latency next to the
+ILIKE scan it replaces. Defaults to a throwaway SQLite database (FTS5); pass
+--database-url to run against Postgres (tsvector + GIN).
+
+Run from backend/:
+    python -m utils.bench_search [--n 100000] [--queries 50] [--database-url URL]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from flask import Flask
+
+from database import db
+from models.document import Document
+from models.search import DocumentSearch
+
+VOCABULARY = (
+    "tenant landlord lease eviction notice deposit repair court hearing judge motion filing complaint "
+    "defendant plaintiff custody visa asylum employer wage overtime discrimination contract breach "
+    "damages settlement appeal petition affidavit evidence witness attorney counsel statute clause "
+    "agreement payment invoice property premises rent utilities inspection violation remedy claim"
+).split()
+RARE_TERMS = ['habeas', 'subrogation', 'estoppel', 'replevin', 'laches']
+USERS = 50
+
+
+def synthetic_document(rng, index):
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    words = rng.choices(VOCABULARY, weights=weights, k=rng.randint(150, 600))
+    if index % 997 == 0:
+        words.insert(rng.randrange(len(words)), rng.choice(RARE_TERMS))
+    document = Document(
+        title=' '.join(rng.choices(VOCABULARY, weights=weights, k=5)).title(),
+        content=' '.join(words),
+        uploaded_by=index % USERS + 1
+    )
+    ocr = ' '.join(rng.choices(VOCABULARY, k=80)) if index % 4 == 0 else None
+    return document, ocr
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def time_queries(run, queries):
+    latencies = []
+    for user_id, query in queries:
+        start = time.perf_counter()
+        run(user_id, query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return round(percentile(latencies, 0.5), 2), round(percentile(latencies, 0.95), 2)
+
+
+def like_scan(user_id, query):
+    pattern = f"%{query}%"
+    return Document.query.filter(Document.uploaded_by == user_id, db.or_(
+        Document.title.ilike(pattern), Document.content.ilike(pattern)
+    )).order_by(Document.updated_at.desc()).limit(20).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full-text document search")
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--database-url", help="Database to benchmark; defaults to a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    path = None
+    if not args.database_url:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_url or f"sqlite:///{path}"
+    db.init_app(app)
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        start = time.perf_counter()
+        ocr_texts = {}
+        for offset in range(0, args.n, args.batch_size):
+            batch = [synthetic_document(rng, i) for i in range(offset, min(args.n, offset + args.batch_size))]
+            db.session.add_all(document for document, _ in batch)
+            db.session.commit()
+            ocr_texts.update((document.id, ocr) for document, ocr in batch if ocr)
+        insert_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for document_id, ocr in list(ocr_texts.items())[:1000]:
+            DocumentSearch.set_ocr_text(document_id, ocr)
+        ocr_ms = (time.perf_counter() - start) * 1000 / min(1000, len(ocr_texts) or 1)
+        print(f"{args.n} documents indexed in {insert_seconds:.1f}s "
+              f"({args.n / insert_seconds:.0f}/s), OCR update {ocr_ms:.2f} ms each")
+
+        workloads = {
+            'common term': [(rng.randint(1, USERS), 'tenant') for _ in range(args.queries)],
+            'two terms': [(rng.randint(1, USERS), f"{rng.choice(VOCABULARY)} {rng.choice(VOCABULARY)}")
+                          for _ in range(args.queries)],
+            'rare term': [(rng.randint(1, USERS), rng.choice(RARE_TERMS)) for _ in range(args.queries)],
+        }
+        print(f"{'workload':<12} {'fts p50':>9} {'fts p95':>9} {'page 10':>9} {'like p50':>9} {'like p95':>9}")
+        for name, queries in workloads.items():
+            fts = time_queries(lambda user_id, query: DocumentSearch.search(user_id, query, 1, 20), queries)
+            deep = time_queries(lambda user_id, query: DocumentSearch.search(user_id, query, 10, 20), queries)
+            like = time_queries(like_scan, queries)
+            print(f"{name:<12} {fts[0]:>9} {fts[1]:>9} {deep[0]:>9} {like[0]:>9} {like[1]:>9}")
+
+        db.session.remove()
+        if path:
+            db.drop_all()
+    if path:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
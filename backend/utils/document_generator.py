@@ -8,9 +8,10 @@ import os
 import uuid
 from datetime import datetime
 import jinja2
-import pdfkit
 from flask import current_app
 import logging
+from backend.services.render_pool import render_pool, PDFKIT_OPTIONS
+from utils.template_catalog import TemplateCatalog
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -26,23 +27,15 @@ class DocumentGenerator:
         self.env = jinja2.Environment(
             loader=jinja2.FileSystemLoader(self.templates_dir)
         )
+        self.catalog = TemplateCatalog(self.templates_dir, self.env)
         
     def list_templates(self):
-        """List all available templates"""
-        try:
-            templates = []
-            for filename in os.listdir(self.templates_dir):
-                if filename.endswith(('.html', '.txt')):
-                    templates.append({
-                        'id': os.path.splitext(filename)[0],
-                        'name': os.path.splitext(filename)[0].replace('_', ' ').title(),
-                        'filename': filename,
-                        'type': os.path.splitext(filename)[1][1:].upper()
-                    })
-            return templates
-        except Exception as e:
-            logger.error(f"Error listing templates: {str(e)}")
-            return []
+        """List all available templates from the in-memory catalog"""
+        return self.catalog.list()
+
+    def search_templates(self, query=None, category=None):
+        """Search templates by text and/or category"""
+        return self.catalog.search(query, category)
 
     def render_template(self, template_name, context=None):
         """Render a template with the given context"""
@@ -75,18 +68,10 @@ class DocumentGenerator:
             # Ensure directory exists
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            # Convert HTML to PDF
-            options = {
-                'page-size': 'Letter',
-                'margin-top': '0.75in',
-                'margin-right': '0.75in',
-                'margin-bottom': '0.75in',
-                'margin-left': '0.75in',
-                'encoding': 'UTF-8',
-                'no-outline': None
-            }
-            
-            pdfkit.from_string(html_content, output_path, options=options)
+            # Convert HTML to PDF in a render worker, off the request thread
+            pdf_content = render_pool.render_pdfkit(html_content, PDFKIT_OPTIONS)
+            with open(output_path, 'wb') as f:
+                f.write(pdf_content)
             return output_path
         except Exception as e:
             logger.error(f"Error generating PDF: {str(e)}")
@@ -123,4 +108,16 @@ def generate_document(template_name, context=None, output_format='pdf'):
 
 def list_templates():
     """Convenience function to list available templates"""
-    return document_generator.list_templates() 
\ No newline at end of file
+    return document_generator.list_templates()
+
+def search_templates(query=None, category=None):
+    """Convenience function to search available templates"""
+    return document_generator.search_templates(query, category)
+
+def find_template(template_id):
+    """Convenience function to get one template's catalog entry"""
+    return document_generator.catalog.get(template_id)
+
+def templates_etag():
+    """ETag of the current template catalog"""
+    return document_generator.catalog.etag 
\ No newline at end of file
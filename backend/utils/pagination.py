@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination helpers
+
+Pages are read newest first on a (sort value, id) key. The cursor names the
+last row of the previous page, so the next page is a range scan that starts
+right after it on a composite index: page 500 costs the same as page one.
+Totals come from a separate COUNT that stops after PAGINATION_EXACT_COUNT_LIMIT
+rows; past that the planner's row estimate is reported instead.
+"""
+import os
+import json
+import base64
+import logging
+from datetime import datetime
+from sqlalchemy import and_, or_, func, text, inspect
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Totals up to this many rows are counted exactly; larger ones are estimated
+PAGINATION_EXACT_COUNT_LIMIT = int(os.environ.get('PAGINATION_EXACT_COUNT_LIMIT', 10000))
+
+
+class InvalidCursor(ValueError):
+    """A cursor that wasn't issued by this API or has been tampered with"""
+
+
+def encode_cursor(sort_value, row_id):
+    """
+    Opaque cursor for the row a page ended on
+
+    Args:
+        sort_value (datetime or int): The row's sort key
+        row_id (int or str): The row's ID, the tie-breaker
+
+    Returns:
+        str: URL-safe cursor
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = {'dt': sort_value.isoformat()}
+    payload = json.dumps([sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Read a cursor made by encode_cursor
+
+    Returns:
+        tuple: (sort value, row ID)
+
+    Raises:
+        InvalidCursor: If the cursor can't be decoded
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value['dt'])
+        return sort_value, row_id
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a requested page size to 1..maximum"""
+    try:
+        size = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def keyset_page(query, sort_column, id_column, limit, cursor=None):
+    """
+    One page of a query, newest first
+
+    Args:
+        query (Query): The filtered query, without ordering or limit
+        sort_column (Column): The sort key, e.g. Document.updated_at
+        id_column (Column): Unique tie-breaker, e.g. Document.id
+        limit (int): Page size
+        cursor (str, optional): next_cursor of the previous page
+
+    Returns:
+        tuple: (rows, next_cursor or None)
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        # The leading <= lets the planner seek into the index instead of scanning the OR
+        query = query.filter(sort_column <= sort_value, or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id)
+        ))
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+
+def count_total(query, session, exact_limit=PAGINATION_EXACT_COUNT_LIMIT):
+    """
+    Number of rows a query matches
+
+    The COUNT reads at most exact_limit + 1 rows of the index. When there are
+    more, Postgres' planner estimate is returned (or exact_limit elsewhere).
+
+    Args:
+        query (Query): The filtered query
+        session: The SQLAlchemy session to run it in
+        exact_limit (int): Largest total counted exactly
+
+    Returns:
+        tuple: (total, whether the total is exact)
+    """
+    # Select the primary key: a constant would leave the subquery without a
+    # FROM clause when the query has no filter
+    entity = query.column_descriptions[0]['entity']
+    bounded = query.order_by(None).with_entities(*inspect(entity).primary_key).limit(exact_limit + 1).subquery()
+    total = session.query(func.count()).select_from(bounded).scalar()
+    if total <= exact_limit:
+        return total, True
+    return max(_planner_estimate(query, session) or 0, exact_limit), False
+
+
+def _planner_estimate(query, session):
+    """Postgres' estimated row count for a query, or None"""
+    bind = session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return None
+    try:
+        statement = query.order_by(None).statement.compile(bind, compile_kwargs={'literal_binds': True})
+        plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Could not estimate row count: {e}")
+        return None
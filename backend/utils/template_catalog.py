@@ -0,0 +1,170 @@
+"""
+Template Catalog for SmartProBono
+
+An in-memory index of the document templates on disk, with the metadata and
+variables of each template read from its Jinja AST. The index is built once
+and refreshed incrementally: a rescan only re-parses files whose modification
+time or size changed.
+
+Templates can declare metadata with top-level set tags:
+
+    {% set title = "Small Claims Complaint" %}
+    {% set category = "court_documents" %}
+    {% set description = "Complaint for small claims court" %}
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+import jinja2
+from jinja2 import meta, nodes
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+# Minimum seconds between rescans of the templates directory
+TEMPLATE_CATALOG_CHECK_SECONDS = float(os.environ.get('TEMPLATE_CATALOG_CHECK_SECONDS', 2))
+# Variables DocumentGenerator.render_template adds itself
+BUILTIN_VARIABLES = {'current_date', 'document_id'}
+METADATA_KEYS = ('title', 'category', 'description')
+
+
+def parse_template(env, source):
+    """
+    Read a template's metadata and variables from its Jinja AST
+
+    Args:
+        env (jinja2.Environment): The environment the template renders in
+        source (str): The template source
+
+    Returns:
+        tuple: (metadata dict, sorted list of variable names)
+    """
+    ast = env.parse(source)
+    metadata = {}
+    for node in ast.body:
+        if (isinstance(node, nodes.Assign) and isinstance(node.target, nodes.Name)
+                and node.target.name in METADATA_KEYS and isinstance(node.node, nodes.Const)):
+            metadata[node.target.name] = str(node.node.value)
+    variables = meta.find_undeclared_variables(ast) - BUILTIN_VARIABLES - set(env.globals)
+    return metadata, sorted(variables)
+
+
+class TemplateCatalog:
+    """Index of the templates in a directory, kept current by mtime checks"""
+
+    def __init__(self, templates_dir, env=None, check_interval=TEMPLATE_CATALOG_CHECK_SECONDS):
+        self.templates_dir = templates_dir
+        self.env = env or jinja2.Environment()
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._signatures = {}
+        self._etag = None
+        self._checked_at = 0.0
+        self.refresh()
+
+    def refresh(self):
+        """Rescan the directory, re-parsing only new or changed templates"""
+        try:
+            with os.scandir(self.templates_dir) as scan:
+                files = {
+                    entry.name: entry.stat()
+                    for entry in scan
+                    if entry.is_file() and entry.name.endswith(TEMPLATE_EXTENSIONS)
+                }
+        except FileNotFoundError:
+            files = {}
+        except OSError as e:
+            logger.error(f"Error scanning templates: {str(e)}")
+            return
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            changed = False
+            for filename in set(self._entries) - set(files):
+                del self._entries[filename]
+                del self._signatures[filename]
+                changed = True
+            for filename, stat in files.items():
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if self._signatures.get(filename) == signature:
+                    continue
+                self._entries[filename] = self._index_template(filename, stat)
+                self._signatures[filename] = signature
+                changed = True
+            if changed or self._etag is None:
+                digest = hashlib.sha256()
+                for filename in sorted(self._signatures):
+                    digest.update(f"{filename}:{self._signatures[filename]}".encode('utf-8'))
+                self._etag = digest.hexdigest()[:32]
+
+    def _index_template(self, filename, stat):
+        template_id, extension = os.path.splitext(filename)
+        entry = {
+            'id': template_id,
+            'name': template_id.replace('_', ' ').title(),
+            'filename': filename,
+            'type': extension[1:].upper(),
+            'category': 'general',
+            'description': '',
+            'variables': [],
+            'updated_at': datetime.fromtimestamp(stat.st_mtime).isoformat()
+        }
+        try:
+            with open(os.path.join(self.templates_dir, filename), encoding='utf-8') as f:
+                metadata, variables = parse_template(self.env, f.read())
+            entry['name'] = metadata.get('title', entry['name'])
+            entry['category'] = metadata.get('category', entry['category'])
+            entry['description'] = metadata.get('description', '')
+            entry['variables'] = variables
+        except (OSError, UnicodeDecodeError, jinja2.TemplateSyntaxError) as e:
+            logger.error(f"Error indexing template {filename}: {str(e)}")
+            entry['error'] = str(e)
+        return entry
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+
+    @property
+    def etag(self):
+        """Changes whenever a template is added, removed or edited"""
+        self._maybe_refresh()
+        return self._etag
+
+    def list(self):
+        """All templates, sorted by ID"""
+        self._maybe_refresh()
+        with self._lock:
+            entries = list(self._entries.values())
+        return sorted((dict(entry) for entry in entries), key=lambda entry: entry['id'])
+
+    def get(self, template_id):
+        """A template's entry by ID, or None"""
+        return next((entry for entry in self.list() if entry['id'] == template_id), None)
+
+    def search(self, query=None, category=None):
+        """
+        Templates matching a text query and/or category
+
+        Args:
+            query (str, optional): Matched against ID, name, description and variables
+            category (str, optional): Exact category
+
+        Returns:
+            list: Matching template entries
+        """
+        query = (query or '').strip().lower()
+        results = []
+        for entry in self.list():
+            if category and entry['category'] != category:
+                continue
+            if query:
+                haystack = ' '.join([entry['id'], entry['name'], entry['description'], *entry['variables']]).lower()
+                if query not in haystack:
+                    continue
+            results.append(entry)
+        return results
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled keyword router against the sequential keyword lists
+
+Uses the routing table of advanced_multi_agent_api.py (the largest one) and
+reports per-message routing time for short chat messages and long intakes,
+plus how often the two routers pick the same agent. They differ only when a
+message hits keywords of several agents and a later agent scores higher.
+
+Usage:
+    python benchmark_agent_router.py [--number 2000]
+"""
+
+import argparse
+import re
+import timeit
+
+from agent_router import KeywordRouter, GREETING_PATTERN
+
+ROUTES = [
+    ('immigration', ['immigration', 'visa', 'green card', 'citizenship', 'asylum', 'deportation']),
+    ('family', ['divorce', 'custody', 'child support', 'adoption', 'family law']),
+    ('criminal', ['criminal', 'arrest', 'charges', 'court', 'trial', 'sentencing']),
+    ('compliance', ['gdpr', 'privacy', 'data protection', 'soc 2', 'compliance', 'regulatory']),
+    ('business', ['incorporat', 'llc', 'corporation', 'fundraising', 'business', 'startup']),
+    ('document', ['document', 'contract', 'agreement', 'generate', 'draft', 'template']),
+    ('expert', ['complex', 'detailed', 'analysis', 'research']),
+]
+
+MESSAGES = [
+    "hello",
+    "How do I apply for a green card through my employer?",
+    "My wife and I are getting a divorce, who gets custody of the kids?",
+    "I was arrested last night and the court date is next week",
+    "Do we need a GDPR privacy policy for our startup website?",
+    "Can you help me incorporate an LLC in Delaware?",
+    "Please draft a simple contract for freelance design work",
+    "I have a question about my lease",
+    "My business partner wants to divorce the company from our shared IP and take the contract with him",
+]
+
+INTAKE = (
+    "I rent an apartment with my two children. Last month the heat stopped working and the landlord "
+    "has not answered my messages. I paid rent on time every month and I have receipts for all of it. "
+)
+
+
+def legacy_route(message):
+    """The sequential router from advanced_multi_agent_api.py before the shared engine"""
+    lower_message = message.lower().strip()
+    if re.match(GREETING_PATTERN, lower_message):
+        return 'greeting'
+    for agent, keywords in ROUTES:
+        if any(keyword in lower_message for keyword in keywords):
+            return agent
+    if len(message.split()) > 10:
+        return 'expert'
+    return 'greeting'
+
+
+ROUTER = KeywordRouter(ROUTES, default=None, exact=[('greeting', GREETING_PATTERN)])
+
+
+def compiled_route(message):
+    agent_type = ROUTER.route(message)
+    if agent_type:
+        return agent_type
+    return 'expert' if len(message.split()) > 10 else 'greeting'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compiled keyword router with the sequential one")
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    workloads = {
+        'chat messages': MESSAGES,
+        'intake 2k chars': [INTAKE * 10],
+        'intake 20k chars': [INTAKE * 100],
+    }
+    print(f"{'workload':<18} {'legacy us':>10} {'compiled us':>12} {'speedup':>8}")
+    for name, messages in workloads.items():
+        legacy = timeit.timeit(lambda: [legacy_route(m) for m in messages], number=args.number)
+        compiled = timeit.timeit(lambda: [compiled_route(m) for m in messages], number=args.number)
+        per_message = 1e6 / (args.number * len(messages))
+        print(f"{name:<18} {legacy * per_message:>10.2f} {compiled * per_message:>12.2f} {legacy / compiled:>7.1f}x")
+
+    print()
+    for message in MESSAGES:
+        old, new = legacy_route(message), compiled_route(message)
+        marker = '' if old == new else f'  (was {old}; scores {ROUTER.scores(message)})'
+        print(f"{new:<12} {message[:60]}{marker}")
+
+
+if __name__ == '__main__':
+    main()
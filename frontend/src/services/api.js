@@ -213,8 +213,8 @@ export const documentsApi = {
   // New endpoints for document versioning
   getDocumentVersions: async (documentId) => {
     try {
-      const response = await api.get(`/api/documents/${documentId}/versions`);
-      return response.data;
+      const response = await api.get(`/api/documents/${documentId}/versions`, { params: { limit: 100 } });
+      return response.data.versions;
     } catch (error) {
       console.error('Error fetching document versions:', error);
       throw error;
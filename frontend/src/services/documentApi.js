@@ -58,11 +58,12 @@ export const documentApi = {
   // Get document versions
   getDocumentVersions: async (documentId) => {
     try {
-      const response = await fetch(`${config.apiUrl}/api/documents/${documentId}/versions`);
+      const response = await fetch(`${config.apiUrl}/api/documents/${documentId}/versions?limit=100`);
       if (!response.ok) {
         throw new Error('Failed to fetch document versions');
       }
-      return response.json();
+      const data = await response.json();
+      return data.versions;
     } catch (error) {
       console.error('Error fetching document versions:', error);
       throw error;
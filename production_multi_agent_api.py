@@ -8,6 +8,7 @@ import os
 import json
 import re
 import logging
+from agent_router import KeywordRouter, GREETING_PATTERN
 from datetime import datetime
 from flask import Flask, jsonify, request
 from flask_cors import CORS
@@ -145,45 +146,20 @@ class ProductionMultiAgentSystem:
                 Always emphasize that your advice is for informational purposes and not a substitute for a licensed attorney."""
             }
         }
+        # Keyword sets in priority order (earlier agents win ties)
+        self.router = KeywordRouter([
+            ('immigration', ['immigration', 'visa', 'green card', 'citizenship', 'asylum', 'deportation']),
+            ('family', ['divorce', 'custody', 'child support', 'adoption', 'family law']),
+            ('criminal', ['criminal', 'arrest', 'charges', 'court', 'trial', 'defense']),
+            ('business', ['incorporat', 'llc', 'corporation', 'business', 'startup', 'contract']),
+            ('compliance', ['gdpr', 'compliance', 'privacy', 'data protection', 'soc 2']),
+            ('document', ['document', 'generate', 'review', 'summarize']),
+            ('expert', ['complex', 'expert', 'in-depth', 'nuance']),
+        ], exact=[('greeting', GREETING_PATTERN)])
     
     def route_message(self, message):
         """Route message to appropriate agent"""
-        lower_message = message.lower().strip()
-        
-        # Greeting patterns
-        if re.match(r'^(hello|hi|hey|good morning|good afternoon|good evening)$', lower_message):
-            return 'greeting'
-        
-        # Immigration patterns
-        if any(keyword in lower_message for keyword in ['immigration', 'visa', 'green card', 'citizenship', 'asylum', 'deportation']):
-            return 'immigration'
-        
-        # Family law patterns
-        if any(keyword in lower_message for keyword in ['divorce', 'custody', 'child support', 'adoption', 'family law']):
-            return 'family'
-        
-        # Criminal law patterns
-        if any(keyword in lower_message for keyword in ['criminal', 'arrest', 'charges', 'court', 'trial', 'defense']):
-            return 'criminal'
-        
-        # Business patterns
-        if any(keyword in lower_message for keyword in ['incorporat', 'llc', 'corporation', 'business', 'startup', 'contract']):
-            return 'business'
-        
-        # Compliance patterns
-        if any(keyword in lower_message for keyword in ['gdpr', 'compliance', 'privacy', 'data protection', 'soc 2']):
-            return 'compliance'
-        
-        # Document patterns
-        if any(keyword in lower_message for keyword in ['document', 'generate', 'review', 'summarize']):
-            return 'document'
-        
-        # Complex questions
-        if any(keyword in lower_message for keyword in ['complex', 'expert', 'in-depth', 'nuance']):
-            return 'expert'
-        
-        # Default to greeting
-        return 'greeting'
+        return self.router.route(message)
     
     def call_openai(self, messages, model="gpt-3.5-turbo"):
         """Call OpenAI API"""
@@ -8,12 +8,15 @@ import os
 import json
 import re
 import logging
+import threading
+import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any, TypedDict
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from openai import OpenAI
 from anthropic import Anthropic
+from agent_service.case_classifier import agent_classifier
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,6 +48,55 @@ try:
 except Exception as e:
     logger.warning(f"Anthropic client not available: {e}")
 
+# Adaptive workflow depth: a single specialist answer at or above this
+# confidence is returned as-is instead of going through synthesis
+SKIP_SYNTHESIS_CONFIDENCE = float(os.getenv("SKIP_SYNTHESIS_CONFIDENCE", "0.85"))
+# Smoothing factor for the per-stage latency averages
+STAGE_LATENCY_ALPHA = 0.2
+
+class StageTimings:
+    """Running latency average per workflow stage
+
+    Skipped stages have no latency of their own, so the time a skip saved is
+    estimated from that stage's recent average when it did run.
+    """
+
+    def __init__(self, alpha: float = STAGE_LATENCY_ALPHA):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def _stage(self, stage: str) -> Dict[str, float]:
+        return self._stages.setdefault(stage, {'runs': 0, 'skips': 0, 'avg_ms': 0.0, 'saved_ms': 0.0})
+
+    def record_run(self, stage: str, elapsed_ms: float):
+        with self._lock:
+            entry = self._stage(stage)
+            entry['avg_ms'] = elapsed_ms if entry['runs'] == 0 else (
+                self.alpha * elapsed_ms + (1 - self.alpha) * entry['avg_ms'])
+            entry['runs'] += 1
+
+    def record_skip(self, stage: str) -> float:
+        """Count a skip and return the estimated milliseconds it saved"""
+        with self._lock:
+            entry = self._stage(stage)
+            entry['skips'] += 1
+            entry['saved_ms'] += entry['avg_ms']
+            return entry['avg_ms']
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {
+                    'runs': int(entry['runs']),
+                    'skips': int(entry['skips']),
+                    'skip_rate': round(entry['skips'] / (entry['runs'] + entry['skips']), 3),
+                    'avg_ms': round(entry['avg_ms'], 1),
+                    'saved_ms': round(entry['saved_ms'], 1)
+                }
+                for stage, entry in self._stages.items()
+            }
+
 # LangGraph-style State Management
 class MultiLayerState(TypedDict):
     """State for multi-layered agent system"""
@@ -516,6 +568,14 @@ class MultiLayerAgentSystem:
             'synthesis': self.synthesis,
             'human_loop': self.human_loop
         }
+        self.timings = StageTimings()
+    
+    def _run_stage(self, stage: str, agent: BaseAgent, state: MultiLayerState) -> MultiLayerState:
+        """Run one agent and fold its latency into the stage average"""
+        start = time.perf_counter()
+        state = agent.process(state)
+        self.timings.record_run(stage, (time.perf_counter() - start) * 1000)
+        return state
     
     def process_message(self, message: str, user_id: str = None) -> Dict:
         """Process message through multi-layer agent system"""
@@ -542,29 +602,62 @@ class MultiLayerAgentSystem:
             'confidence_score': 0.0
         }
         
+        stages_skipped = []
+        latency_saved_ms = 0.0
+        
         try:
-            # Layer 1: Supervisor Analysis
-            logger.info("🔍 Layer 1: Supervisor Analysis")
-            state = self.supervisor.process(state)
-            state['agent_chain'].append('supervisor')
+            # Layer 1: Supervisor Analysis, skipped when the local router is confident
+            agent, routing = agent_classifier.fast_label(message)
+            if agent is not None:
+                logger.info(f"⚡ Layer 1: Local router → {agent} (supervisor skipped)")
+                state['supervisor_analysis'] = {
+                    "complexity_score": 0.5,
+                    "required_agents": [agent],
+                    "workflow_type": "simple",
+                    "reasoning": f"Local classifier routed to {agent}",
+                    **routing
+                }
+                state['complexity_score'] = 0.5
+                state['required_agents'] = [agent]
+                state['workflow_type'] = 'simple'
+                stages_skipped.append('supervisor')
+                latency_saved_ms += self.timings.record_skip('supervisor')
+            else:
+                logger.info("🔍 Layer 1: Supervisor Analysis")
+                state = self._run_stage('supervisor', self.supervisor, state)
+                state['supervisor_analysis'].setdefault('router', routing)
+                state['agent_chain'].append('supervisor')
             
             # Layer 2: Agent Orchestration
             logger.info(f"🤖 Layer 2: Agent Orchestration - {state['required_agents']}")
             for agent_name in state['required_agents']:
                 if agent_name in self.agents:
-                    state = self.agents[agent_name].process(state)
+                    state = self._run_stage('specialist', self.agents[agent_name], state)
                     state['agent_chain'].append(agent_name)
             
-            # Layer 3: Synthesis
-            logger.info("🔄 Layer 3: Synthesis")
-            state = self.synthesis.process(state)
-            state['agent_chain'].append('synthesis')
+            # Layer 3: Synthesis, skipped for a single confident specialist answer.
+            # Synthesis of one response makes no model call, so it is timed as its
+            # own stage and skips are measured against that, not the LLM merge.
+            responses = state['agent_responses']
+            synthesis_stage = 'synthesis' if len(responses) > 1 else 'synthesis_single'
+            if len(responses) == 1 and max(state['agent_confidence'].values(), default=0.0) >= SKIP_SYNTHESIS_CONFIDENCE:
+                logger.info("⚡ Layer 3: Single confident answer (synthesis skipped)")
+                state['synthesized_response'] = next(iter(responses.values()))
+                state['needs_human_review'] = False
+                stages_skipped.append('synthesis')
+                latency_saved_ms += self.timings.record_skip(synthesis_stage)
+            else:
+                logger.info("🔄 Layer 3: Synthesis")
+                state = self._run_stage(synthesis_stage, self.synthesis, state)
+                state['agent_chain'].append('synthesis')
             
             # Layer 4: Human-in-the-Loop (if needed)
             if state.get('needs_human_review', False):
                 logger.info("👤 Layer 4: Human-in-the-Loop")
-                state = self.human_loop.process(state)
+                state = self._run_stage('human_loop', self.human_loop, state)
                 state['agent_chain'].append('human_loop')
+            else:
+                state['final_response'] = state['synthesized_response'] or 'No response generated'
             
             # Calculate final metrics
             processing_time = (datetime.now() - start_time).total_seconds()
@@ -583,6 +676,8 @@ class MultiLayerAgentSystem:
                 'escalation_reason': state.get('escalation_reason'),
                 'processing_time': state['processing_time'],
                 'workflow_type': state['workflow_type'],
+                'stages_skipped': stages_skipped,
+                'latency_saved_ms': round(latency_saved_ms, 1),
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -597,6 +692,8 @@ class MultiLayerAgentSystem:
                 'escalation_reason': 'System error',
                 'processing_time': (datetime.now() - start_time).total_seconds(),
                 'workflow_type': 'error',
+                'stages_skipped': stages_skipped,
+                'latency_saved_ms': round(latency_saved_ms, 1),
                 'timestamp': datetime.now().isoformat()
             }
 
@@ -677,6 +774,19 @@ def get_agents():
         ]
     })
 
+@app.route('/api/router/stats', methods=['GET'])
+def router_stats():
+    """Fast-path hit rate of the local supervisor classifier"""
+    return jsonify(agent_classifier.stats())
+
+@app.route('/api/workflow/stats', methods=['GET'])
+def workflow_stats():
+    """How often each workflow stage ran or was skipped, and the latency saved"""
+    return jsonify({
+        'skip_synthesis_confidence': SKIP_SYNTHESIS_CONFIDENCE,
+        'stages': multilayer_system.timings.stats()
+    })
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 10000))
     print(f"🚀 Starting SmartProBono REAL Multi-Layer Agent System")
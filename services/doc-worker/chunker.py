@@ -0,0 +1,178 @@
+"""
+Token-aware streaming chunker for document ingestion.
+
+Consumes text page by page and emits chunks sized by the embedding model's
+tokenizer, so no chunk is ever truncated by the model. Chunks break on sentence
+boundaries where possible, overlap by whole sentences, and carry page/offset
+provenance. Only the sentences of the chunk being built are held in memory.
+"""
+import re
+from collections import namedtuple
+
+# all-MiniLM-L6-v2 has a 256 token window, two of which are [CLS] and [SEP]
+DEFAULT_MAX_TOKENS = 254
+DEFAULT_OVERLAP_TOKENS = 32
+
+# A sentence ends at . ! or ? (optionally followed by closing quotes/brackets)
+# and whitespace, or at a blank line.
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+|\n\s*\n")
+TRAILING_END = re.compile(r"[.!?][\"')\]]*\s*$")
+
+# A piece of text with its provenance: pages are 1-based, offsets are
+# character offsets into the text of page_start / page_end respectively.
+Span = namedtuple("Span", "text page_start char_start page_end char_end tokens")
+
+
+def whitespace_token_count(text: str) -> int:
+    """Rough token count used when no tokenizer is supplied"""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def make_token_counter(tokenizer):
+    """Build a token counter from a Hugging Face tokenizer (no special tokens)"""
+    def count(text: str) -> int:
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+    return count
+
+
+def split_sentences(text: str):
+    """Yield (sentence, start, end, complete) for one page of text
+
+    Only the last sentence of a page can be incomplete; it may continue on the
+    next page.
+    """
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        end = match.end()
+        if text[start:end].strip():
+            yield text[start:end], start, end, True
+        start = end
+    if text[start:].strip():
+        tail = text[start:]
+        yield tail, start, len(text), bool(TRAILING_END.search(tail))
+
+
+class StreamingChunker:
+    """Build token-bounded, sentence-aligned chunks from a stream of pages"""
+
+    def __init__(self, count_tokens=None, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.count_tokens = count_tokens or whitespace_token_count
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def chunks(self, pages):
+        """Yield chunk dicts from an iterable of (page_number, text) pairs"""
+        buffer = []
+        # The first `carried` spans of the buffer are overlap from the previous chunk
+        carried = 0
+        index = 0
+        for sentence in self._sentences(pages):
+            for piece in self._fit(sentence):
+                # Overlap alone must never become a chunk: shrink it to make room
+                while carried and carried == len(buffer) and \
+                        sum(s.tokens for s in buffer) + piece.tokens > self.max_tokens:
+                    buffer.pop(0)
+                    carried -= 1
+                if buffer and sum(s.tokens for s in buffer) + piece.tokens > self.max_tokens:
+                    chunk, buffer, carried = self._cut(buffer, carried, index)
+                    yield chunk
+                    index += 1
+                buffer.append(piece)
+        while len(buffer) > carried:
+            chunk, buffer, carried = self._cut(buffer, carried, index, final=True)
+            yield chunk
+            index += 1
+
+    def _sentences(self, pages):
+        """Yield sentence Spans, joining sentences that run across a page break"""
+        pending = None
+        for page_number, text in pages:
+            for sentence, start, end, complete in split_sentences(text):
+                if pending is not None:
+                    joiner = "" if pending.text[-1:].isspace() else " "
+                    sentence = pending.text + joiner + sentence.lstrip()
+                    span = Span(sentence, pending.page_start, pending.char_start,
+                                page_number, end, 0)
+                    pending = None
+                else:
+                    span = Span(sentence, page_number, start, page_number, end, 0)
+                if complete:
+                    yield span
+                else:
+                    pending = span
+        if pending is not None:
+            yield pending
+
+    def _fit(self, span):
+        """Yield pieces of a sentence that each fit in the token budget"""
+        tokens = self.count_tokens(span.text)
+        if tokens <= self.max_tokens:
+            yield span._replace(tokens=tokens)
+            return
+
+        # Sentence is too long on its own: split it on word boundaries. Words
+        # longer than max_tokens characters are sliced, since every token covers
+        # at least one character. Pieces cut from the middle of a sentence
+        # report the start page's offsets.
+        text = span.text
+        piece_start = 0
+        piece_tokens = 0
+        for word in re.finditer(r"\S{1,%d}\s*" % self.max_tokens, text):
+            word_tokens = self.count_tokens(word.group())
+            if piece_tokens and piece_tokens + word_tokens > self.max_tokens:
+                piece_end = word.start()
+                yield Span(text[piece_start:piece_end], span.page_start,
+                           span.char_start + piece_start, span.page_start,
+                           span.char_start + piece_end, piece_tokens)
+                piece_start, piece_tokens = piece_end, 0
+            piece_tokens += word_tokens
+        if text[piece_start:].strip():
+            yield Span(text[piece_start:], span.page_start, span.char_start + piece_start,
+                       span.page_end, span.char_end, self.count_tokens(text[piece_start:]))
+
+    def _cut(self, buffer, carried, index, final=False):
+        """Turn the buffer into a chunk; return it with the next buffer and its overlap count"""
+        head = list(buffer)
+        tail = []
+        text = "".join(s.text for s in head).strip()
+        token_count = self.count_tokens(text)
+        # Joining can shift token boundaries slightly; check the real count and
+        # drop overlap, then push trailing sentences into the next chunk, if
+        # needed. At least one new span always stays in the chunk.
+        while token_count > self.max_tokens and len(head) > 1:
+            if carried:
+                head.pop(0)
+                carried -= 1
+            else:
+                tail.insert(0, head.pop())
+            text = "".join(s.text for s in head).strip()
+            token_count = self.count_tokens(text)
+
+        chunk = {
+            "index": index,
+            "text": text,
+            "token_count": token_count,
+            "page_start": head[0].page_start,
+            "char_start": head[0].char_start,
+            "page_end": head[-1].page_end,
+            "char_end": head[-1].char_end,
+        }
+        if final and not tail:
+            return chunk, [], 0
+        overlap = self._overlap(head)
+        return chunk, overlap + tail, len(overlap)
+
+    def _overlap(self, head):
+        """Trailing sentences of a chunk that fit in the overlap budget"""
+        kept = []
+        total = 0
+        for span in reversed(head):
+            if total + span.tokens > self.overlap_tokens:
+                break
+            kept.insert(0, span)
+            total += span.tokens
+        # Never carry a whole chunk over, or the next chunk could not advance
+        return kept if len(kept) < len(head) else []
@@ -0,0 +1,351 @@
+"""
+Durable background job queue for the document worker.
+
+Jobs are persisted in a local SQLite database so they survive a restart, and a
+small pool of worker threads claims and runs them outside the HTTP request.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+
+# Queue configuration
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", "/tmp/doc_worker_jobs.db")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    stage_timings TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, run_after, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when the job has been cancelled"""
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix"""
+
+
+class JobContext:
+    """Handle passed to job handlers for progress, timing and cancellation"""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+
+    def set_progress(self, progress: float, message: str = None):
+        """Record progress as a fraction between 0 and 1"""
+        self.queue.update_progress(self.job_id, max(0.0, min(1.0, progress)), message)
+
+    def check_cancelled(self):
+        """Raise JobCancelled if a cancellation was requested"""
+        if self.queue.is_cancel_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a processing stage and add it to the job's stage timings"""
+        self.check_cancelled()
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.queue.record_stage(self.job_id, name, time.time() - start)
+
+    def record_stage(self, name: str, seconds: float):
+        """Add an externally measured duration to a stage"""
+        self.queue.record_stage(self.job_id, name, seconds)
+
+
+class JobQueue:
+    """SQLite-backed job store with retry and backoff"""
+
+    def __init__(self, db_path: str = JOBS_DB_PATH, on_finished=None):
+        """
+        on_finished(job, status) is called when a job ends failed or
+        cancelled, so the caller can update the record the job was for.
+        """
+        self.db_path = db_path
+        self.on_finished = on_finished
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _notify_finished(self, job: dict, status: str):
+        if self.on_finished is None or job is None:
+            return
+        try:
+            self.on_finished(job, status)
+        except Exception as e:
+            print(f"Could not record {status} status for job {job['id']}: {e}")
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["stage_timings"] = json.loads(job["stage_timings"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        """Add a job and return its id"""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._execute(
+            """
+            INSERT INTO jobs (id, kind, payload, status, max_attempts, run_after, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (job_id, kind, json.dumps(payload), QUEUED, max_attempts, now, now)
+        )
+        return job_id
+
+    def get(self, job_id: str) -> dict:
+        """Get a job by id, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, status: str = None, limit: int = 50) -> list:
+        """List the most recent jobs, optionally filtered by status"""
+        with self._lock:
+            if status:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                    (status, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def claim(self) -> dict:
+        """Atomically move the oldest runnable job to running and return it"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT * FROM jobs WHERE status = ? AND run_after <= ?
+                ORDER BY created_at LIMIT 1
+                """,
+                (QUEUED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, attempts = attempts + 1,
+                    started_at = ?, error = NULL
+                WHERE id = ? AND status = ?
+                """,
+                (RUNNING, now, row["id"], QUEUED)
+            )
+            self._conn.commit()
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return self._to_dict(row)
+
+    def update_progress(self, job_id: str, progress: float, message: str = None):
+        self._execute(
+            "UPDATE jobs SET progress = ?, message = COALESCE(?, message) WHERE id = ?",
+            (progress, message, job_id)
+        )
+
+    def record_stage(self, job_id: str, stage: str, seconds: float):
+        """Accumulate the time spent in a stage"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stage_timings FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return
+            timings = json.loads(row["stage_timings"] or "{}")
+            timings[stage] = round(timings.get(stage, 0.0) + seconds, 4)
+            self._conn.execute(
+                "UPDATE jobs SET stage_timings = ? WHERE id = ?",
+                (json.dumps(timings), job_id)
+            )
+            self._conn.commit()
+
+    def complete(self, job_id: str, result: dict = None):
+        self._execute(
+            """
+            UPDATE jobs SET status = ?, progress = 1, result = ?, finished_at = ?
+            WHERE id = ?
+            """,
+            (SUCCEEDED, json.dumps(result) if result is not None else None, time.time(), job_id)
+        )
+
+    def fail(self, job_id: str, error: str, retry: bool = True) -> str:
+        """Record a failure; requeue with exponential backoff if attempts remain"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if retry and job["attempts"] < job["max_attempts"] and not job["cancel_requested"]:
+            delay = JOB_RETRY_BASE_SECONDS * (2 ** (job["attempts"] - 1))
+            self._execute(
+                "UPDATE jobs SET status = ?, run_after = ?, error = ? WHERE id = ?",
+                (QUEUED, time.time() + delay, error, job_id)
+            )
+            return QUEUED
+        self._notify_finished(job, FAILED)
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (FAILED, error, time.time(), job_id)
+        )
+        return FAILED
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job now, or flag a running one to stop at its next check"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? "
+                "WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED)
+            )
+            cancelled_queued = cursor.rowcount > 0
+            if not cancelled_queued:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                    (job_id, RUNNING)
+                )
+            self._conn.commit()
+            changed = cursor.rowcount > 0
+        if cancelled_queued:
+            self._notify_finished(self.get(job_id), CANCELLED)
+        return changed
+
+    def mark_cancelled(self, job_id: str):
+        self._notify_finished(self.get(job_id), CANCELLED)
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+            (CANCELLED, time.time(), job_id)
+        )
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def requeue_stale(self) -> int:
+        """Put jobs left running by a previous process back on the queue"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, run_after = ? WHERE status = ?",
+            (QUEUED, time.time(), RUNNING)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class WorkerPool:
+    """Fixed pool of threads that claim jobs and dispatch them to handlers by kind"""
+
+    def __init__(self, queue: JobQueue, handlers: dict, workers: int = JOB_WORKERS,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        requeued = self.queue.requeue_stale()
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s)")
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"doc-job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job: dict):
+        """Run one claimed job and record its outcome"""
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self.queue.fail(job["id"], f"No handler for job kind '{job['kind']}'", retry=False)
+            return
+        ctx = JobContext(self.queue, job["id"])
+        try:
+            ctx.check_cancelled()
+            result = handler(job["payload"], ctx)
+            self.queue.complete(job["id"], result)
+        except JobCancelled:
+            self.queue.mark_cancelled(job["id"])
+        except PermanentJobError as e:
+            self.queue.fail(job["id"], str(e), retry=False)
+        except Exception as e:
+            print(f"Job {job['id']} failed (attempt {job['attempts']}): {e}")
+            traceback.print_exc()
+            self.queue.fail(job["id"], str(e))
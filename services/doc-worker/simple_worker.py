@@ -1,5 +1,6 @@
 import os
 import json
+import time
 import numpy as np
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from pydantic import BaseModel
@@ -14,7 +15,10 @@ import pytesseract
 from PIL import Image
 import cv2
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from embedding_backend import load_embedding_model, EMBED_BACKEND
+from job_queue import JobQueue, WorkerPool, PermanentJobError, JOB_WORKERS
+from chunker import StreamingChunker, make_token_counter
+from uploads import save_upload, UploadSizeLimitMiddleware, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES
 
 load_dotenv()
 
@@ -29,6 +33,10 @@ DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
 OLLAMA_BASE = os.environ.get("OLLAMA_BASE", "http://localhost:11434")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "mistral")
 
+# Chunking configuration (token counts use the embedding model's tokenizer)
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "32"))
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "32"))
+
 def get_db_connection():
     """Get database connection"""
     return psycopg2.connect(
@@ -39,35 +47,49 @@ def get_db_connection():
         password=DB_PASSWORD
     )
 
-def extract_text_from_pdf(pdf_data: bytes) -> str:
+def iter_pdf_pages(pdf_document, timings: dict = None):
+    """Yield (page_number, text, is_ocr) for each page of an open PyMuPDF document
+
+    Pages without a text layer are OCR'd. If ``timings`` is given, the seconds
+    spent on text extraction and OCR are added to its "extract" and "ocr" keys.
+    """
+    for page_num in range(len(pdf_document)):
+        extract_start = time.time()
+        page = pdf_document.load_page(page_num)
+
+        # Try to extract text directly first
+        page_text = page.get_text()
+        if timings is not None:
+            timings["extract"] = timings.get("extract", 0.0) + time.time() - extract_start
+        if page_text.strip():
+            yield page_num + 1, page_text, False
+            continue
+
+        # If no text found, try OCR
+        ocr_start = time.time()
+        pix = page.get_pixmap()
+        img_data = pix.tobytes("png")
+        img = Image.open(io.BytesIO(img_data))
+
+        # Convert to grayscale for better OCR
+        img_gray = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2GRAY)
+
+        # OCR the image
+        ocr_text = pytesseract.image_to_string(img_gray)
+        if timings is not None:
+            timings["ocr"] = timings.get("ocr", 0.0) + time.time() - ocr_start
+        if ocr_text.strip():
+            yield page_num + 1, ocr_text, True
+
+def extract_text_from_pdf(pdf_data: bytes, timings: dict = None) -> str:
     """Extract text from PDF using PyMuPDF"""
     try:
         # Open PDF from bytes
         pdf_document = fitz.open(stream=pdf_data, filetype="pdf")
         text = ""
-        
-        for page_num in range(len(pdf_document)):
-            page = pdf_document.load_page(page_num)
-            
-            # Try to extract text directly first
-            page_text = page.get_text()
-            
-            if page_text.strip():
-                text += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
-            else:
-                # If no text found, try OCR
-                pix = page.get_pixmap()
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
-                
-                # Convert to grayscale for better OCR
-                img_gray = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2GRAY)
-                
-                # OCR the image
-                ocr_text = pytesseract.image_to_string(img_gray)
-                if ocr_text.strip():
-                    text += f"\n--- Page {page_num + 1} (OCR) ---\n{ocr_text}\n"
-        
+        for page_number, page_text, is_ocr in iter_pdf_pages(pdf_document, timings):
+            label = f"Page {page_number} (OCR)" if is_ocr else f"Page {page_number}"
+            text += f"\n--- {label} ---\n{page_text}\n"
         pdf_document.close()
         return text.strip()
         
@@ -75,48 +97,158 @@ def extract_text_from_pdf(pdf_data: bytes) -> str:
         print(f"Error extracting text from PDF: {e}")
         return ""
 
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list:
-    """Split text into overlapping chunks for better context"""
-    if len(text) <= chunk_size:
-        return [text]
-    
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        
-        # Try to break at sentence boundaries
-        if end < len(text):
-            # Look for sentence endings
-            for i in range(end, max(start, end - 200), -1):
-                if text[i] in '.!?':
-                    end = i + 1
-                    break
-        
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        
-        start = end - overlap
-        if start >= len(text):
-            break
-    
-    return chunks
+_embedding_model = None
+
+def get_embedding_model():
+    """Load the embedding model once per process (downloads on first use)"""
+    global _embedding_model
+    if _embedding_model is None:
+        _embedding_model = load_embedding_model()
+    return _embedding_model
 
 def generate_embeddings(text: str) -> list:
-    """Generate embeddings using sentence-transformers"""
+    """Generate embeddings with the configured backend (EMBED_BACKEND)"""
     try:
-        # Initialize the model (this will download on first use)
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        embedding = model.encode(text)
+        embedding = get_embedding_model().encode(text)
         return embedding.tolist()
     except Exception as e:
         print(f"Error generating embeddings: {e}")
         # Return a placeholder embedding
         return [0.0] * 384
 
+def get_chunker() -> StreamingChunker:
+    """Chunker sized to the embedding model's window (minus [CLS]/[SEP])"""
+    model = get_embedding_model()
+    return StreamingChunker(
+        count_tokens=make_token_counter(model.tokenizer),
+        max_tokens=model.max_seq_length - 2,
+        overlap_tokens=CHUNK_OVERLAP_TOKENS
+    )
+
+def generate_embeddings_batch(texts: list, batch_size: int = EMBED_BATCH_SIZE) -> list:
+    """Generate embeddings for many texts in batched forward passes"""
+    embeddings = get_embedding_model().encode(texts, batch_size=batch_size)
+    return [embedding.tolist() for embedding in embeddings]
+
+def process_document_job(payload: dict, ctx) -> dict:
+    """Background job: extract, OCR, chunk, embed and store a document"""
+    document_id = payload["document_id"]
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute("SELECT * FROM documents WHERE id = %s", (document_id,))
+        document = cursor.fetchone()
+        if not document:
+            raise PermanentJobError("Document not found")
+
+        cursor.execute("UPDATE documents SET status = 'processing' WHERE id = %s", (document_id,))
+        # Make the status visible to pollers before the long-running work starts
+        conn.commit()
+        # Replace chunks from any earlier attempt so retries stay idempotent
+        cursor.execute("DELETE FROM doc_chunks WHERE document_id = %s", (document_id,))
+
+        try:
+            pdf_document = fitz.open(document['storage_path'])
+        except Exception as e:
+            raise PermanentJobError(f"Could not open document: {e}")
+        page_count = len(pdf_document)
+
+        # Pages are extracted lazily as the chunker pulls them, so the time
+        # spent pulling a chunk includes extraction/OCR; those are measured
+        # per page and subtracted to get the chunking time.
+        timings = {"extract": 0.0, "ocr": 0.0}
+        pages = ((number, text) for number, text, _ in iter_pdf_pages(pdf_document, timings))
+
+        chunk_count = 0
+        batch = []
+
+        def flush(batch):
+            ctx.check_cancelled()
+            with ctx.stage("embed"):
+                embeddings = generate_embeddings_batch([chunk["text"] for chunk in batch])
+            with ctx.stage("write"):
+                for chunk, embedding in zip(batch, embeddings):
+                    cursor.execute(
+                        """
+                        INSERT INTO doc_chunks
+                            (document_id, chunk_index, text, token_count,
+                             page_start, char_start, page_end, char_end)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
+                        """,
+                        (document_id, chunk["index"], chunk["text"], chunk["token_count"],
+                         chunk["page_start"], chunk["char_start"], chunk["page_end"], chunk["char_end"])
+                    )
+                    chunk_id = cursor.fetchone()['id']
+                    cursor.execute(
+                        "INSERT INTO doc_embeddings (chunk_id, embedding) VALUES (%s, %s)",
+                        (chunk_id, json.dumps(embedding))
+                    )
+            ctx.set_progress(
+                0.05 + 0.9 * batch[-1]["page_end"] / max(page_count, 1),
+                f"processed page {batch[-1]['page_end']} of {page_count}"
+            )
+
+        ctx.set_progress(0.05, f"processing {page_count} pages")
+        chunks = get_chunker().chunks(pages)
+        while True:
+            chunk_start = time.time()
+            extract_before = timings["extract"] + timings["ocr"]
+            chunk = next(chunks, None)
+            extract_seconds = timings["extract"] + timings["ocr"] - extract_before
+            ctx.record_stage("chunk", time.time() - chunk_start - extract_seconds)
+            if chunk is None:
+                break
+            batch.append(chunk)
+            chunk_count += 1
+            if len(batch) >= EMBED_BATCH_SIZE:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        pdf_document.close()
+
+        ctx.record_stage("extract", timings["extract"])
+        ctx.record_stage("ocr", timings["ocr"])
+        if not chunk_count:
+            raise PermanentJobError("Could not extract text from document")
+
+        with ctx.stage("write"):
+            cursor.execute(
+                "UPDATE documents SET status = 'processed' WHERE id = %s",
+                (document_id,)
+            )
+            conn.commit()
+
+        cursor.close()
+        return {"document_id": document_id, "chunks": chunk_count, "pages": page_count}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def record_job_outcome(job: dict, status: str):
+    """Mark the document of a failed or cancelled processing job"""
+    if job["kind"] != "process_document":
+        return
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE documents SET status = %s WHERE id = %s",
+                    (status, job["payload"]["document_id"])
+                )
+    finally:
+        conn.close()
+
+JOB_QUEUE = JobQueue(on_finished=record_job_outcome)
+WORKER_POOL = WorkerPool(JOB_QUEUE, {"process_document": process_document_job}, workers=JOB_WORKERS)
+
 app = FastAPI(title="SmartProBono Document AI Worker")
+# One file per request, so the request limit is the file limit
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
 
 class ProcessBody(BaseModel):
     document_id: str
@@ -126,77 +258,60 @@ class AskBody(BaseModel):
     document_id: str
     question: str
 
+@app.on_event("startup")
+def start_job_workers():
+    WORKER_POOL.start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    WORKER_POOL.stop()
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "message": "Worker is running"}
+    return {
+        "status": "healthy",
+        "message": "Worker is running",
+        "embed_backend": EMBED_BACKEND,
+        "jobs": JOB_QUEUE.counts()
+    }
 
-@app.post("/process")
+@app.post("/process", status_code=202)
 def process_doc(body: ProcessBody):
-    """Process a document: extract text, chunk it, and generate embeddings"""
-    try:
-        # Get document from database
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get document info
-        cursor.execute(
-            "SELECT * FROM documents WHERE id = %s",
-            (body.document_id,)
-        )
-        document = cursor.fetchone()
-        
-        if not document:
-            raise HTTPException(404, "Document not found")
-        
-        # Get the actual text from the document
-        # Read the file and extract text
-        with open(document['storage_path'], 'rb') as f:
-            file_content = f.read()
-        
-        # Extract text from PDF
-        extracted_text = extract_text_from_pdf(file_content)
-        
-        if not extracted_text:
-            raise HTTPException(400, "Could not extract text from document")
-        
-        # Chunk the text
-        chunks = chunk_text(extracted_text, chunk_size=1000, overlap=200)
-        
-        # Store chunks and generate embeddings
-        for i, chunk_text in enumerate(chunks):
-            cursor.execute(
-                "INSERT INTO doc_chunks (document_id, chunk_index, text) VALUES (%s, %s, %s) RETURNING id",
-                (body.document_id, i, chunk_text)
-            )
-            chunk_id = cursor.fetchone()['id']
-            
-            # Generate real embeddings
-            embedding = generate_embeddings(chunk_text)
-            
-            cursor.execute(
-                "INSERT INTO doc_embeddings (chunk_id, embedding) VALUES (%s, %s)",
-                (chunk_id, json.dumps(embedding))
-            )
-        
-        # Update document status
-        cursor.execute(
-            "UPDATE documents SET status = 'processed' WHERE id = %s",
-            (body.document_id,)
-        )
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return {
-            "ok": True, 
-            "chunks": len(chunks), 
-            "message": "Document processed successfully",
-            "document_id": body.document_id
-        }
-    except Exception as e:
-        raise HTTPException(500, f"Processing failed: {str(e)}")
+    """Queue a document for processing and return the job id immediately"""
+    job_id = JOB_QUEUE.enqueue("process_document", {
+        "document_id": body.document_id,
+        "language": body.language
+    })
+    return {
+        "ok": True,
+        "job_id": job_id,
+        "status": "queued",
+        "message": "Document queued for processing",
+        "document_id": body.document_id
+    }
+
+@app.get("/jobs")
+def list_jobs(status: str = None, limit: int = 50):
+    """List recent jobs"""
+    return {"jobs": JOB_QUEUE.list(status=status, limit=limit), "counts": JOB_QUEUE.counts()}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Get job status, progress and per-stage timings"""
+    job = JOB_QUEUE.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    if not JOB_QUEUE.get(job_id):
+        raise HTTPException(404, "Job not found")
+    if not JOB_QUEUE.cancel(job_id):
+        raise HTTPException(409, "Job has already finished")
+    return {"ok": True, "job": JOB_QUEUE.get(job_id)}
 
 @app.post("/upload")
 async def upload_doc(file: UploadFile = File(...), user_id: str = None, title: str = None):
@@ -205,30 +320,33 @@ async def upload_doc(file: UploadFile = File(...), user_id: str = None, title: s
         if not file.filename.lower().endswith(('.pdf', '.txt', '.doc', '.docx')):
             raise HTTPException(400, "Only PDF, TXT, DOC, and DOCX files are supported")
         
-        # Read file content
-        file_content = await file.read()
-        
         # Generate document ID
         import uuid
         document_id = str(uuid.uuid4())
         
-        # Extract text based on file type
+        # Stream the upload to disk (in production, use proper storage)
+        stored = await save_upload(file, directory="/tmp", prefix=f"{document_id}_")
+        temp_path = stored.path
+        
+        # Measure the extracted text without holding it all in memory
+        text_length = 0
         if file.filename.lower().endswith('.pdf'):
-            extracted_text = extract_text_from_pdf(file_content)
-        elif file.filename.lower().endswith('.txt'):
-            extracted_text = file_content.decode('utf-8')
+            try:
+                pdf_document = fitz.open(temp_path)
+                text_length = sum(len(text) for _, text, _ in iter_pdf_pages(pdf_document))
+                pdf_document.close()
+            except Exception as e:
+                print(f"Error extracting text from PDF: {e}")
         else:
-            # For other formats, try to extract text (placeholder for now)
-            extracted_text = file_content.decode('utf-8', errors='ignore')
+            # TXT is read as UTF-8; other formats are a best-effort decode (placeholder for now)
+            with open(temp_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for block in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), ''):
+                    text_length += len(block)
         
-        if not extracted_text:
+        if not text_length:
+            os.remove(temp_path)
             raise HTTPException(400, "Could not extract text from document")
         
-        # Store file temporarily (in production, use proper storage)
-        temp_path = f"/tmp/{document_id}_{file.filename}"
-        with open(temp_path, "wb") as f:
-            f.write(file_content)
-        
         # Create document record in database
         conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
@@ -250,10 +368,14 @@ async def upload_doc(file: UploadFile = File(...), user_id: str = None, title: s
             "document_id": document_id,
             "path": temp_path,
             "message": "Document uploaded and text extracted successfully",
-            "text_length": len(extracted_text),
-            "filename": file.filename
+            "text_length": text_length,
+            "filename": file.filename,
+            "size": stored.size,
+            "sha256": stored.sha256
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Upload failed: {str(e)}")
 
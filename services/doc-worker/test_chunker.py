@@ -0,0 +1,26 @@
+"""Tests for the streaming chunker"""
+import random
+from chunker import StreamingChunker, whitespace_token_count
+
+
+def test_overlap_never_emitted_alone():
+    """A sentence carried as overlap is not repeated as a chunk of its own"""
+    text = " ".join("abcdefghijklmnop") + ". Short. " + " ".join(["long"] * 18) + ". Tail end."
+    chunks = list(StreamingChunker(max_tokens=20, overlap_tokens=5).chunks([(1, text)]))
+    assert [c["text"] for c in chunks] == [
+        "a b c d e f g h i j k l m n o p. Short.",
+        " ".join(["long"] * 18) + ".",
+        "Tail end.",
+    ]
+
+
+def test_every_chunk_adds_new_text():
+    """Each chunk ends past the previous one and stays within the token budget"""
+    rng = random.Random(3)
+    sentences = [" ".join(["w"] * rng.randint(1, 18)) + "." for _ in range(300)]
+    pages = [(number + 1, " ".join(sentences[number * 30:(number + 1) * 30])) for number in range(10)]
+    chunks = list(StreamingChunker(max_tokens=20, overlap_tokens=6).chunks(pages))
+    ends = [(c["page_end"], c["char_end"]) for c in chunks]
+    assert ends == sorted(set(ends))
+    assert all(whitespace_token_count(c["text"]) <= 20 for c in chunks)
+    assert ends[-1] == (10, len(pages[-1][1]))
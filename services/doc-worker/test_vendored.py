@@ -0,0 +1,21 @@
+"""The worker's copies of modules shared with smartprobono_backend stay identical"""
+import filecmp
+import os
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(HERE)), "smartprobono_backend")
+
+
+@pytest.mark.parametrize("copy, original", [
+    ("uploads.py", os.path.join("utils", "uploads.py")),
+    ("embedding_backend.py", os.path.join("rag", "embedding_backend.py")),
+])
+def test_copy_matches_backend(copy, original):
+    original_path = os.path.join(BACKEND, original)
+    if not os.path.exists(original_path):
+        pytest.skip("smartprobono_backend is not checked out next to the worker")
+    assert filecmp.cmp(os.path.join(HERE, copy), original_path, shallow=False), (
+        f"services/doc-worker/{copy} differs from smartprobono_backend/{original}; copy the change across"
+    )
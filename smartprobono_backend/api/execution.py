@@ -0,0 +1,129 @@
+"""
+Execution layer for running synchronous pipelines from async FastAPI handlers.
+
+Haystack ``Pipeline.run`` and LangGraph ``invoke`` are blocking. Calling them
+directly inside ``async def`` handlers freezes the event loop, so one slow query
+stalls every other request on the worker, including /api/health. This module
+runs them on a bounded thread pool, caps how many requests of each route may run
+at once, sheds load when a route's wait queue is full, and records queue-time
+and run-time metrics per route.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+SYNC_EXECUTOR_WORKERS = int(os.getenv("SYNC_EXECUTOR_WORKERS", "8"))
+
+# Concurrent runs allowed per route; override with ROUTE_LIMIT_<NAME>
+DEFAULT_ROUTE_LIMITS = {
+    "query": int(os.getenv("ROUTE_LIMIT_QUERY", "4")),
+    "assist": int(os.getenv("ROUTE_LIMIT_ASSIST", "2")),
+    "ingest": int(os.getenv("ROUTE_LIMIT_INGEST", "1")),
+}
+# Requests allowed to wait per route before new ones get a 503
+ROUTE_MAX_QUEUE = int(os.getenv("ROUTE_MAX_QUEUE", "32"))
+
+
+class RouteMetrics:
+    """Counters and timings for one route"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+        self.run_seconds_max = 0.0
+
+    def to_dict(self) -> Dict:
+        finished = self.completed + self.failed
+        return {
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_queue_seconds": round(self.queue_seconds_total / finished, 4) if finished else 0.0,
+            "max_queue_seconds": round(self.queue_seconds_max, 4),
+            "avg_run_seconds": round(self.run_seconds_total / finished, 4) if finished else 0.0,
+            "max_run_seconds": round(self.run_seconds_max, 4),
+        }
+
+
+class SyncExecutor:
+    """Bounded thread pool with per-route concurrency limits and metrics"""
+
+    def __init__(self, max_workers: int = SYNC_EXECUTOR_WORKERS,
+                 route_limits: Optional[Dict[str, int]] = None,
+                 max_queue: int = ROUTE_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.route_limits = dict(route_limits or DEFAULT_ROUTE_LIMITS)
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="spb-sync")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._metrics: Dict[str, RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _route(self, route: str):
+        with self._lock:
+            if route not in self._semaphores:
+                limit = self.route_limits.get(route, self.max_workers)
+                self._semaphores[route] = asyncio.Semaphore(limit)
+                self._metrics[route] = RouteMetrics()
+            return self._semaphores[route], self._metrics[route]
+
+    async def run(self, route: str, fn: Callable, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` off the event loop under the route's limit"""
+        semaphore, metrics = self._route(route)
+        if metrics.waiting >= self.max_queue:
+            metrics.rejected += 1
+            raise HTTPException(status_code=503, detail=f"Too many pending {route} requests, try again shortly")
+
+        queued_at = time.perf_counter()
+        metrics.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            metrics.waiting -= 1
+
+        started_at = time.perf_counter()
+        queue_seconds = started_at - queued_at
+        metrics.queue_seconds_total += queue_seconds
+        metrics.queue_seconds_max = max(metrics.queue_seconds_max, queue_seconds)
+        metrics.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+            metrics.completed += 1
+            return result
+        except Exception:
+            metrics.failed += 1
+            raise
+        finally:
+            run_seconds = time.perf_counter() - started_at
+            metrics.run_seconds_total += run_seconds
+            metrics.run_seconds_max = max(metrics.run_seconds_max, run_seconds)
+            metrics.running -= 1
+            semaphore.release()
+
+    def metrics(self) -> Dict:
+        """Per-route metrics snapshot"""
+        with self._lock:
+            routes = {route: m.to_dict() for route, m in self._metrics.items()}
+        return {
+            "max_workers": self.max_workers,
+            "route_limits": self.route_limits,
+            "routes": routes,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
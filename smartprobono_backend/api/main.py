@@ -2,6 +2,8 @@
 FastAPI main application for SmartProBono multi-agent system
 """
 import os
+import shutil
+import tempfile
 import time
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -20,9 +22,13 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from rag.pipelines import build_query_pipeline, build_indexing_pipeline
+from rag.pipelines import build_query_pipeline, build_parallel_ingestor, run_query_pipeline
+from rag.rerank import rerank_enabled
+from rag.embedding_backend import EMBED_BACKEND
 from graph.build import build_graph
 from utils.safety import needs_escalation, add_disclaimer
+from utils.uploads import save_upload, UploadSizeLimitMiddleware
+from api.execution import SyncExecutor
 
 # Load environment variables
 load_dotenv()
@@ -42,16 +48,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Blocking pipeline calls run here so they never stall the event loop
+EXECUTOR = SyncExecutor()
 
 # Initialize components
 try:
-    INDEX_PIPE: Pipeline = build_indexing_pipeline()
-    QUERY_PIPE: Pipeline = build_query_pipeline()
+    INDEXER = build_parallel_ingestor()
+    QUERY_PIPE: Pipeline = build_query_pipeline(rerank=rerank_enabled("query"))
     GRAPH = build_graph()
     print("✅ All components initialized successfully")
 except Exception as e:
     print(f"❌ Error initializing components: {e}")
-    INDEX_PIPE = None
+    INDEXER = None
     QUERY_PIPE = None
     GRAPH = None
 
@@ -69,6 +79,8 @@ class QueryResponse(BaseModel):
     confidence: float
     processing_time: float
     agent_used: str
+    context_stats: Optional[dict] = None
+    rerank_stats: Optional[dict] = None
 
 # Health check endpoint
 @app.get("/api/health")
@@ -78,41 +90,70 @@ async def health_check():
         "status": "ok",
         "message": "SmartProBono Multi-Agent System is running",
         "version": "1.0.0",
+        "embed_backend": EMBED_BACKEND,
         "components": {
-            "indexing_pipeline": INDEX_PIPE is not None,
+            "indexing_pipeline": INDEXER is not None,
             "query_pipeline": QUERY_PIPE is not None,
             "graph": GRAPH is not None
         }
     }
 
+# Execution metrics endpoint
+@app.get("/api/metrics/execution")
+async def execution_metrics():
+    """Per-route concurrency, queue-time and run-time metrics"""
+    return EXECUTOR.metrics()
+
+@app.get("/api/metrics/rerank")
+async def rerank_metrics():
+    """Cross-encoder rerank timings and cache hit rate for /api/query"""
+    if QUERY_PIPE is None or "rerank" not in QUERY_PIPE.graph.nodes:
+        return {"enabled": False}
+    return dict(QUERY_PIPE.get_component("rerank").metrics(), enabled=True)
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    EXECUTOR.shutdown()
+
 # Document ingestion endpoint
 @app.post("/api/ingest/pdf")
 async def ingest_pdf(files: List[UploadFile] = File(...)):
     """Ingest PDF documents into the knowledge base"""
-    if not INDEX_PIPE:
+    if not INDEXER:
         raise HTTPException(status_code=500, detail="Indexing pipeline not available")
     
+    upload_dir = tempfile.mkdtemp(prefix="spb-ingest-")
     try:
-        # Convert uploads to ByteStreams
-        streams = []
-        for file in files:
-            content = await file.read()
-            streams.append(ByteStream(
-                data=content, 
-                meta={"filename": file.filename}
-            ))
+        # Stream uploads to disk; the converter reads them by path
+        sources = []
+        metas = []
+        for i, file in enumerate(files):
+            stored = await save_upload(file, directory=upload_dir, prefix=f"{i}_")
+            sources.append(stored.path)
+            # Uploads have no stable path, so the ledger keys them by content
+            metas.append({"source_id": f"sha256:{stored.sha256}", "filename": file.filename,
+                          "sha256": stored.sha256, "size": stored.size})
         
-        # Run indexing pipeline
-        result = INDEX_PIPE.run({"pdf": {"sources": streams}})
+        # Index only changed files and embed only new chunks
+        file_progress = {}
+        def record_progress(source_id, status, info):
+            file_progress[source_id] = dict(info, status=status)
+        stats = await EXECUTOR.run("ingest", INDEXER.index, sources, metas, progress=record_progress)
         
         return {
             "success": True,
             "files_processed": len(files),
-            "chunks_created": len(result["write"]["documents_written"])
+            "chunks_created": stats["chunks_new"],
+            "stats": stats,
+            "files": file_progress
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing files: {str(e)}")
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
 
 # Simple query endpoint (RAG only)
 @app.post("/api/query", response_model=QueryResponse)
@@ -125,10 +166,9 @@ async def query(request: QueryRequest):
     
     try:
         # Run RAG pipeline
-        result = QUERY_PIPE.run({"q_embed": {"text": request.query}})
+        result, docs = await EXECUTOR.run("query", run_query_pipeline, QUERY_PIPE, request.query)
         
         answer = result["llm"]["replies"][0]
-        docs = result["retrieve"]["documents"]
         citations = [{"content": d.content[:200], "meta": d.meta} for d in docs]
         
         # Check if escalation is needed
@@ -145,9 +185,13 @@ async def query(request: QueryRequest):
             escalate=escalate,
             confidence=0.8 if docs else 0.3,
             processing_time=time.time() - start_time,
-            agent_used="rag-pipeline"
+            agent_used="rag-pipeline",
+            context_stats=result.get("assemble", {}).get("stats"),
+            rerank_stats=result.get("rerank", {}).get("stats")
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
@@ -169,7 +213,7 @@ async def assist(request: QueryRequest):
         }
         
         # Run the multi-agent graph
-        final_state = GRAPH.invoke(state)
+        final_state = await EXECUTOR.run("assist", GRAPH.invoke, state)
         
         # Extract results
         answer = final_state.get("draft", "I'm sorry, I couldn't generate a response.")
@@ -192,6 +236,8 @@ async def assist(request: QueryRequest):
             agent_used=final_state.get("agent_used", "multi-agent-system")
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in multi-agent system: {str(e)}")
 
@@ -9,12 +9,13 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from rag.pipelines import build_query_pipeline
+from rag.pipelines import build_query_pipeline, run_query_pipeline
+from rag.rerank import rerank_enabled
 from utils.safety import needs_escalation
 from utils.prompts import get_agent_prompts
 
 # Shared RAG pipeline instance
-RAG_PIPE: Pipeline = build_query_pipeline()
+RAG_PIPE: Pipeline = build_query_pipeline(rerank=rerank_enabled("assist"))
 
 def intake_node(state: Dict) -> Dict:
     """Intake agent: normalize user questions, gather facts, flag jurisdiction"""
@@ -57,11 +58,11 @@ def research_node(state: Dict) -> Dict:
     
     try:
         # Run RAG pipeline
-        result = RAG_PIPE.run({"q_embed": {"text": state["query"]}})
+        result, docs = run_query_pipeline(RAG_PIPE, state["query"])
         
-        docs = result["retrieve"]["documents"]
         state.update({
             "docs": docs,
+            "rag_reply": result["llm"]["replies"][0],
             "research_time": time.time() - start_time,
             "docs_found": len(docs)
         })
@@ -82,12 +83,12 @@ def drafting_node(state: Dict) -> Dict:
     start_time = time.time()
     
     try:
-        # Use the same RAG pipeline for generation
-        result = RAG_PIPE.run({
-            "q_embed": {"text": state["query"]}
-        })
-        
-        reply = result["llm"]["replies"][0]
+        # The research run already generated from the reranked documents;
+        # only run the pipeline again if it failed
+        reply = state.get("rag_reply")
+        if reply is None:
+            result, _ = run_query_pipeline(RAG_PIPE, state["query"])
+            reply = result["llm"]["replies"][0]
         
         # Extract citations
         citations = re.findall(r"\[(\d+)\]", reply)
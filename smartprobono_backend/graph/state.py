@@ -13,6 +13,7 @@ class SPBState(TypedDict, total=False):
     jurisdiction: Optional[str]
     messages: List[dict]        # chat history
     docs: List[Any]            # retrieved documents
+    rag_reply: Optional[str]   # LLM reply from the research pipeline run
     draft: str                 # generated response
     citations: List[str]       # citation references
     
@@ -0,0 +1,123 @@
+"""
+Embedding backend benchmark and parity check.
+
+Embeds the retrieval fixture corpus with each backend in a fresh process and
+reports load time, throughput and resident memory, then compares every backend's
+vectors with the PyTorch ones by cosine similarity. Exits non-zero if a backend
+falls below its parity threshold, so it can gate a switch of EMBED_BACKEND.
+
+Run from smartprobono_backend/:
+    python -m rag.bench_embeddings [--repeat 20] [--batch-size 32] [--backends torch,onnx,onnx-int8]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+from .embedding_backend import BACKENDS, EMBED_MODEL, PARITY_THRESHOLDS, load_embedding_model
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval_eval.json")
+
+
+def load_texts(path: str):
+    with open(path) as f:
+        data = json.load(f)
+    return [d["content"] for d in data["documents"]] + [q["query"] for q in data["queries"]]
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak RSS is the best we can do without /proc (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_backend(backend: str, texts, repeat: int, batch_size: int):
+    """Benchmark one backend; runs in its own process so memory is not shared"""
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    model = load_embedding_model(EMBED_MODEL, backend)
+    load_seconds = time.perf_counter() - start
+
+    vectors = np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+    corpus = texts * repeat
+    start = time.perf_counter()
+    model.encode(corpus, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    # Single-query latency, as seen by /api/query
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        model.encode(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "texts_per_second": round(len(corpus) / batch_seconds, 1),
+        "query_p50_ms": round(latencies[len(latencies) // 2], 2),
+        "rss_mb": round(rss_mb() - rss_before, 1),
+        "vectors": vectors,
+    }
+
+
+def parity(reference: np.ndarray, vectors: np.ndarray):
+    """Min and mean per-text cosine similarity between two embedding matrices"""
+    a = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    b = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    cosines = (a * b).sum(axis=1)
+    return float(cosines.min()), float(cosines.mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends and check parity with PyTorch")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=20, help="copies of the corpus in the throughput run")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    texts = load_texts(args.fixture)
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "torch" not in backends:
+        backends.insert(0, "torch")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in backends:
+        with ctx.Pool(1) as pool:
+            results[backend] = pool.apply(run_backend, (backend, texts, args.repeat, args.batch_size))
+
+    reference = results["torch"]["vectors"]
+    print(f"{len(texts)} texts x {args.repeat}, batch size {args.batch_size}, model {EMBED_MODEL}")
+    print(f"{'backend':<10} {'load s':>7} {'texts/s':>9} {'p50 ms':>8} {'RSS MB':>8} {'min cos':>8} {'mean cos':>9}")
+    failed = []
+    for backend, r in results.items():
+        min_cos, mean_cos = parity(reference, r["vectors"])
+        print(f"{backend:<10} {r['load_seconds']:>7} {r['texts_per_second']:>9} {r['query_p50_ms']:>8} "
+              f"{r['rss_mb']:>8} {min_cos:>8.4f} {mean_cos:>9.4f}")
+        if min_cos < PARITY_THRESHOLDS.get(backend, 0.98) - 1e-6:
+            failed.append(backend)
+
+    for backend in failed:
+        print(f"  {backend}: below parity threshold {PARITY_THRESHOLDS.get(backend, 0.98)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
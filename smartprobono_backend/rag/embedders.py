@@ -0,0 +1,73 @@
+"""
+Haystack embedder components for the pluggable embedding backends.
+
+``text_embedder()`` and ``document_embedder()`` return the components for the
+configured backend (see rag/embedding_backend.py); ``torch`` keeps the stock
+sentence-transformers embedders.
+"""
+from dataclasses import replace
+from typing import List
+
+from haystack import Document, component
+
+from .embedding_backend import EMBED_BACKEND, EMBED_MODEL, load_embedding_model
+
+
+@component
+class BackendTextEmbedder:
+    """Haystack text embedder running on a pluggable embedding backend"""
+
+    def __init__(self, model: str = EMBED_MODEL, backend: str = EMBED_BACKEND):
+        self.model = model
+        self.backend = backend
+        self._embedder = None
+
+    def warm_up(self):
+        if self._embedder is None:
+            self._embedder = load_embedding_model(self.model, self.backend)
+
+    @component.output_types(embedding=List[float])
+    def run(self, text: str):
+        self.warm_up()
+        return {"embedding": self._embedder.encode(text).tolist()}
+
+
+@component
+class BackendDocumentEmbedder:
+    """Haystack document embedder running on a pluggable embedding backend"""
+
+    def __init__(self, model: str = EMBED_MODEL, backend: str = EMBED_BACKEND, batch_size: int = 32):
+        self.model = model
+        self.backend = backend
+        self.batch_size = batch_size
+        self._embedder = None
+
+    def warm_up(self):
+        if self._embedder is None:
+            self._embedder = load_embedding_model(self.model, self.backend)
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]):
+        self.warm_up()
+        if not documents:
+            return {"documents": []}
+        embeddings = self._embedder.encode([doc.content or "" for doc in documents], batch_size=self.batch_size)
+        return {"documents": [
+            replace(doc, embedding=embedding.tolist()) for doc, embedding in zip(documents, embeddings)
+        ]}
+
+
+def text_embedder(model: str = EMBED_MODEL, backend: str = EMBED_BACKEND):
+    """Query embedder for the configured backend"""
+    if backend == "torch":
+        from haystack.components.embedders import SentenceTransformersTextEmbedder
+        return SentenceTransformersTextEmbedder(model=model)
+    return BackendTextEmbedder(model=model, backend=backend)
+
+
+def document_embedder(model: str = EMBED_MODEL, backend: str = EMBED_BACKEND, batch_size: int = 32):
+    """Document embedder for the configured backend"""
+    if backend == "torch":
+        from haystack.components.embedders import SentenceTransformersDocumentEmbedder
+        return SentenceTransformersDocumentEmbedder(model=model, batch_size=batch_size)
+    return BackendDocumentEmbedder(model=model, backend=backend, batch_size=batch_size)
@@ -0,0 +1,121 @@
+"""
+Pluggable embedding backends for all-MiniLM-L6-v2.
+
+EMBED_BACKEND selects the implementation:
+
+- ``torch``: sentence-transformers on PyTorch (default)
+- ``onnx``: ONNX Runtime with the fp32 ONNX export of the same model
+- ``onnx-int8``: ONNX Runtime with a dynamically int8-quantized export
+
+The ONNX backends tokenize with the model's own tokenizer and apply the same
+mean pooling and L2 normalisation as the sentence-transformers pipeline, so
+vectors stay comparable with ones already stored. Every backend has
+``encode(texts, batch_size)`` plus ``tokenizer`` and ``max_seq_length``, like
+``SentenceTransformer``.
+
+This module has no Haystack dependency. The document worker keeps an
+identical copy (services/doc-worker/embedding_backend.py, checked by its
+test_vendored.py), and the Haystack components built on it are in
+rag/embedders.py.
+"""
+import os
+
+import numpy as np
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+# Prebuilt .onnx file to use instead of the Hugging Face export
+EMBED_ONNX_PATH = os.getenv("EMBED_ONNX_PATH")
+EMBED_ONNX_CACHE = os.getenv(
+    "EMBED_ONNX_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "smartprobono", "onnx")
+)
+# 0 lets ONNX Runtime pick (one thread per physical core)
+EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", "0"))
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+# Minimum cosine similarity to the PyTorch vector, per text
+PARITY_THRESHOLDS = {"torch": 1.0, "onnx": 0.999, "onnx-int8": 0.98}
+
+
+def onnx_model_path(model: str = EMBED_MODEL, quantize: bool = False) -> str:
+    """Path to the model's ONNX file, quantizing it to int8 on first use"""
+    if EMBED_ONNX_PATH:
+        return EMBED_ONNX_PATH
+    from huggingface_hub import hf_hub_download
+    fp32_path = hf_hub_download(model, "onnx/model.onnx")
+    if not quantize:
+        return fp32_path
+
+    target = os.path.join(EMBED_ONNX_CACHE, model.replace("/", "__") + "-int8.onnx")
+    if not os.path.exists(target):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        os.makedirs(EMBED_ONNX_CACHE, exist_ok=True)
+        tmp_path = target + f".{os.getpid()}.tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, target)
+    return target
+
+
+class OnnxSentenceEmbedder:
+    """ONNX Runtime implementation of a mean-pooled sentence-transformers model"""
+
+    def __init__(self, model: str = EMBED_MODEL, quantize: bool = False, max_seq_length: int = 256,
+                 threads: int = EMBED_ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model
+        self.quantize = quantize
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            onnx_model_path(model, quantize), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _embed_batch(self, texts, normalize: bool) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self._input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = True, **kwargs):
+        """Embed one text or a list of texts; mirrors SentenceTransformer.encode"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Longest first, so each batch pads to similar lengths
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        embeddings = None
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batch = self._embed_batch([texts[i] for i in indices], normalize_embeddings)
+            if embeddings is None:
+                embeddings = np.zeros((len(texts), batch.shape[1]), dtype=np.float32)
+            embeddings[indices] = batch
+        return embeddings[0] if single else embeddings
+
+
+def load_embedding_model(model: str = EMBED_MODEL, backend: str = EMBED_BACKEND):
+    """Load the embedding model with the configured backend"""
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxSentenceEmbedder(model, quantize=backend == "onnx-int8")
+    raise ValueError(f"Unknown EMBED_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+
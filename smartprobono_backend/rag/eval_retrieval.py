@@ -0,0 +1,117 @@
+"""
+Retrieval evaluation harness: recall@k and latency on a fixture corpus.
+
+Compares vector-only, keyword-only (BM25) and hybrid (reciprocal-rank fusion)
+retrieval using in-memory Haystack stores, so it runs without Postgres.
+
+Run from smartprobono_backend/:
+    python -m rag.eval_retrieval [--k 3] [--fixture rag/fixtures/retrieval_eval.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from haystack import Document, Pipeline
+from haystack.components.retrievers.in_memory import (
+    InMemoryBM25Retriever,
+    InMemoryEmbeddingRetriever,
+)
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+
+from .embedders import document_embedder
+from .pipelines import HYBRID_CANDIDATES, add_retrieval, run_query_pipeline
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval_eval.json")
+
+
+def load_fixture(path: str):
+    with open(path) as f:
+        data = json.load(f)
+    documents = [
+        Document(id=d["id"], content=d["content"], meta={"filename": d.get("filename")})
+        for d in data["documents"]
+    ]
+    return documents, data["queries"]
+
+
+def build_store(documents) -> InMemoryDocumentStore:
+    """Embed the fixture documents into an in-memory store"""
+    embedder = document_embedder()
+    embedder.warm_up()
+    store = InMemoryDocumentStore(embedding_similarity_function="cosine")
+    store.write_documents(embedder.run(documents=documents)["documents"])
+    return store
+
+
+def build_pipelines(store, k: int, candidates: int = HYBRID_CANDIDATES):
+    """Retrieval-only pipelines for each mode"""
+    vector = Pipeline()
+    add_retrieval(vector, InMemoryEmbeddingRetriever(document_store=store, top_k=k))
+
+    keyword = Pipeline()
+    keyword.add_component("keyword", InMemoryBM25Retriever(document_store=store, top_k=k))
+
+    hybrid = Pipeline()
+    add_retrieval(
+        hybrid,
+        InMemoryEmbeddingRetriever(document_store=store, top_k=candidates),
+        InMemoryBM25Retriever(document_store=store, top_k=candidates),
+        top_k=k
+    )
+    return {"vector": vector, "keyword": keyword, "hybrid": hybrid}
+
+
+def evaluate(pipeline, queries, k: int):
+    """Mean recall@k and latency percentiles (ms) for one pipeline"""
+    recalls = []
+    latencies = []
+    misses = []
+    for item in queries:
+        start = time.perf_counter()
+        _, docs = run_query_pipeline(pipeline, item["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {doc.id for doc in docs[:k]}
+        relevant = set(item["relevant"])
+        recalls.append(len(found & relevant) / len(relevant))
+        if not relevant <= found:
+            misses.append(item["query"])
+    latencies.sort()
+    return {
+        "recall_at_k": round(statistics.mean(recalls), 3),
+        "p50_ms": round(latencies[len(latencies) // 2], 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+        "misses": misses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate vector, keyword and hybrid retrieval")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    documents, queries = load_fixture(args.fixture)
+    store = build_store(documents)
+    pipelines = build_pipelines(store, args.k)
+
+    # Warm each pipeline once so model loading isn't counted as latency
+    for pipeline in pipelines.values():
+        run_query_pipeline(pipeline, queries[0]["query"])
+
+    print(f"{len(documents)} documents, {len(queries)} queries, k={args.k}")
+    print(f"{'mode':<8} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    results = {}
+    for mode, pipeline in pipelines.items():
+        results[mode] = evaluate(pipeline, queries, args.k)
+        r = results[mode]
+        print(f"{mode:<8} {r['recall_at_k']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+    for mode, r in results.items():
+        for query in r["misses"]:
+            print(f"  {mode} missed: {query}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Embedding retriever over the half-precision pgvector HNSW index.
+
+Candidates come from the ``embedding::halfvec(384)`` expression index created
+by sql/vector_halfvec_indexes.sql, which is half the size of a vector(384)
+index. They are then re-ranked by exact cosine distance on the full-precision
+column, so scores match PgvectorEmbeddingRetriever's "cosine_similarity".
+
+Enable with HALFVEC_RETRIEVAL=true once the SQL has been applied; without the
+index the candidate query falls back to a sequential scan.
+"""
+import json
+import os
+import threading
+from typing import List, Optional
+
+from haystack import Document, component
+from psycopg2.pool import ThreadedConnectionPool
+
+HALFVEC_RETRIEVAL = os.getenv("HALFVEC_RETRIEVAL", "false").lower() == "true"
+# Candidates fetched from the halfvec index per result returned
+HALFVEC_RESCORE_FACTOR = int(os.getenv("HALFVEC_RESCORE_FACTOR", "4"))
+
+CANDIDATE_QUERY = """
+    SELECT id, content, meta, embedding::text, 1 - (embedding <=> %(query)s::vector({dim})) AS score
+    FROM (
+        SELECT id, content, meta, embedding
+        FROM {table}
+        ORDER BY embedding::halfvec({dim}) <=> %(query)s::halfvec({dim})
+        LIMIT %(candidates)s
+    ) candidates
+    ORDER BY embedding <=> %(query)s::vector({dim})
+    LIMIT %(top_k)s
+"""
+
+
+@component
+class HalfvecEmbeddingRetriever:
+    """Candidate-and-rescore retriever, a drop-in for PgvectorEmbeddingRetriever"""
+
+    def __init__(self, connection_string: Optional[str] = None, table: str = "spb_documents",
+                 dim: int = 384, top_k: int = 10, rescore_factor: int = HALFVEC_RESCORE_FACTOR,
+                 max_connections: int = 4):
+        self.connection_string = connection_string or os.getenv("PG_CONN_STR")
+        if not self.connection_string:
+            raise ValueError("PG_CONN_STR environment variable is required")
+        self.query = CANDIDATE_QUERY.format(table=table, dim=dim)
+        self.top_k = top_k
+        self.rescore_factor = max(1, rescore_factor)
+        self.max_connections = max_connections
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def warm_up(self):
+        if self._pool is not None:
+            return
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(1, self.max_connections, self.connection_string)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], top_k: Optional[int] = None):
+        self.warm_up()
+        top_k = top_k or self.top_k
+        candidates = top_k * self.rescore_factor
+        conn = self._pool.getconn()
+        try:
+            with conn, conn.cursor() as cur:
+                # The HNSW scan returns at most ef_search rows (default 40)
+                cur.execute("SET LOCAL hnsw.ef_search = %s", (max(candidates, 40),))
+                cur.execute(self.query, {
+                    "query": "[" + ",".join(str(float(x)) for x in query_embedding) + "]",
+                    "candidates": candidates,
+                    "top_k": top_k,
+                })
+                rows = cur.fetchall()
+        finally:
+            self._pool.putconn(conn)
+        return {"documents": [
+            Document(id=doc_id, content=content, meta=meta or {}, embedding=json.loads(embedding),
+                     score=float(score))
+            for doc_id, content, meta, embedding, score in rows
+        ]}
@@ -0,0 +1,125 @@
+"""
+Incremental, content-hash based indexing for the Haystack ingestion pipeline.
+
+A ledger table records, for every ingested source file, the SHA-256 of the file
+and the ids of the chunks it produced. Chunk ids are derived from the source and
+the chunk's content hash, so on re-ingest:
+
+- an unchanged file is skipped before conversion,
+- chunks whose id is already in the ledger are not re-embedded,
+- chunks that disappeared from a changed file are deleted from the store.
+"""
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from haystack import Document
+from psycopg2.pool import ThreadedConnectionPool
+
+LEDGER_TABLE = "spb_ingest_ledger"
+
+
+def source_id_for(path: str, meta: Dict) -> str:
+    """Ledger key for a file: an explicit meta["source_id"], else its absolute path"""
+    return meta.get("source_id") or os.path.abspath(path)
+
+
+def sha256_file(path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source_id: str, content: str) -> str:
+    """Stable id for a chunk: hash of its source and its content"""
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{source_id}\x00{content_hash}".encode("utf-8")).hexdigest()
+
+
+def assign_chunk_ids(source_id: str, documents: List[Document]) -> List[Document]:
+    """Give each chunk its content-hash id, dropping empty and duplicate chunks"""
+    seen = set()
+    chunks = []
+    for doc in documents:
+        if not doc.content or not doc.content.strip():
+            continue
+        doc.id = chunk_id(source_id, doc.content)
+        if doc.id in seen:
+            continue
+        seen.add(doc.id)
+        chunks.append(doc)
+    return chunks
+
+
+class IngestLedger:
+    """File- and chunk-level content-hash ledger stored next to the document store
+
+    Entries are keyed by source id: the file's path for bulk loads, or a
+    content id ("sha256:<hash>") for uploads, which have no stable path.
+    Connections come from a small pool shared by the ingest threads.
+    """
+
+    def __init__(self, connection_string: Optional[str] = None, table: str = LEDGER_TABLE,
+                 max_connections: int = 4):
+        self.connection_string = connection_string or os.getenv("PG_CONN_STR")
+        if not self.connection_string:
+            raise ValueError("PG_CONN_STR environment variable is required")
+        self.table = table
+        self._pool = ThreadedConnectionPool(1, max_connections, self.connection_string)
+        with self._cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    source_id TEXT PRIMARY KEY,
+                    file_hash TEXT NOT NULL,
+                    chunk_ids JSONB NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+
+    @contextmanager
+    def _cursor(self):
+        """Cursor in its own transaction on a pooled connection"""
+        conn = self._pool.getconn()
+        try:
+            with conn, conn.cursor() as cur:
+                yield cur
+        finally:
+            self._pool.putconn(conn)
+
+    def close(self):
+        self._pool.closeall()
+
+    def get(self, source_id: str) -> Optional[Dict]:
+        """Ledger entry for a source: {"file_hash", "chunk_ids"} or None"""
+        with self._cursor() as cur:
+            cur.execute(
+                f"SELECT file_hash, chunk_ids FROM {self.table} WHERE source_id = %s",
+                (source_id,)
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return {"file_hash": row[0], "chunk_ids": list(row[1])}
+
+    def put(self, source_id: str, file_hash: str, chunk_ids: List[str]):
+        with self._cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {self.table} (source_id, file_hash, chunk_ids, updated_at)
+                VALUES (%s, %s, %s, now())
+                ON CONFLICT (source_id) DO UPDATE
+                SET file_hash = EXCLUDED.file_hash,
+                    chunk_ids = EXCLUDED.chunk_ids,
+                    updated_at = now()
+                """,
+                (source_id, file_hash, json.dumps(chunk_ids))
+            )
+
+    def delete(self, source_id: str):
+        with self._cursor() as cur:
+            cur.execute(f"DELETE FROM {self.table} WHERE source_id = %s", (source_id,))
@@ -0,0 +1,275 @@
+"""
+Parallel batched ingestion for the Haystack indexing pipeline.
+
+PDF conversion, cleaning and splitting run per file in a process pool. Chunks
+from all files are embedded in large batches on one shared model instance, and
+a writer thread stores them in batches. The queue between embedding and writing
+is bounded, so embedding pauses when the document store falls behind.
+
+Files are checked against the ingest ledger first, so unchanged files are
+skipped and only new chunks are embedded (see rag/incremental.py).
+
+Bulk load a directory (run from smartprobono_backend/):
+    python -m rag.parallel_ingest path/to/pdfs
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from haystack.components.writers import DocumentWriter
+from haystack.document_stores.types import DuplicatePolicy
+
+from .incremental import IngestLedger, assign_chunk_ids, sha256_file, source_id_for
+
+# Configuration
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+WRITE_BATCH_SIZE = int(os.getenv("INGEST_WRITE_BATCH_SIZE", "500"))
+MAX_PENDING_WRITES = int(os.getenv("INGEST_MAX_PENDING_WRITES", "4"))
+
+# Per-process conversion pipeline, built on first use in each worker
+_worker_pipeline = None
+
+
+def convert_file(path: str, meta: Dict):
+    """Convert, clean and split one PDF (runs inside a pool worker)"""
+    global _worker_pipeline
+    if _worker_pipeline is None:
+        from .pipelines import build_conversion_pipeline
+        _worker_pipeline = build_conversion_pipeline()
+    result = _worker_pipeline.run({"pdf": {"sources": [path], "meta": [meta]}})
+    return result["split"]["documents"]
+
+
+class ParallelIngestor:
+    """Ingestion engine: process-pool conversion, batched embedding, pipelined writes"""
+
+    def __init__(self, document_store, embedder, ledger: Optional[IngestLedger] = None,
+                 workers: int = INGEST_WORKERS, embed_batch_size: int = EMBED_BATCH_SIZE,
+                 write_batch_size: int = WRITE_BATCH_SIZE,
+                 max_pending_writes: int = MAX_PENDING_WRITES):
+        self.document_store = document_store
+        self.embedder = embedder
+        self.ledger = ledger or IngestLedger()
+        self.writer = DocumentWriter(document_store=document_store, policy=DuplicatePolicy.OVERWRITE)
+        self.workers = max(1, workers)
+        self.embed_batch_size = embed_batch_size
+        self.write_batch_size = write_batch_size
+        self.max_pending_writes = max_pending_writes
+        self._pool = None
+        self._warm = False
+        # The embedding model is shared, so ingests run one at a time
+        self._run_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # spawn, not fork: forking a process that has loaded torch can deadlock
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.ledger.close()
+
+    def index(self, sources: List[str], metas: Optional[List[Dict]] = None,
+              progress: Optional[Callable[[str, str, Dict], None]] = None) -> Dict:
+        """Index files by path and return ingest stats
+
+        Metas may carry "source_id" (the ledger key, default: the absolute
+        path), "filename" and "sha256". ``progress(source_id, status, info)``
+        is called per file as it moves through "unchanged", "converted" and
+        "indexed".
+        """
+        with self._run_lock:
+            return self._index(sources, metas or [{} for _ in sources], progress)
+
+    def _index(self, sources, metas, progress):
+        started = time.time()
+        stats = {
+            "files_new": 0, "files_changed": 0, "files_unchanged": 0,
+            "chunks_new": 0, "chunks_skipped": 0, "chunks_removed": 0,
+        }
+        report = progress or (lambda source_id, status, info: None)
+
+        jobs = []
+        queued = set()
+        for path, meta in zip(sources, metas):
+            source_id = source_id_for(path, meta)
+            file_hash = meta.get("sha256") or sha256_file(path)
+            if source_id in queued:
+                # The same source twice in one batch (e.g. one file uploaded twice)
+                stats["files_unchanged"] += 1
+                report(source_id, "unchanged", {"chunks": 0})
+                continue
+            entry = self.ledger.get(source_id)
+            if entry and entry["file_hash"] == file_hash:
+                stats["files_unchanged"] += 1
+                stats["chunks_skipped"] += len(entry["chunk_ids"])
+                report(source_id, "unchanged", {"chunks": len(entry["chunk_ids"])})
+                continue
+            stats["files_changed" if entry else "files_new"] += 1
+            queued.add(source_id)
+            # Haystack's DocumentSplitter sets meta["source_id"] to the parent
+            # document id, so chunks carry the ledger key as "ingest_source"
+            doc_meta = {key: value for key, value in meta.items() if key != "source_id"}
+            jobs.append((path, dict(doc_meta, ingest_source=source_id, file_hash=file_hash), entry))
+
+        if jobs:
+            if not self._warm:
+                self.embedder.warm_up()
+                self._warm = True
+            self._run_jobs(jobs, stats, report)
+
+        stats["seconds"] = round(time.time() - started, 3)
+        return stats
+
+    def _run_jobs(self, jobs, stats, report):
+        files = {}
+        errors = []
+        write_queue = queue.Queue(maxsize=self.max_pending_writes)
+        writer = threading.Thread(
+            target=self._write_loop, args=(write_queue, files, stats, report, errors),
+            name="ingest-writer", daemon=True
+        )
+        writer.start()
+
+        pending = []
+        try:
+            for meta, entry, documents in self._convert(jobs):
+                source_id = meta["ingest_source"]
+                chunks = assign_chunk_ids(source_id, documents)
+                known = set(entry["chunk_ids"]) if entry else set()
+                current = [doc.id for doc in chunks]
+                fresh = [doc for doc in chunks if doc.id not in known]
+                state = {
+                    "file_hash": meta["file_hash"],
+                    "chunk_ids": current,
+                    "stale": known - set(current),
+                    "remaining": len(fresh),
+                    "new": len(fresh),
+                }
+                with self._state_lock:
+                    files[source_id] = state
+                    stats["chunks_skipped"] += len(chunks) - len(fresh)
+                report(source_id, "converted", {"chunks": len(chunks), "new": len(fresh)})
+                if not fresh:
+                    self._finish_file(source_id, state, stats, report)
+
+                pending.extend(fresh)
+                while len(pending) >= self.embed_batch_size:
+                    batch, pending = pending[:self.embed_batch_size], pending[self.embed_batch_size:]
+                    self._embed_and_queue(batch, write_queue, errors)
+            if pending:
+                self._embed_and_queue(pending, write_queue, errors)
+        finally:
+            write_queue.put(None)
+            writer.join()
+
+        if errors:
+            raise errors[0]
+
+    def _convert(self, jobs):
+        """Yield (meta, ledger entry, split documents) as files finish converting"""
+        if self.workers == 1 or len(jobs) == 1:
+            for path, meta, entry in jobs:
+                yield meta, entry, convert_file(path, meta)
+            return
+
+        # Keep a bounded number of files in flight so converted chunks
+        # don't pile up faster than they can be embedded.
+        pool = self._get_pool()
+        remaining = iter(jobs)
+        in_flight = {}
+        for path, meta, entry in remaining:
+            in_flight[pool.submit(convert_file, path, meta)] = (meta, entry)
+            if len(in_flight) >= self.workers * 2:
+                break
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                meta, entry = in_flight.pop(future)
+                yield meta, entry, future.result()
+                next_job = next(remaining, None)
+                if next_job is not None:
+                    path, next_meta, next_entry = next_job
+                    in_flight[pool.submit(convert_file, path, next_meta)] = (next_meta, next_entry)
+
+    def _embed_and_queue(self, batch, write_queue, errors):
+        if errors:
+            raise errors[0]
+        embedded = self.embedder.run(documents=batch)["documents"]
+        for i in range(0, len(embedded), self.write_batch_size):
+            # Blocks while the writer is behind: this is the backpressure
+            write_queue.put(embedded[i:i + self.write_batch_size])
+
+    def _write_loop(self, write_queue, files, stats, report, errors):
+        while True:
+            batch = write_queue.get()
+            if batch is None:
+                return
+            if errors:
+                continue
+            try:
+                self.writer.run(documents=batch)
+                finished = []
+                with self._state_lock:
+                    for doc in batch:
+                        source_id = doc.meta["ingest_source"]
+                        state = files[source_id]
+                        state["remaining"] -= 1
+                        if state["remaining"] == 0:
+                            finished.append((source_id, state))
+                for source_id, state in finished:
+                    self._finish_file(source_id, state, stats, report)
+            except Exception as e:
+                errors.append(e)
+
+    def _finish_file(self, source_id, state, stats, report):
+        """All new chunks of a file are written: drop stale ones and update the ledger"""
+        if state["stale"]:
+            self.document_store.delete_documents(document_ids=list(state["stale"]))
+        self.ledger.put(source_id, state["file_hash"], state["chunk_ids"])
+        with self._state_lock:
+            stats["chunks_new"] += state["new"]
+            stats["chunks_removed"] += len(state["stale"])
+        report(source_id, "indexed", {
+            "chunks": len(state["chunk_ids"]),
+            "new": state["new"],
+            "removed": len(state["stale"]),
+        })
+
+
+if __name__ == "__main__":
+    import argparse
+    from .pipelines import build_parallel_ingestor
+
+    parser = argparse.ArgumentParser(description="Bulk ingest a directory of PDFs")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(args.directory)
+        for name in names if name.lower().endswith(".pdf")
+    )
+    ingestor = build_parallel_ingestor(workers=args.workers)
+    try:
+        stats = ingestor.index(
+            paths,
+            [{"filename": os.path.relpath(path, args.directory)} for path in paths],
+            progress=lambda source_id, status, info: print(f"{status:>10} {source_id} {info}")
+        )
+    finally:
+        ingestor.close()
+    print(stats)
@@ -4,22 +4,34 @@ Haystack RAG pipelines for document ingestion and querying
 from haystack import Pipeline
 from haystack.components.converters.pypdf import PyPDFToDocument
 from haystack.components.preprocessors import DocumentCleaner, DocumentSplitter
-from haystack.components.embedders import (
-    SentenceTransformersDocumentEmbedder,
-    SentenceTransformersTextEmbedder,
-)
 from haystack.components.writers import DocumentWriter
 from haystack.components.builders import PromptBuilder
-from haystack_integrations.components.retrievers.pgvector import PgvectorEmbeddingRetriever
+from haystack.components.joiners import DocumentJoiner
+from haystack_integrations.components.retrievers.pgvector import (
+    PgvectorEmbeddingRetriever,
+    PgvectorKeywordRetriever,
+)
 from haystack_integrations.components.generators.ollama import OllamaGenerator
 from .store import get_document_store
+from .embedders import document_embedder, text_embedder
+from .context import ContextAssembler, context_budget
+from .rerank import CachedCrossEncoderRanker, RERANK_CANDIDATES
+from .incremental import IngestLedger
+from .parallel_ingest import ParallelIngestor, INGEST_WORKERS
+from .halfvec_retriever import HalfvecEmbeddingRetriever, HALFVEC_RETRIEVAL
 import os
 
-# Configuration
-EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Configuration (the embedding backend is chosen by EMBED_BACKEND)
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3:8b")
 
+# Retrieval: hybrid runs keyword (tsvector) and vector search side by side and
+# merges them with reciprocal-rank fusion. Statute numbers, case names and form
+# IDs ("I-130", "§ 1983") are matched far better by keywords than embeddings.
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
 # Legal RAG prompt template
 LEGAL_PROMPT_TEMPLATE = """
 You are a legal information assistant for SmartProBono. Use only the provided context to answer questions.
@@ -36,7 +48,7 @@ Question: {{query}}
 {% if documents %}
 Context from legal documents:
 {% for d in documents %}
-[{{loop.index}}] {{ d.content[:1200] }}
+[{{loop.index}}] {{ d.content }}
 Source: {{ d.meta.get('filename', 'Unknown') }}
 {% endfor %}
 {% endif %}
@@ -58,9 +70,7 @@ def build_indexing_pipeline() -> Pipeline:
         split_length=6, 
         split_overlap=1
     ))
-    pipeline.add_component("embed", SentenceTransformersDocumentEmbedder(
-        model=EMBED_MODEL
-    ))
+    pipeline.add_component("embed", document_embedder())
     pipeline.add_component("write", DocumentWriter(document_store=ds))
 
     # Connect the pipeline
@@ -71,18 +81,118 @@ def build_indexing_pipeline() -> Pipeline:
     
     return pipeline
 
-def build_query_pipeline() -> Pipeline:
-    """Build pipeline for querying documents with RAG"""
+def build_conversion_pipeline() -> Pipeline:
+    """Build pipeline that converts, cleans and splits PDFs without embedding"""
+    pipeline = Pipeline()
+    pipeline.add_component("pdf", PyPDFToDocument())
+    pipeline.add_component("clean", DocumentCleaner())
+    pipeline.add_component("split", DocumentSplitter(
+        split_by="sentence", 
+        split_length=6, 
+        split_overlap=1
+    ))
+    pipeline.connect("pdf", "clean")
+    pipeline.connect("clean", "split")
+    return pipeline
+
+def build_parallel_ingestor(workers: int = INGEST_WORKERS) -> ParallelIngestor:
+    """Build the parallel ingestion engine used for uploads and bulk loads"""
+    return ParallelIngestor(
+        document_store=get_document_store(),
+        embedder=document_embedder(batch_size=64),
+        ledger=IngestLedger(),
+        workers=workers
+    )
+
+def embedding_retriever(document_store, top_k: int, halfvec: bool = HALFVEC_RETRIEVAL):
+    """Vector retriever: the halfvec index with exact rescoring, or the store's own"""
+    if halfvec:
+        return HalfvecEmbeddingRetriever(table=document_store.table_name, top_k=top_k)
+    return PgvectorEmbeddingRetriever(document_store=document_store, top_k=top_k)
+
+def add_retrieval(pipeline: Pipeline, embedding_retriever, keyword_retriever=None,
+                  top_k: int = RETRIEVAL_TOP_K) -> str:
+    """Add query embedding and retrieval components to a pipeline
+
+    With a keyword retriever, both retrievers run on the query and a
+    reciprocal-rank-fusion joiner merges them. Returns the name of the
+    component whose "documents" output holds the final ranking.
+    """
+    pipeline.add_component("q_embed", text_embedder())
+    pipeline.add_component("retrieve", embedding_retriever)
+    pipeline.connect("q_embed.embedding", "retrieve.query_embedding")
+    if keyword_retriever is None:
+        return "retrieve"
+
+    pipeline.add_component("keyword", keyword_retriever)
+    pipeline.add_component("join", DocumentJoiner(
+        join_mode="reciprocal_rank_fusion",
+        top_k=top_k
+    ))
+    pipeline.connect("retrieve.documents", "join.documents")
+    pipeline.connect("keyword.documents", "join.documents")
+    return "join"
+
+def retrieval_output(pipeline: Pipeline) -> str:
+    """Name of the component producing the retrieved documents"""
+    for name in ("assemble", "rerank", "join", "retrieve", "keyword"):
+        if name in pipeline.graph.nodes:
+            return name
+    raise ValueError("Pipeline has no retrieval component")
+
+def query_inputs(pipeline: Pipeline, query: str) -> dict:
+    """Pipeline inputs for a query, covering whichever components are present"""
+    inputs = {}
+    if "q_embed" in pipeline.graph.nodes:
+        inputs["q_embed"] = {"text": query}
+    if "keyword" in pipeline.graph.nodes:
+        inputs["keyword"] = {"query": query}
+    if "rerank" in pipeline.graph.nodes:
+        inputs["rerank"] = {"query": query}
+    if "prompt" in pipeline.graph.nodes:
+        inputs["prompt"] = {"query": query}
+    return inputs
+
+def run_query_pipeline(pipeline: Pipeline, query: str):
+    """Run a query pipeline and return (result, documents given to the prompt)
+
+    When the pipeline has a context assembler, result["assemble"]["stats"]
+    reports merges, dedupes and tokens saved.
+    """
+    output = retrieval_output(pipeline)
+    result = pipeline.run(query_inputs(pipeline, query), include_outputs_from={output})
+    return result, result[output]["documents"]
+
+def build_query_pipeline(hybrid: bool = HYBRID_RETRIEVAL, rerank: bool = False) -> Pipeline:
+    """Build pipeline for querying documents with RAG
+
+    With ``rerank``, retrieval returns RERANK_CANDIDATES documents and a
+    cross-encoder keeps the best RETRIEVAL_TOP_K of them.
+    """
     ds = get_document_store()
     pipeline = Pipeline()
     
     # Query processing components
-    pipeline.add_component("q_embed", SentenceTransformersTextEmbedder(
-        model=EMBED_MODEL
-    ))
-    pipeline.add_component("retrieve", PgvectorEmbeddingRetriever(
-        document_store=ds, 
-        top_k=6
+    top_k = RERANK_CANDIDATES if rerank else RETRIEVAL_TOP_K
+    if hybrid:
+        candidates = max(HYBRID_CANDIDATES, top_k)
+        output = add_retrieval(
+            pipeline,
+            embedding_retriever(ds, candidates),
+            PgvectorKeywordRetriever(document_store=ds, top_k=candidates),
+            top_k=top_k
+        )
+    else:
+        output = add_retrieval(
+            pipeline,
+            embedding_retriever(ds, top_k)
+        )
+    if rerank:
+        pipeline.add_component("rerank", CachedCrossEncoderRanker(top_k=RETRIEVAL_TOP_K))
+        pipeline.connect(f"{output}.documents", "rerank.documents")
+        output = "rerank"
+    pipeline.add_component("assemble", ContextAssembler(
+        token_budget=context_budget(OLLAMA_MODEL)
     ))
     pipeline.add_component("prompt", PromptBuilder(
         template=LEGAL_PROMPT_TEMPLATE
@@ -93,8 +203,9 @@ def build_query_pipeline() -> Pipeline:
     ))
 
     # Connect the pipeline
-    pipeline.connect("q_embed.embedding", "retrieve.query_embedding")
-    pipeline.connect("retrieve.documents", "prompt.documents")
+    pipeline.connect(f"{output}.documents", "assemble.documents")
+    pipeline.connect("q_embed.embedding", "assemble.query_embedding")
+    pipeline.connect("assemble.documents", "prompt.documents")
     pipeline.connect("prompt", "llm")
     
     return pipeline
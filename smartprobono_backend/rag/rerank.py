@@ -0,0 +1,138 @@
+"""
+Cross-encoder reranking stage with a (query, document) score cache.
+
+Retrieval returns a wide candidate set; a small local cross-encoder scores each
+(query, chunk) pair on CPU in batches and only the best few go on to the prompt.
+Scores are cached in an LRU keyed by query hash and document id, so repeated
+questions only score documents they haven't seen.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from haystack import Document, component
+
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "40"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+# Routes that rerank: "query" (/api/query) and "assist" (the agent graph's RAG step)
+RERANK_ROUTES = {r.strip() for r in os.getenv("RERANK_ROUTES", "query,assist").split(",") if r.strip()}
+
+
+def rerank_enabled(route: str) -> bool:
+    return route in RERANK_ROUTES
+
+
+class ScoreCache:
+    """Thread-safe LRU of cross-encoder scores"""
+
+    def __init__(self, max_size: int = RERANK_CACHE_SIZE):
+        self.max_size = max_size
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def put(self, key, score: float):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+    def __len__(self):
+        return len(self._scores)
+
+
+@component
+class CachedCrossEncoderRanker:
+    """Rerank documents with a cross-encoder, caching pair scores"""
+
+    def __init__(self, model: str = RERANK_MODEL, top_k: int = 6, batch_size: int = RERANK_BATCH_SIZE,
+                 cache: Optional[ScoreCache] = None):
+        self.model_name = model
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.cache = cache or ScoreCache()
+        self._model = None
+        self._lock = threading.Lock()
+        # Requests run on executor threads; only one of them loads the model
+        self._load_lock = threading.Lock()
+        self._metrics = {"runs": 0, "pairs": 0, "cache_hits": 0, "scored": 0, "total_ms": 0.0}
+
+    def warm_up(self):
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name, device="cpu")
+
+    @component.output_types(documents=List[Document], stats=Dict)
+    def run(self, query: str, documents: List[Document], top_k: Optional[int] = None):
+        start = time.perf_counter()
+        top_k = top_k or self.top_k
+        if not documents:
+            return {"documents": [], "stats": {"candidates": 0, "cache_hits": 0, "scored": 0, "ms": 0.0}}
+
+        query_hash = hashlib.sha256(" ".join(query.lower().split()).encode("utf-8")).hexdigest()
+        scores = {}
+        misses = []
+        for doc in documents:
+            score = self.cache.get((query_hash, doc.id))
+            if score is None:
+                misses.append(doc)
+            else:
+                scores[doc.id] = score
+
+        if misses:
+            self.warm_up()
+            predicted = self._model.predict(
+                [(query, doc.content or "") for doc in misses],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            for doc, score in zip(misses, predicted):
+                scores[doc.id] = float(score)
+                self.cache.put((query_hash, doc.id), float(score))
+
+        ranked = sorted(documents, key=lambda d: scores[d.id], reverse=True)[:top_k]
+        reranked = [
+            Document(id=d.id, content=d.content, meta=d.meta, embedding=d.embedding, score=scores[d.id])
+            for d in ranked
+        ]
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats = {
+            "candidates": len(documents),
+            "cache_hits": len(documents) - len(misses),
+            "scored": len(misses),
+            "ms": round(elapsed_ms, 2),
+        }
+        with self._lock:
+            self._metrics["runs"] += 1
+            self._metrics["pairs"] += len(documents)
+            self._metrics["cache_hits"] += stats["cache_hits"]
+            self._metrics["scored"] += len(misses)
+            self._metrics["total_ms"] += elapsed_ms
+        return {"documents": reranked, "stats": stats}
+
+    def metrics(self) -> Dict:
+        """Cumulative rerank metrics"""
+        with self._lock:
+            m = dict(self._metrics)
+        m["avg_ms"] = round(m["total_ms"] / m["runs"], 2) if m["runs"] else 0.0
+        m["cache_hit_rate"] = round(m["cache_hits"] / m["pairs"], 3) if m["pairs"] else 0.0
+        m["cache_size"] = len(self.cache)
+        m["total_ms"] = round(m["total_ms"], 2)
+        m["model"] = self.model_name
+        return m
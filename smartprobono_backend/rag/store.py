@@ -18,6 +18,8 @@ def get_document_store() -> PgvectorDocumentStore:
         vector_function="cosine_similarity",
         recreate_table=False,         # set True only for first run/dev resets
         search_strategy="hnsw",       # ANN; or "exact"
-        table_name="spb_documents"
+        table_name="spb_documents",
+        language="english",           # tsvector config for keyword search
+        keyword_index_name="spb_documents_keyword_index"  # GIN index on to_tsvector(content)
     )
     return ds
@@ -0,0 +1,34 @@
+"""Parity of the ONNX embedding backends with sentence-transformers"""
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+
+from .embedding_backend import EMBED_MODEL, PARITY_THRESHOLDS, load_embedding_model
+
+SENTENCES = [
+    "My landlord is trying to evict me without a court order.",
+    "How do I file an I-130 petition for my spouse?",
+    "The employer did not pay overtime for hours worked beyond forty per week.",
+    "Can I get my security deposit back if the apartment had mold?",
+    "42 U.S.C. § 1983 provides a remedy for violations of constitutional rights.",
+    "Custody",
+    "What happens at an asylum interview, and should I bring a lawyer or an interpreter with me?",
+    "The tenant must give thirty days written notice before terminating a month-to-month lease.",
+]
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return load_embedding_model(EMBED_MODEL, "torch").encode(SENTENCES, normalize_embeddings=True)
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_backends_match_torch(reference, backend):
+    """Every sentence's vector is within the backend's cosine threshold of PyTorch"""
+    vectors = load_embedding_model(EMBED_MODEL, backend).encode(SENTENCES, batch_size=3)
+    assert vectors.shape == reference.shape
+    cosines = (vectors * reference).sum(axis=1)
+    assert cosines.min() >= PARITY_THRESHOLDS[backend] - 1e-6
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-4)
@@ -0,0 +1,86 @@
+"""Tests for parallel ingestion through the real Haystack cleaner and splitter"""
+import pytest
+from haystack import Document, Pipeline
+from haystack.components.converters import TextFileToDocument
+from haystack.components.preprocessors import DocumentCleaner, DocumentSplitter
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+
+from . import parallel_ingest
+from .parallel_ingest import ParallelIngestor
+
+
+class MemoryLedger:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, source_id):
+        return self.entries.get(source_id)
+
+    def put(self, source_id, file_hash, chunk_ids):
+        self.entries[source_id] = {"file_hash": file_hash, "chunk_ids": list(chunk_ids)}
+
+    def close(self):
+        pass
+
+
+class FakeEmbedder:
+    def warm_up(self):
+        pass
+
+    def run(self, documents):
+        return {"documents": [
+            Document(id=doc.id, content=doc.content, meta=doc.meta, embedding=[float(len(doc.content)), 1.0])
+            for doc in documents
+        ]}
+
+
+@pytest.fixture
+def ingestor(monkeypatch):
+    # Same cleaner/splitter settings as build_conversion_pipeline, reading text files
+    pipeline = Pipeline()
+    pipeline.add_component("pdf", TextFileToDocument())
+    pipeline.add_component("clean", DocumentCleaner())
+    pipeline.add_component("split", DocumentSplitter(split_by="sentence", split_length=6, split_overlap=1))
+    pipeline.connect("pdf", "clean")
+    pipeline.connect("clean", "split")
+    monkeypatch.setattr(parallel_ingest, "_worker_pipeline", pipeline)
+    return ParallelIngestor(InMemoryDocumentStore(), FakeEmbedder(), ledger=MemoryLedger(),
+                            workers=1, embed_batch_size=4, write_batch_size=3)
+
+
+def write_text(tmp_path, name, sentences):
+    path = tmp_path / name
+    path.write_text(" ".join(f"Sentence {i} of {name}." for i in range(sentences)))
+    return str(path)
+
+
+def test_chunks_are_tracked_by_ingest_source(ingestor, tmp_path):
+    """The splitter's own meta["source_id"] does not break per-file bookkeeping"""
+    paths = [write_text(tmp_path, "a.txt", 20), write_text(tmp_path, "b.txt", 9)]
+    statuses = []
+    stats = ingestor.index(paths, progress=lambda source_id, status, info: statuses.append((source_id, status)))
+
+    assert stats["files_new"] == 2
+    assert stats["chunks_new"] == ingestor.document_store.count_documents() > 2
+    assert set(ingestor.ledger.entries) == set(paths)
+    assert sorted(s for s in statuses if s[1] == "indexed") == [(path, "indexed") for path in sorted(paths)]
+
+    again = ingestor.index(paths)
+    assert again["files_unchanged"] == 2 and again["chunks_new"] == 0
+
+
+def test_same_filename_uploads_in_one_batch(ingestor, tmp_path):
+    """Uploads sharing a filename are indexed separately, keyed by content"""
+    (tmp_path / "1").mkdir()
+    (tmp_path / "2").mkdir()
+    first = write_text(tmp_path / "1", "notice.txt", 8)
+    second = write_text(tmp_path / "2", "notice.txt", 14)
+    metas = [{"source_id": "sha256:first", "filename": "notice.txt"},
+             {"source_id": "sha256:second", "filename": "notice.txt"}]
+    stats = ingestor.index([first, second], metas)
+
+    assert stats["files_new"] == 2
+    assert set(ingestor.ledger.entries) == {"sha256:first", "sha256:second"}
+    stored = ingestor.document_store.filter_documents()
+    assert {doc.meta["ingest_source"] for doc in stored} == {"sha256:first", "sha256:second"}
+    assert all(doc.meta["filename"] == "notice.txt" for doc in stored)
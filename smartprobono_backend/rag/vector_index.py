@@ -0,0 +1,127 @@
+"""
+Compact in-process vector index with full-precision rescoring.
+
+A local stand-in for the pgvector HNSW index, for development and benchmarks
+without Postgres. The HNSW graph stores scalar-quantized vectors (float16 or
+int8 codes), which makes it 2-4x smaller than with float32 vectors. Queries
+fetch ``rescore_factor * top_k`` candidates from the graph, then re-rank them by
+exact cosine against the float32 vectors. Those are kept apart from the index
+and memory-mapped when loaded from disk, so only the candidates' pages are read.
+
+Production uses the same idea in Postgres: a halfvec expression index over
+``embedding`` and a rescoring query (see rag/halfvec_retriever.py).
+"""
+import json
+import os
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "int8")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+
+QUANTIZATIONS = ("float32", "float16", "int8")
+
+
+def normalize(vectors) -> np.ndarray:
+    """L2-normalise rows so inner product equals cosine similarity"""
+    vectors = np.ascontiguousarray(np.atleast_2d(vectors), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def _new_hnsw(dim: int, quantization: str, m: int):
+    import faiss
+    if quantization == "float32":
+        return faiss.IndexHNSWFlat(dim, m, faiss.METRIC_INNER_PRODUCT)
+    if quantization == "float16":
+        return faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_fp16, m, faiss.METRIC_INNER_PRODUCT)
+    if quantization == "int8":
+        return faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, m, faiss.METRIC_INNER_PRODUCT)
+    raise ValueError(f"Unknown quantization {quantization!r}, expected one of {', '.join(QUANTIZATIONS)}")
+
+
+class LocalVectorIndex:
+    """HNSW index over quantized vectors, rescored with full-precision vectors"""
+
+    def __init__(self, dim: int = 384, quantization: str = VECTOR_QUANTIZATION, m: int = HNSW_M,
+                 ef_construction: int = HNSW_EF_CONSTRUCTION, ef_search: int = HNSW_EF_SEARCH,
+                 rescore_factor: int = RESCORE_FACTOR):
+        self.dim = dim
+        self.quantization = quantization
+        self.m = m
+        self.ef_search = ef_search
+        self.rescore_factor = rescore_factor
+        self.index = _new_hnsw(dim, quantization, m)
+        self.index.hnsw.efConstruction = ef_construction
+        self.ids: List[str] = []
+        self._full = np.zeros((0, dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids: Sequence[str], vectors):
+        """Add vectors; the int8 quantizer is trained on the first batch"""
+        vectors = normalize(vectors)
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+        if not self.index.is_trained:
+            self.index.train(vectors)
+        self.index.add(vectors)
+        self.ids.extend(ids)
+        self._full = np.concatenate([self._full, vectors]) if len(self._full) else vectors
+
+    def search(self, query, top_k: int = 10, rescore: bool = True):
+        """Top-k (id, cosine) pairs for one query vector"""
+        if not self.ids:
+            return []
+        query = normalize(query)
+        candidates = top_k * self.rescore_factor if rescore else top_k
+        self.index.hnsw.efSearch = max(self.ef_search, candidates)
+        scores, positions = self.index.search(query, min(candidates, len(self.ids)))
+        positions = positions[0][positions[0] >= 0]
+        if not rescore:
+            return [(self.ids[p], float(s)) for p, s in zip(positions, scores[0])][:top_k]
+
+        # Ascending offsets keep reads from the memory-mapped file sequential
+        positions = np.sort(positions)
+        exact = np.asarray(self._full[positions]) @ query[0]
+        order = np.argsort(-exact)[:top_k]
+        return [(self.ids[positions[i]], float(exact[i])) for i in order]
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Index size (graph + codes) and full-precision rescoring vectors"""
+        import faiss
+        return {
+            "index": int(faiss.serialize_index(self.index).nbytes),
+            "rescore_vectors": int(self._full.nbytes),
+        }
+
+    def save(self, directory: str):
+        import faiss
+        os.makedirs(directory, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(directory, "index.faiss"))
+        np.save(os.path.join(directory, "vectors.npy"), np.asarray(self._full))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"dim": self.dim, "quantization": self.quantization, "m": self.m, "ids": self.ids}, f)
+
+    @classmethod
+    def load(cls, directory: str, ef_search: int = HNSW_EF_SEARCH, rescore_factor: int = RESCORE_FACTOR):
+        """Load an index; full-precision vectors stay on disk (memory-mapped)"""
+        import faiss
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        index = cls.__new__(cls)
+        index.dim = meta["dim"]
+        index.quantization = meta["quantization"]
+        index.m = meta["m"]
+        index.ef_search = ef_search
+        index.rescore_factor = rescore_factor
+        index.index = faiss.read_index(os.path.join(directory, "index.faiss"))
+        index.ids = meta["ids"]
+        index._full = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        return index
+
@@ -0,0 +1,70 @@
+"""
+Microbenchmark for the safety escalation matcher.
+
+Compares the compiled single-regex matcher with the previous implementation
+(one re.search per pattern, then a substring check per action word) on intake
+texts of growing length, with no match and with a single match at the very end,
+which is the worst case for both.
+
+Run from smartprobono_backend/:
+    python -m utils.bench_safety [--sizes 1000,10000,100000] [--number 200]
+"""
+import argparse
+import json
+import re
+import timeit
+
+from utils.safety import SAFETY_RULES_PATH, match_rules, needs_escalation
+
+FILLER = (
+    "My landlord has not returned the deposit after I moved out in March. "
+    "I have photos of the apartment and the lease agreement from two years ago. "
+)
+
+
+def legacy_needs_escalation(text: str, patterns, words) -> bool:
+    """The pre-compiled-matcher implementation, for comparison"""
+    if not text:
+        return True
+    text_lower = text.lower()
+    for pattern in patterns:
+        if re.search(pattern, text_lower):
+            return True
+    return any(word in text_lower for word in words)
+
+
+def legacy_rules():
+    with open(SAFETY_RULES_PATH) as f:
+        rules = json.load(f)["rules"]
+    patterns = [r["pattern"] for r in rules if r["id"] != "action.legal_terms"]
+    words = next(r["pattern"] for r in rules if r["id"] == "action.legal_terms").split("|")
+    return patterns, words
+
+
+def intake(size: int, tail: str = "") -> str:
+    text = (FILLER * (size // len(FILLER) + 1))[:size - len(tail)]
+    return text + tail
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark safety escalation matching")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    patterns, words = legacy_rules()
+    print(f"{'chars':>8} {'case':<10} {'legacy us':>10} {'compiled us':>12} {'speedup':>8} {'all rules us':>13}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for case, tail in (("no match", ""), ("match end", " I am not sure.")):
+            text = intake(size, tail)
+            assert legacy_needs_escalation(text, patterns, words) == needs_escalation(text)
+            legacy = timeit.timeit(lambda: legacy_needs_escalation(text, patterns, words), number=args.number)
+            compiled = timeit.timeit(lambda: needs_escalation(text), number=args.number)
+            all_rules = timeit.timeit(lambda: match_rules(text), number=args.number)
+            per_call = 1e6 / args.number
+            print(f"{size:>8} {case:<10} {legacy * per_call:>10.1f} {compiled * per_call:>12.1f} "
+                  f"{legacy / compiled:>7.1f}x {all_rules * per_call:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,188 @@
 """
 Safety and UPL (Unauthorized Practice of Law) guard for SmartProBono
 """
+import json
+import os
 import re
+import threading
+import time
+from typing import Dict, List
+
+# Escalation rules live in a JSON file so they can be edited without a deploy;
+# the file is re-read when its mtime changes (checked at most every
+# SAFETY_RULES_CHECK_SECONDS).
+SAFETY_RULES_PATH = os.getenv(
+    "SAFETY_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "safety_rules.json")
+)
+SAFETY_RULES_CHECK_SECONDS = float(os.getenv("SAFETY_RULES_CHECK_SECONDS", "5"))
+
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+MAX_TRIGGERS_PER_RULE = 64
+
+
+def _literal_prefixes(items):
+    """Literal strings that every match of a parsed pattern starts with
+
+    Returns (prefixes, complete); complete means the prefixes are the whole
+    match, so whatever follows in the enclosing pattern can be appended.
+    """
+    prefixes = {""}
+    for op, av in items:
+        if op is sre_parse.AT:
+            continue
+        if op is sre_parse.LITERAL:
+            prefixes = {p + chr(av) for p in prefixes}
+            continue
+        if op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            sub, complete = _literal_prefixes(av[3])
+        elif op is sre_parse.BRANCH:
+            results = [_literal_prefixes(branch) for branch in av[1]]
+            sub = set().union(*(r[0] for r in results))
+            complete = all(r[1] for r in results)
+        else:
+            return prefixes, False
+        extended = {p + s for p in prefixes for s in sub}
+        if len(extended) > MAX_TRIGGERS_PER_RULE:
+            return prefixes, False
+        prefixes = extended
+        if not complete:
+            return prefixes, False
+    return prefixes, True
+
+
+def rule_triggers(pattern: str):
+    """Literals one of which starts every match of the rule, or None if unknown"""
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    prefixes, _ = _literal_prefixes(parsed.data)
+    if not prefixes or "" in prefixes:
+        return None
+    return prefixes
+
+
+class SafetyMatcher:
+    """Escalation rules compiled into one literal trigger scan
+
+    Every rule match has to start with one of the rule's literal prefixes
+    ("you should", "file", "consult", ...). All prefixes go into one literal
+    alternation, so the text is scanned once, and rules are only tried
+    (anchored) where one of their triggers occurs. Rules without a literal
+    prefix fall back to a plain search.
+    """
+
+    def __init__(self, rules: List[Dict]):
+        self.ids = [rule["id"] for rule in rules]
+        self.regexes = [re.compile(rule["pattern"]) for rule in rules]
+        self.untriggered = []
+        by_trigger: Dict[str, set] = {}
+        for i, rule in enumerate(rules):
+            triggers = rule_triggers(rule["pattern"])
+            if triggers is None:
+                self.untriggered.append(i)
+                continue
+            for trigger in triggers:
+                by_trigger.setdefault(trigger, set()).add(i)
+
+        # Fold triggers into any shorter trigger they start with, so that at
+        # most one trigger can match at a position
+        self.trigger_rules: Dict[str, List[int]] = {}
+        for trigger in sorted(by_trigger, key=len):
+            owner = next((t for t in self.trigger_rules if trigger.startswith(t)), trigger)
+            merged = set(self.trigger_rules.get(owner, ())) | by_trigger[trigger]
+            self.trigger_rules[owner] = sorted(merged)
+        self.trigger_regex = re.compile(
+            "|".join(re.escape(t) for t in self.trigger_rules)
+        ) if self.trigger_rules else None
+
+    def _scan(self, text_lower: str, first_only: bool) -> List[int]:
+        matched = []
+        for i in self.untriggered:
+            if self.regexes[i].search(text_lower):
+                matched.append(i)
+                if first_only:
+                    return matched
+        pos = 0
+        while self.trigger_regex is not None and len(matched) < len(self.ids):
+            m = self.trigger_regex.search(text_lower, pos)
+            if m is None:
+                break
+            for i in self.trigger_rules[m.group()]:
+                if i not in matched and self.regexes[i].match(text_lower, m.start()):
+                    matched.append(i)
+                    if first_only:
+                        return matched
+            pos = m.start() + 1
+        return matched
+
+    def any(self, text_lower: str) -> bool:
+        return bool(self._scan(text_lower, first_only=True))
+
+    def matches(self, text_lower: str) -> List[str]:
+        return [self.ids[i] for i in sorted(self._scan(text_lower, first_only=False))]
+
+
+def load_rules(path: str = SAFETY_RULES_PATH) -> SafetyMatcher:
+    """Read and compile a rules file"""
+    with open(path) as f:
+        return SafetyMatcher(json.load(f)["rules"])
+
+
+class _RuleSet:
+    """The active matcher, hot-reloaded when the rules file changes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.matcher = load_rules(path)
+        self.mtime = os.path.getmtime(path)
+        self.checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def current(self) -> SafetyMatcher:
+        if time.monotonic() - self.checked_at >= SAFETY_RULES_CHECK_SECONDS:
+            self.reload()
+        return self.matcher
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompile if the file changed; a broken file keeps the old rules"""
+        with self._lock:
+            self.checked_at = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError as e:
+                print(f"Keeping previous safety rules, cannot stat {self.path}: {e}")
+                return False
+            if not force and mtime == self.mtime:
+                return False
+            # Recorded even if loading fails, so a broken file is reported once
+            self.mtime = mtime
+            try:
+                self.matcher = load_rules(self.path)
+            except (OSError, ValueError, KeyError, re.error) as e:
+                print(f"Keeping previous safety rules, could not load {self.path}: {e}")
+                return False
+            return True
+
+
+_RULES = _RuleSet(SAFETY_RULES_PATH)
+
+
+def reload_rules(force: bool = True) -> bool:
+    """Reload the rules file now; returns True if new rules were loaded"""
+    return _RULES.reload(force=force)
+
+
+def match_rules(text: str) -> List[str]:
+    """Ids of every escalation rule the text matches"""
+    if not text:
+        return []
+    return _RULES.current().matches(text.lower())
 
-# Patterns that indicate unauthorized legal advice
-ADVICE_PATTERNS = [
-    r"\b(i advise|i recommend|you should|you must|you need to)\b",
-    r"\b(file .* by|plead .*|sign .*|submit form)\b",
-    r"\b(this constitutes legal advice|this is legal advice)\b",
-    r"\b(you are required to|you must do|you should do)\b",
-    r"\b(hire a lawyer|get a lawyer|contact an attorney)\b",
-]
-
-# Patterns that indicate uncertainty (good to escalate)
-UNCERTAINTY_PATTERNS = [
-    r"\b(i am not sure|i don't know|unclear|uncertain)\b",
-    r"\b(consult.*attorney|speak.*lawyer|get.*legal.*help)\b",
-    r"\b(this.*complex|this.*complicated|this.*difficult)\b",
-]
 
 def needs_escalation(text: str) -> bool:
     """
@@ -25,29 +190,7 @@ def needs_escalation(text: str) -> bool:
     """
     if not text:
         return True
-    
-    text_lower = text.lower()
-    
-    # Check for unauthorized legal advice patterns
-    for pattern in ADVICE_PATTERNS:
-        if re.search(pattern, text_lower):
-            return True
-    
-    # Check for uncertainty patterns (good to escalate)
-    for pattern in UNCERTAINTY_PATTERNS:
-        if re.search(pattern, text_lower):
-            return True
-    
-    # Check for specific legal action words
-    legal_action_words = [
-        'sue', 'lawsuit', 'litigation', 'file', 'plead', 'defend',
-        'prosecute', 'charge', 'arrest', 'convict', 'sentence'
-    ]
-    
-    if any(word in text_lower for word in legal_action_words):
-        return True
-    
-    return False
+    return _RULES.current().any(text.lower())
 
 def sanitize_response(text: str) -> str:
     """
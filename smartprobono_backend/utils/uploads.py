@@ -0,0 +1,133 @@
+"""
+Streaming upload handling for the RAG API and the document worker.
+
+services/doc-worker/uploads.py is an identical copy, checked by the worker's
+test_vendored.py; change both together.
+
+Uploads are copied to disk in fixed-size chunks while the SHA-256 and size are
+computed incrementally, so peak memory per upload is one chunk rather than the
+whole file. Request bodies are limited by UploadSizeLimitMiddleware before
+python-multipart sees them: a declared Content-Length over the limit is
+rejected outright, and the bytes of every body (including chunked ones) are
+counted as they stream in, so an oversized request is cut off at the limit
+instead of being spooled in full. save_upload then enforces the per-file limit.
+
+Starlette has already spooled each file part to an anonymous temporary file
+(in memory up to 1 MB) while parsing the form. That file has no path, so
+save_upload copies it once more into a named file that can be handed off by
+path. The copy is the same pass that hashes the file.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+
+async def save_upload(file: UploadFile, directory: str = None, prefix: str = "",
+                      max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """Stream an upload to a file in ``directory`` and return its path, size and hash"""
+    directory = directory or tempfile.gettempdir()
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(413, f"File exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                out.write(chunk)
+        # Rename into place, so the final path never holds a partial file
+        final_path = os.path.join(directory, f"{prefix}{os.path.basename(file.filename or 'upload')}")
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StoredUpload(path=final_path, filename=file.filename, size=size, sha256=digest.hexdigest())
+
+
+class RequestTooLarge(HTTPException):
+    """Raised from the wrapped receive() once a body passes the limit
+
+    An HTTPException, so FastAPI's body parsing passes it through as a 413
+    rather than reporting a malformed body.
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(413, f"Request body exceeds the {max_bytes} byte upload limit")
+
+
+class UploadSizeLimitMiddleware:
+    """Limit request bodies before they are parsed
+
+    Written as plain ASGI middleware so it can wrap ``receive`` and count the
+    body as it streams, which BaseHTTPMiddleware does not allow.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise RequestTooLarge(self.max_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestTooLarge:
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(
+            {"detail": f"Request body exceeds the {self.max_bytes} byte upload limit"},
+            status_code=413,
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)
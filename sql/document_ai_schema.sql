@@ -23,6 +23,14 @@ create table if not exists doc_chunks (
   text text not null
 );
 
+-- Chunk provenance from the token-aware chunker (1-based pages, character
+-- offsets into the start/end page text)
+alter table doc_chunks add column if not exists token_count int;
+alter table doc_chunks add column if not exists page_start int;
+alter table doc_chunks add column if not exists char_start int;
+alter table doc_chunks add column if not exists page_end int;
+alter table doc_chunks add column if not exists char_end int;
+
 -- Document embeddings for semantic search
 create table if not exists doc_embeddings (
   chunk_id bigint primary key references doc_chunks(id) on delete cascade,
@@ -0,0 +1,26 @@
+-- Half-precision HNSW index for RAG embeddings (pgvector >= 0.7)
+-- Run this in your Supabase SQL editor after the Haystack store has created
+-- spb_documents.
+--
+-- The index is built over embedding::halfvec(384), which halves index size
+-- and build memory. The table keeps the full-precision vector(384) column, so
+-- queries take candidates from the halfvec index and rescore them exactly.
+
+create index if not exists spb_documents_halfvec_hnsw
+  on spb_documents using hnsw ((embedding::halfvec(384)) halfvec_cosine_ops);
+
+-- rag/halfvec_retriever.py (HALFVEC_RETRIEVAL=true) queries spb_documents
+-- through this index: it takes HALFVEC_RESCORE_FACTOR * top_k candidates
+-- ordered by the same halfvec expression, then rescores them on the
+-- full-precision column. The ORDER BY must use the same expression as the
+-- index for it to be used.
+--
+-- select id, content, 1 - (embedding <=> :query::vector(384)) as score
+-- from (
+--   select id, content, embedding
+--   from spb_documents
+--   order by embedding::halfvec(384) <=> :query::halfvec(384)
+--   limit 40
+-- ) candidates
+-- order by embedding <=> :query::vector(384)
+-- limit 10;
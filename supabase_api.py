@@ -10,6 +10,7 @@ from datetime import datetime
 import uuid
 import requests
 from supabase import create_client, Client
+from agent_router import KeywordRouter, GREETING_PATTERN
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -121,35 +122,25 @@ AI_AGENTS = {
     }
 }
 
+# Agent keyword sets in priority order (earlier agents win ties)
+AGENT_ROUTER = KeywordRouter([
+    ('compliance', ['gdpr', 'privacy', 'data protection', 'soc 2', 'compliance', 'regulatory', 'terms of service', 'privacy policy']),
+    ('business', ['incorporat', 'llc', 'corporation', 'fundraising', 'investment', 'equity', 'employment', 'contract', 'intellectual property', 'ip', 'trademark', 'patent']),
+    ('document', ['document', 'contract', 'agreement', 'generate', 'create', 'draft', 'analyze', 'review', 'pdf', 'upload']),
+    ('expert', ['expert', 'attorney', 'lawyer', 'consult', 'complex', 'litigation', 'court', 'lawsuit']),
+], default=None, exact=[('greeting', GREETING_PATTERN)])
+
 def route_to_agent(message, context=None):
     """Route message to appropriate AI agent"""
     if context is None:
         context = {}
     
-    lower_message = message.lower()
-    
-    # Greeting patterns
-    if lower_message.match(r'^(hello|hi|hey|good morning|good afternoon|good evening)$'):
-        return 'greeting'
-    
-    # Compliance patterns
-    if any(keyword in lower_message for keyword in ['gdpr', 'privacy', 'data protection', 'soc 2', 'compliance', 'regulatory', 'terms of service', 'privacy policy']):
-        return 'compliance'
-    
-    # Business patterns
-    if any(keyword in lower_message for keyword in ['incorporat', 'llc', 'corporation', 'fundraising', 'investment', 'equity', 'employment', 'contract', 'intellectual property', 'ip', 'trademark', 'patent']):
-        return 'business'
-    
-    # Document patterns
-    if any(keyword in lower_message for keyword in ['document', 'contract', 'agreement', 'generate', 'create', 'draft', 'analyze', 'review', 'pdf', 'upload']):
-        return 'document'
-    
-    # Expert patterns
-    if any(keyword in lower_message for keyword in ['expert', 'attorney', 'lawyer', 'consult', 'complex', 'litigation', 'court', 'lawsuit']) or context.get('conversation_length', 0) > 5:
-        return 'expert'
+    agent_type = AGENT_ROUTER.route(message)
+    if agent_type:
+        return agent_type
     
-    # Default to greeting
-    return 'greeting'
+    # Long conversations go to the expert, otherwise greeting
+    return 'expert' if context.get('conversation_length', 0) > 5 else 'greeting'
 
 def generate_ai_response(message, agent_type):
     """Generate AI response based on agent type"""
@@ -14,6 +14,7 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import requests
 import re
+from agent_router import KeywordRouter, GREETING_PATTERN
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -29,28 +30,16 @@ SUPABASE_HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Agent keyword sets in priority order (earlier agents win ties)
+AGENT_ROUTER = KeywordRouter([
+    ('compliance', ['gdpr', 'privacy', 'data protection', 'soc 2', 'compliance']),
+    ('business', ['incorporat', 'llc', 'corporation', 'fundraising', 'business']),
+    ('document', ['document', 'contract', 'agreement', 'generate']),
+], exact=[('greeting', GREETING_PATTERN)])
+
 def route_to_agent(message):
     """Route message to appropriate AI agent"""
-    lower_message = message.lower().strip()
-    
-    # Greeting patterns
-    if re.match(r'^(hello|hi|hey|good morning|good afternoon|good evening)$', lower_message):
-        return 'greeting'
-    
-    # Compliance patterns
-    if any(keyword in lower_message for keyword in ['gdpr', 'privacy', 'data protection', 'soc 2', 'compliance']):
-        return 'compliance'
-    
-    # Business patterns
-    if any(keyword in lower_message for keyword in ['incorporat', 'llc', 'corporation', 'fundraising', 'business']):
-        return 'business'
-    
-    # Document patterns
-    if any(keyword in lower_message for keyword in ['document', 'contract', 'agreement', 'generate']):
-        return 'document'
-    
-    # Default to greeting
-    return 'greeting'
+    return AGENT_ROUTER.route(message)
 
 def generate_ai_response(message, agent_type):
     """Generate AI response based on agent type"""